@@ -0,0 +1,73 @@
+"""Cross-validated precision/recall of the ACP pre-filter.
+
+    python -m evaluation.acp_filter_bench --folds 5
+
+For each threshold the script reports precision and recall of the policy
+class and the share of LLM calls the filter would avoid on a feed with the
+same policy/non-policy mix as LitroACP (data_acp + data_non).
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from policy_generation.acp_filter import ACPFilter, load_corpus
+
+THRESHOLDS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7)
+
+
+def cross_val_scores(texts: list[str], labels: np.ndarray, folds: int, seed: int):
+    order = np.random.default_rng(seed).permutation(len(texts))
+    scores = np.empty(len(texts))
+    for fold in range(folds):
+        test = order[fold::folds]
+        train = np.setdiff1d(order, test)
+        model = ACPFilter().fit([texts[i] for i in train], labels[train])
+        scores[test] = model.predict_proba([texts[i] for i in test])
+    return scores
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    texts, labels = load_corpus()
+    print(
+        f"{len(texts)} sentences: {int(labels.sum())} policies, "
+        f"{int(len(labels) - labels.sum())} non-policies"
+    )
+    start = time.perf_counter()
+    scores = cross_val_scores(texts, labels, args.folds, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'threshold':>9} {'precision':>9} {'recall':>7} {'calls avoided':>13}")
+    for threshold in THRESHOLDS:
+        predicted = scores >= threshold
+        tp = np.sum(predicted & (labels == 1))
+        precision = tp / max(1, predicted.sum())
+        recall = tp / labels.sum()
+        avoided = 1 - predicted.mean()
+        non_avoided = np.mean(~predicted[labels == 0])
+        print(
+            f"{threshold:9.1f} {precision:9.3f} {recall:7.3f} {avoided:13.1%}"
+            f"   ({non_avoided:.1%} of non-policies)"
+        )
+
+    model = ACPFilter()
+    start_fit = time.perf_counter()
+    model.fit(texts, labels)
+    fit = time.perf_counter() - start_fit
+    start_predict = time.perf_counter()
+    model.predict_proba(texts)
+    per_sentence = (time.perf_counter() - start_predict) / len(texts)
+    print(
+        f"{args.folds}-fold CV in {elapsed:.2f}s; full fit {fit * 1000:.0f} ms, "
+        f"{per_sentence * 1e6:.0f} µs per sentence"
+    )
+
+
+if __name__ == "__main__":
+    main()
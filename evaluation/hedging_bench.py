@@ -0,0 +1,81 @@
+"""Tail latency with one endpoint, two balanced endpoints and hedging.
+
+    python -m evaluation.hedging_bench --requests 400 --concurrency 8
+
+Starts two mock OpenAI-compatible servers whose responses occasionally take
+`--slow-delay` seconds, then sends the same requests through a single
+endpoint, through both endpoints with latency-aware balancing, and through
+both with hedging at the 95th percentile.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from policy_generation.backends import LocalBackend
+from policy_generation.mock_server import MockServer
+from policy_generation.multi_endpoint import MultiEndpointBackend
+
+
+def run(backend: MultiEndpointBackend, requests: int, concurrency: int) -> None:
+    def call(i: int) -> float:
+        start = time.perf_counter()
+        backend.complete("system", f"statement {i}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(call, range(requests)))) * 1000
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(
+        f"  wall {elapsed:.2f}s, p50 {p50:.0f} ms, p95 {p95:.0f} ms, "
+        f"p99 {p99:.0f} ms, max {latencies.max():.0f} ms"
+    )
+    print("  " + backend.report().replace("\n", "\n  "))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay", type=float, nargs=2, default=[0.05, 0.08])
+    parser.add_argument("--slow-delay", type=float, default=1.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--percentile", type=float, default=95)
+    args = parser.parse_args(argv)
+
+    servers = [
+        MockServer(
+            delay=delay, slow_delay=args.slow_delay, slow_rate=args.slow_rate, seed=i
+        ).start()
+        for i, delay in enumerate(args.delay)
+    ]
+
+    def endpoints(n: int) -> list[LocalBackend]:
+        return [
+            LocalBackend("mock", server.url, num_parallel=args.concurrency)
+            for server in servers[:n]
+        ]
+
+    scenarios = [
+        ("one endpoint", MultiEndpointBackend(endpoints(1), hedge_percentile=None)),
+        ("two endpoints", MultiEndpointBackend(endpoints(2), hedge_percentile=None)),
+        (
+            f"two endpoints, hedged at p{args.percentile:g}",
+            MultiEndpointBackend(endpoints(2), hedge_percentile=args.percentile),
+        ),
+    ]
+    for name, backend in scenarios:
+        print(name)
+        with backend:
+            run(backend, args.requests, args.concurrency)
+    for server in servers:
+        print(f"mock {server.url}: {server.counts}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measure import cost of the pipeline modules with `python -X importtime`.
+
+Each module is imported in a fresh interpreter from the repository root.
+The script prints the cumulative import time per module and fails (exit
+status 1) when a module that must stay standard-library only pulls in a
+heavy dependency, or when it exceeds the time budget:
+
+    python -m evaluation.import_time --budget-ms 150 --json import_time.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "openai", "httpx", "dotenv")
+
+# Modules whose import must not load any of HEAVY_MODULES
+STDLIB_ONLY = (
+    "policy_translation.cheng",
+    "policy_translation.crampton",
+    "policy_translation.carminati",
+    "policy_translation.fong",
+    "policy_translation.datalog",
+    "policy_generation.backends",
+    "policy_generation.resilience",
+    "policy_generation.template_cache",
+    "policy_generation.validation",
+    "policy_generation.natural_langauge_statements",
+    "policy_generation.xacml",
+    "evaluation.policy_gen",
+    "rebac",
+)
+
+
+def measure(module: str) -> tuple[float, set[str]]:
+    """Return (cumulative import time in ms, top-level packages imported)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_us = 0
+    packages = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        packages.add(name.split(".")[0])
+        if name == module:
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000, packages
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--json", help="write the measurements to this file")
+    parser.add_argument("modules", nargs="*", default=list(STDLIB_ONLY))
+    args = parser.parse_args(argv)
+
+    results = {}
+    failures = []
+    for module in args.modules:
+        ms, packages = measure(module)
+        heavy = sorted(packages.intersection(HEAVY_MODULES))
+        results[module] = {"cumulative_ms": round(ms, 2), "heavy_imports": heavy}
+        flag = ""
+        if module in STDLIB_ONLY and heavy:
+            failures.append(f"{module} imports {', '.join(heavy)}")
+            flag = "  ✗ heavy: " + ", ".join(heavy)
+        if args.budget_ms is not None and ms > args.budget_ms:
+            failures.append(f"{module} takes {ms:.1f} ms > {args.budget_ms} ms")
+            flag += "  ✗ over budget"
+        print(f"{module:50s} {ms:8.1f} ms{flag}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    for failure in failures:
+        print(f"✗ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
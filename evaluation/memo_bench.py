@@ -0,0 +1,89 @@
+"""Translation with and without the alpha-canonical memo.
+
+    python -m evaluation.memo_bench --max-entries 4096
+
+Translates every generated LitroACP and xacBench row with Cheng, Crampton
+and Fong, once translating each rule as written and once through a
+`TranslationMemo` shared by all datasets, then reports the time, the hit
+rate and how many outputs differ.  Memoized outputs translate the canonical
+rule, so they are also compared ignoring the order of conjunctions; the
+remaining Crampton differences are other shortest paths of the same length.
+"""
+
+import argparse
+import csv
+import re
+import time
+from pathlib import Path
+
+from policy_translation import cheng, crampton, fong
+from policy_translation.memo import TranslationMemo
+
+DATASETS = {
+    "natural_language_statements": "policy_generation/output/litroacp/*.csv",
+    "xacml": "policy_generation/output/xacml/xacBench/*.csv",
+}
+
+
+def conjuncts(output: str) -> list[list[str]]:
+    """The words of each output line, ignoring their order."""
+    return sorted(
+        sorted(re.findall(r"[^\s(),∧]+", line)) for line in output.split("\n")
+    )
+
+
+def translate_all(rows, memos: dict) -> dict[str, list[str]]:
+    outputs = {"cheng": [], "crampton": [], "fong": []}
+    cheng_translator = cheng.ChengTranslator(memo=False)
+    crampton_translator = crampton.CramptonTranslator(memo=False)
+    cheng_translator.memo = memos.get("cheng")
+    crampton_translator.memo = memos.get("crampton")
+    for source_type, row in rows:
+        for out in cheng_translator.translate_row(row, source_type):
+            outputs["cheng"].append(out["cheng"])
+        for out in crampton_translator.translate_row(row, source_type):
+            outputs["crampton"].append(out["crampton"])
+        outputs["fong"].append(
+            fong.convert_action(row["datalog_actions"], memos.get("fong"))
+        )
+    return outputs
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--max-entries", type=int, default=4096)
+    args = parser.parse_args(argv)
+
+    rows = [
+        (source_type, row)
+        for source_type, pattern in DATASETS.items()
+        for path in sorted(Path().glob(pattern))
+        for row in csv.DictReader(path.open(encoding="utf-8", newline=""))
+        if row.get("datalog_actions")
+    ]
+    start = time.perf_counter()
+    plain = translate_all(rows, {})
+    plain_s = time.perf_counter() - start
+
+    # One memo per translator, as each translator module keeps its own
+    memos = {name: TranslationMemo(args.max_entries) for name in plain}
+    start = time.perf_counter()
+    memoized = translate_all(rows, memos)
+    memo_s = time.perf_counter() - start
+
+    print(f"{len(rows)} rows: {plain_s:.2f}s as written, {memo_s:.2f}s memoized")
+    for name, memo in memos.items():
+        same = sum(a == b for a, b in zip(plain[name], memoized[name]))
+        reordered = sum(
+            conjuncts(a) == conjuncts(b) for a, b in zip(plain[name], memoized[name])
+        )
+        print(f"{name}: {memo.report()}")
+        print(
+            f"  {same}/{len(plain[name])} outputs identical, {reordered} equal "
+            f"up to conjunction order"
+            + ("" if len(plain[name]) == len(memoized[name]) else ", COUNTS DIFFER")
+        )
+
+
+if __name__ == "__main__":
+    main()
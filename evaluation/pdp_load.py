@@ -0,0 +1,115 @@
+"""Load generator for the PDP service.
+
+    python -m evaluation.pdp_load --workers 1 2 4 --clients 8 --requests 4000
+
+Builds a synthetic relationship graph and policy set in a temporary
+directory, then for each worker count starts the service, drives it with
+client processes over keep-alive HTTP connections and reports throughput
+and latency percentiles.
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing as mp
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from evaluation.path_eval_bench import synthetic_policies
+from policy_enforcement.graph_store import GraphStore
+from policy_enforcement.pdp_service import PDPService
+from policy_enforcement.policies import base_type
+from policy_enforcement.policy_index import PolicyIndex
+
+
+def client(port: int, requests: int, nodes: int, batch: int, seed: int) -> list[float]:
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    latencies = []
+    for _ in range(requests):
+        checks = [
+            {
+                "subject": f"user{rng.randrange(nodes)}",
+                "object": f"user{rng.randrange(nodes)}",
+            }
+            for _ in range(batch)
+        ]
+        body = json.dumps({"checks": checks})
+        start = time.perf_counter()
+        connection.request("POST", "/check", body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    return latencies
+
+
+def run(args, graph_dir: Path, index: PolicyIndex, workers: int) -> None:
+    with PDPService(graph_dir, index, workers, port=0, tick=args.tick) as service:
+        port = service.address[1]
+        # Wait until every worker accepts
+        for _ in range(100):
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port)
+                connection.request("GET", "/health")
+                connection.getresponse().read()
+                break
+            except ConnectionError:
+                time.sleep(0.05)
+        per_client = args.requests // args.clients
+        start = time.perf_counter()
+        with mp.get_context("spawn").Pool(args.clients) as pool:
+            results = pool.starmap(
+                client,
+                [
+                    (port, per_client, args.nodes, args.batch, seed)
+                    for seed in range(args.clients)
+                ],
+            )
+        elapsed = time.perf_counter() - start
+    latencies = np.array([lat for result in results for lat in result]) * 1000
+    checks = len(latencies) * args.batch
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{workers:7d} {checks / elapsed:12.0f} {p50:8.2f} {p95:8.2f} {p99:8.2f}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--batch", type=int, default=1, help="checks per request")
+    parser.add_argument("--nodes", type=int, default=50000)
+    parser.add_argument("--degree", type=int, default=8)
+    parser.add_argument("--policies", type=int, default=300)
+    parser.add_argument("--tick", type=float, default=0.002)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    policies = synthetic_policies(args.policies, rng)
+    edge_types = sorted({base_type(t) for p in policies for t in p.edge_types})
+    edges = (
+        (
+            f"user{rng.randrange(args.nodes)}",
+            rng.choice(edge_types),
+            f"user{rng.randrange(args.nodes)}",
+        )
+        for _ in range(args.nodes * args.degree // 2)
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        store = GraphStore.build(edges, Path(tmp, "graph"))
+        print(f"{store.report()}, {len(policies)} policies, {args.clients} clients")
+        print(
+            f"{'workers':>7} {'checks/s':>12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for workers in args.workers:
+            run(args, Path(tmp, "graph"), PolicyIndex(policies), workers)
+
+
+if __name__ == "__main__":
+    main()
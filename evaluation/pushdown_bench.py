@@ -0,0 +1,75 @@
+"""Comparison checks pushed into the walk vs. checked after it.
+
+    python -m evaluation.pushdown_bench --users 50000 --requesters 2000
+
+Builds a random friendship/ownership graph with numeric attributes, plans
+a rule with three comparisons, and evaluates it from a batch of requesters
+with every check at its earliest step and with all checks after the last
+step.  Both must return the same (requester, object) pairs.
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from policy_enforcement.attribute_store import AttributeStore
+from policy_enforcement.graph_store import GraphStore
+from policy_enforcement.pushdown import WalkStats, evaluate, plan_rule
+from policy_translation.datalog import parse_rule
+
+RULE = parse_rule(
+    "can_view(U, R) :- clearance(U, C), C >= 2, friend(U, F), friend(F, G), "
+    "age(G, A), A >= 65, owns(G, R), sensitivity(R, S), C >= S."
+)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--friends", type=int, default=10)
+    parser.add_argument("--documents", type=int, default=3, help="per user")
+    parser.add_argument("--requesters", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    n = args.users
+    edges = [
+        (f"u{rng.randrange(n)}", "friend", f"u{rng.randrange(n)}")
+        for _ in range(n * args.friends // 2)
+    ] + [(f"u{rng.randrange(n)}", "owns", f"d{d}") for d in range(n * args.documents)]
+    graph = GraphStore.build(edges)
+    rows = [(f"u{i}", "age", rng.randrange(18, 90)) for i in range(n)]
+    rows += [(f"u{i}", "clearance", rng.randint(1, 5)) for i in range(n)]
+    rows += [
+        (f"d{d}", "sensitivity", rng.randint(1, 5)) for d in range(n * args.documents)
+    ]
+    attributes = AttributeStore.from_graph(graph, rows)
+    print(graph.report())
+    print(attributes.report())
+
+    plan = plan_rule(RULE, attributes)
+    print(f"plan: {plan}")
+    requesters = np.array(
+        [graph.node_id(f"u{rng.randrange(n)}") for _ in range(args.requesters)]
+    )
+    results = {}
+    for pushdown in (False, True):
+        stats = WalkStats()
+        start = time.perf_counter()
+        results[pushdown] = evaluate(
+            plan, graph, attributes, requesters, pushdown, stats
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{'pushed down' if pushdown else 'checked after the walk'}: "
+            f"{elapsed * 1000:.0f} ms, {stats.expanded} edges scanned, "
+            f"{stats.rows} partial bindings, {len(results[pushdown])} pairs"
+        )
+    print(f"results {'agree' if results[True] == results[False] else 'DIFFER'}")
+
+
+if __name__ == "__main__":
+    main()
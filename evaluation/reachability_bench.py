@@ -0,0 +1,92 @@
+"""Bounded path checks through the 2-hop reachability index vs. BFS.
+
+    python -m evaluation.reachability_bench --nodes 5000 --degree 12
+
+Builds a random social graph, indexes a set of frequent hop-bounded specs,
+then times random (requester, target, spec) checks both ways, applies a
+batch of edge insertions/deletions and checks again for agreement.
+"""
+
+import argparse
+import random
+import time
+
+from policy_enforcement.path_evaluator import RelationshipGraph, spec_matches
+from policy_enforcement.policies import PathSpec
+from policy_enforcement.reachability import ReachabilityIndex
+
+EDGE_TYPES = ("friend", "colleague", "parent", "member_of")
+SPECS = (
+    PathSpec(("friend",), 1),
+    PathSpec(("friend",), 2),
+    PathSpec(("friend",), 3),
+    PathSpec(("friend", "colleague"), 2),
+    PathSpec(("parent", "parent^{-1}"), 2),
+    PathSpec(("member_of", "member_of^{-1}", "friend"), 3),
+)
+
+
+def timed_checks(check, queries) -> tuple[list[bool], float]:
+    start = time.perf_counter()
+    results = [check(u, v, spec) for u, v, spec in queries]
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--nodes", type=int, default=5000)
+    parser.add_argument("--degree", type=int, default=12)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    edges = [
+        (rng.randrange(args.nodes), rng.choice(EDGE_TYPES), rng.randrange(args.nodes))
+        for _ in range(args.nodes * args.degree // 2)
+    ]
+    graph = RelationshipGraph(edges)
+    start = time.perf_counter()
+    index = ReachabilityIndex(graph, SPECS)
+    print(f"{index.report()}, built in {time.perf_counter() - start:.2f}s")
+
+    queries = [
+        (rng.randrange(args.nodes), rng.randrange(args.nodes), rng.choice(SPECS))
+        for _ in range(args.queries)
+    ]
+    indexed, index_time = timed_checks(index.reaches, queries)
+    searched, bfs_time = timed_checks(
+        lambda u, v, spec: spec_matches(graph, u, v, spec), queries
+    )
+    print(
+        f"BFS {bfs_time * 1e6:.1f} µs/check, index {index_time * 1e6:.1f} µs/check "
+        f"({bfs_time / index_time:.1f}x), {sum(indexed)} reachable, "
+        f"{sum(a != b for a, b in zip(indexed, searched))} mismatches"
+    )
+
+    start = time.perf_counter()
+    for _ in range(args.updates):
+        if rng.random() < 0.5:
+            edge = (
+                rng.randrange(args.nodes),
+                rng.choice(EDGE_TYPES),
+                rng.randrange(args.nodes),
+            )
+            index.add_edge(*edge)
+            edges.append(edge)
+        else:
+            index.remove_edge(*edges.pop(rng.randrange(len(edges))))
+    update_time = (time.perf_counter() - start) / args.updates
+    indexed, _ = timed_checks(index.reaches, queries)
+    searched, _ = timed_checks(
+        lambda u, v, spec: spec_matches(graph, u, v, spec), queries
+    )
+    print(
+        f"{args.updates} edge updates at {update_time * 1000:.2f} ms each, "
+        f"{sum(a != b for a, b in zip(indexed, searched))} mismatches afterwards"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Regression checks for the template cache rewrites.
+
+    python -m evaluation.template_cache_check
+
+Each case caches one translated statement, looks up another and checks
+whether the cache answers it (and with what Datalog) or falls back to the
+LLM.  Exits with status 1 when a case fails.
+"""
+
+import argparse
+import sys
+
+from policy_generation.template_cache import TemplateCache
+
+CACHED = (
+    "The doctor can read the medical record of the patient.",
+    {
+        "datalog_subjects": "Doctor(D).",
+        "datalog_objects": "MedicalRecord(R).",
+        "datalog_relationships": "treats(D, P) :- Doctor(D), Patient(P).",
+        "datalog_actions": "can_read(D, R) :- Doctor(D), MedicalRecord(R).",
+    },
+)
+
+# (statement, expected datalog_actions; None when the cache must not answer)
+CASES = [
+    (
+        "The nurse can read the medical record of the patient.",
+        "can_read(D, R) :- Nurse(D), MedicalRecord(R).",
+    ),
+    ("The doctor cannot read the medical record of the patient.", None),
+    ("The doctor may read the medical record of the patient.", None),
+    ("The doctor never read the medical record of the patient.", None),
+    # `read` only occurs inside `can_read`, which is not rewritten
+    ("The doctor can write the medical record of the patient.", None),
+]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.parse_args(argv)
+
+    failures = 0
+    for text, expected in CASES:
+        cache = TemplateCache()
+        cache.add(*CACHED)
+        answer = cache.lookup(text)
+        actions = None if answer is None else answer["datalog_actions"]
+        ok = actions == expected
+        failures += not ok
+        print(f"{'ok' if ok else '✗'}  {text!r} -> {actions!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
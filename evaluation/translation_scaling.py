@@ -0,0 +1,133 @@
+"""Thread vs. process scaling of the Cheng/Crampton/Fong translators.
+
+    python -m evaluation.translation_scaling --max-workers 8 --python python3.13t
+
+Translates every generated LitroACP and xacBench row with all three
+translators in chunks, on a ThreadPoolExecutor and on a ProcessPoolExecutor
+with 1, 2, 4, ... workers, and prints rows per second and the speedup over
+one worker.  Threads only scale on a free-threaded interpreter (3.13t and
+later, where `sys._is_gil_enabled()` is False); each `--python` interpreter
+reruns the benchmark in a subprocess so the builds can be compared.  The
+translation memos are off unless `--memo` is given, so every round does
+the same work.
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from policy_translation import fong
+from policy_translation.cheng import ChengTranslator
+from policy_translation.crampton import CramptonTranslator
+
+DATASETS = {
+    "natural_language_statements": "policy_generation/output/litroacp/*.csv",
+    "xacml": "policy_generation/output/xacml/xacBench/*.csv",
+}
+translators = {}
+
+
+def load_rows() -> list[tuple[str, dict]]:
+    return [
+        (source_type, row)
+        for source_type, pattern in DATASETS.items()
+        for path in sorted(Path().glob(pattern))
+        for row in csv.DictReader(path.open(encoding="utf-8", newline=""))
+    ]
+
+
+def init_worker(memo: bool) -> None:
+    translators["cheng"] = ChengTranslator(memo=memo)
+    translators["crampton"] = CramptonTranslator(memo=memo)
+    translators["fong"] = fong.MEMO if memo else None
+
+
+def translate_chunk(chunk: list[tuple[str, dict]]) -> int:
+    """Output rows of all three translators for a chunk of input rows."""
+    count = 0
+    for source_type, row in chunk:
+        count += len(translators["cheng"].translate_row(row, source_type))
+        count += len(translators["crampton"].translate_row(row, source_type))
+        action = row.get("datalog_actions") or ""
+        if action and fong.convert_action(action, translators["fong"]):
+            count += 1
+    return count
+
+
+def run(executor, workers: int, chunks: list) -> tuple[float, list[int]]:
+    """Seconds for one pass over the chunks and the output rows per chunk."""
+    list(executor.map(translate_chunk, chunks[:workers]))  # start the workers
+    start = time.perf_counter()
+    counts = list(executor.map(translate_chunk, chunks))
+    return time.perf_counter() - start, counts
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus")
+    parser.add_argument("--chunk", type=int, default=64, help="rows per task")
+    parser.add_argument("--memo", action="store_true", help="share translation memos")
+    parser.add_argument(
+        "--python",
+        action="append",
+        default=[],
+        metavar="EXE",
+        help="also run under this interpreter (repeatable)",
+    )
+    args = parser.parse_args(argv)
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(
+        f"Python {sys.version.split()[0]} ({'GIL' if gil else 'free-threaded'}), "
+        f"{os.cpu_count()} CPUs"
+    )
+    rows = load_rows() * args.repeat
+    chunks = [rows[i : i + args.chunk] for i in range(0, len(rows), args.chunk)]
+    init_worker(args.memo)
+    workers, counts = 1, []
+    while workers <= args.max_workers:
+        counts.append(workers)
+        workers *= 2
+
+    print(f"{len(rows)} rows in chunks of {args.chunk}")
+    print("workers  threads rows/s  speedup  processes rows/s  speedup")
+    expected = [translate_chunk(chunk) for chunk in chunks]
+    base = {}
+    for n in counts:
+        with ThreadPoolExecutor(n) as pool:
+            threads, thread_counts = run(pool, n, chunks)
+        with ProcessPoolExecutor(
+            n, initializer=init_worker, initargs=(args.memo,)
+        ) as pool:
+            processes, process_counts = run(pool, n, chunks)
+        base.setdefault("threads", threads)
+        base.setdefault("processes", processes)
+        print(
+            f"{n:7d}  {len(rows) / threads:14.0f}  {base['threads'] / threads:6.2f}x  "
+            f"{len(rows) / processes:16.0f}  {base['processes'] / processes:6.2f}x"
+            + ("" if thread_counts == process_counts == expected else "  DIFFER")
+        )
+
+    options = [
+        f"--max-workers={args.max_workers}",
+        f"--repeat={args.repeat}",
+        f"--chunk={args.chunk}",
+    ] + (["--memo"] if args.memo else [])
+    for exe in args.python:
+        print(f"\n$ {exe}", flush=True)
+        try:
+            subprocess.run(
+                [exe, "-m", "evaluation.translation_scaling", *options], check=True
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"{exe}: {e}")
+
+
+if __name__ == "__main__":
+    main()
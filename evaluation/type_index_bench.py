@@ -0,0 +1,182 @@
+"""Type-guard candidates from bitmaps vs. Python sets and per-node checks.
+
+    python -m evaluation.type_index_bench --nodes 1000000
+
+Assigns random types of different densities to the nodes, computes the
+candidates of the guards of a generated rule three ways and checks that
+they agree, then walks a random graph from a few Prescriber requesters
+with and without passing the Drug candidates to the walk as `targets`.
+Both walks skip requesters that fail their own guard, so the speedup is
+the one of the target pruning alone.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+from policy_enforcement.graph_store import GraphStore
+from policy_enforcement.path_evaluator import PathEvaluator
+from policy_enforcement.policies import PathSpec, Policy
+from policy_enforcement.type_index import TypeIndex, unary_guards
+from policy_translation.datalog import parse_rule
+
+# Fraction of the nodes of each type
+DENSITY = {
+    "Patient": 0.4,
+    "Drug": 0.05,
+    "Prescriber": 0.01,
+    "Suspended": 0.002,
+    "Pharmacist": 0.01,
+}
+RULE = parse_rule(
+    "can_prescribe(D, P, DR) :- Prescriber(D), not Suspended(D), Patient(P), "
+    "Drug(DR), not has_allergy(P, DR)."
+)
+
+
+def timed(f, repeat: int = 3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = f()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--nodes", type=int, default=1_000_000)
+    parser.add_argument("--graph-nodes", type=int, default=20000)
+    parser.add_argument("--degree", type=int, default=8)
+    parser.add_argument("--requesters", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    facts = [
+        (int(node), type_name)
+        for type_name, density in DENSITY.items()
+        for node in np.flatnonzero(rng.random(args.nodes) < density)
+    ]
+    start = time.perf_counter()
+    index = TypeIndex.build(facts, args.nodes)
+    print(f"{index.report()}, built in {time.perf_counter() - start:.2f}s")
+
+    sets: dict[str, set[int]] = {}
+    types_of: dict[int, set[str]] = {}
+    for node, type_name in facts:
+        sets.setdefault(type_name, set()).add(node)
+        types_of.setdefault(node, set()).add(type_name)
+    set_bytes = sum(
+        sys.getsizeof(s) + 28 * len(s) for s in sets.values()
+    )  # set table + int objects
+    print(f"python sets: {set_bytes / 1024:.1f} KiB")
+
+    def with_sets():
+        result = {}
+        for var, (required, forbidden) in guards.items():
+            nodes = set.intersection(*(sets[t] for t in required))
+            for t in forbidden:
+                nodes -= sets.get(t, set())
+            result[var] = nodes
+        return result
+
+    def per_node():
+        return {
+            var: {
+                node
+                for node in range(args.nodes)
+                if all(t in types_of.get(node, ()) for t in required)
+                and not any(t in types_of.get(node, ()) for t in forbidden)
+            }
+            for var, (required, forbidden) in guards.items()
+        }
+
+    guards = unary_guards(RULE)
+    bitmaps, bitmap_time = timed(lambda: index.candidates(RULE))
+    python_sets, set_time = timed(with_sets)
+    checked, check_time = timed(per_node, repeat=1)
+    agree = all(set(bitmaps[v]) == python_sets[v] == checked[v] for v in guards)
+    sizes = {var: len(bitmap) for var, bitmap in bitmaps.items()}
+    print(
+        f"candidates {sizes}: bitmaps {bitmap_time * 1000:.2f} ms, "
+        f"sets {set_time * 1000:.2f} ms, per-node checks {check_time * 1000:.0f} ms, "
+        f"{'agree' if agree else 'DISAGREE'}"
+    )
+
+    # Walk a random graph over the first --graph-nodes ids, typed like above
+    prng = random.Random(args.seed)
+    n = min(args.graph_nodes, args.nodes)
+    edges = [
+        (
+            str(prng.randrange(n)),
+            prng.choice(("friend", "treats")),
+            str(prng.randrange(n)),
+        )
+        for _ in range(n * args.degree // 2)
+    ]
+    store = GraphStore.build(edges)
+    typed = TypeIndex.from_graph(
+        store, ((str(node), t) for node, t in facts if node < n)
+    )
+    candidates = typed.candidates(RULE)
+    prescribers, drugs = candidates["D"], candidates["DR"]
+    names = {
+        store.node_id(str(node)): types
+        for node, types in types_of.items()
+        if node < n and store.node_id(str(node)) is not None
+    }
+    evaluator = PathEvaluator(
+        [
+            Policy(0, "cheng", "can_prescribe", (PathSpec(("treats", "friend"), 4),)),
+            Policy(1, "cheng", "can_prescribe", (PathSpec(("friend",), 3),)),
+        ]
+    )
+    # Requesters are mostly Prescribers, so most of them are walked
+    pool = [int(node) for node in prescribers] or [0]
+    requesters = [
+        prng.choice(pool) if prng.random() < 0.9 else prng.randrange(store.node_count)
+        for _ in range(args.requesters)
+    ]
+
+    def is_a(node: int, required: list[str], forbidden: list[str]) -> bool:
+        types = names.get(node, ())
+        return all(t in types for t in required) and not any(
+            t in types for t in forbidden
+        )
+
+    def unfiltered():
+        # Walk everywhere, then check the guard of each target
+        return [
+            (
+                {
+                    node
+                    for node in evaluator.reach(store, r)
+                    if is_a(node, *guards["DR"])
+                }
+                if is_a(r, *guards["D"])
+                else set()
+            )
+            for r in requesters
+        ]
+
+    def filtered():
+        return [
+            set(evaluator.reach(store, r, targets=drugs)) if r in prescribers else set()
+            for r in requesters
+        ]
+
+    plain, plain_time = timed(unfiltered, repeat=1)
+    pruned, pruned_time = timed(filtered, repeat=1)
+    print(
+        f"reach from {len(requesters)} requesters: walk then check targets "
+        f"{plain_time / len(requesters) * 1000:.3f} ms, Drug targets pruned "
+        f"{pruned_time / len(requesters) * 1000:.3f} ms "
+        f"({plain_time / pruned_time:.1f}x), "
+        f"{'same' if plain == pruned else 'DIFFERENT'} results"
+    )
+
+
+if __name__ == "__main__":
+    main()
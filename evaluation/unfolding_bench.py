@@ -0,0 +1,112 @@
+"""Helper unfolding over the generated LitroACP policies.
+
+    python -m evaluation.unfolding_bench
+
+Translates every row with Cheng and Crampton with and without unfolding,
+then checks on random facts that each row's unfolded actions derive the
+same facts as the original program, and counts the derived helper
+predicates an evaluator no longer has to materialise.
+"""
+
+import argparse
+import csv
+import random
+import time
+from pathlib import Path
+
+from policy_enforcement.datalog_sql import body_atoms, evaluate_naive, predicate
+from policy_translation.cheng import ChengTranslator
+from policy_translation.crampton import CramptonTranslator
+from policy_translation.datalog import DatalogSyntaxError, parse_program
+from policy_translation.unfolding import UnfoldStats, Unfolder
+
+LITROACP = Path("policy_generation/output/litroacp")
+
+
+def random_facts(rules, rng: random.Random, rows: int = 8) -> dict:
+    heads = {predicate(rule.head) for rule in rules}
+    facts = {}
+    for rule in rules:
+        for atom, _ in body_atoms(rule.body):
+            pred = predicate(atom)
+            if pred not in heads and pred not in facts:
+                facts[pred] = {
+                    tuple(f"v{rng.randrange(3)}" for _ in range(pred[1]))
+                    for _ in range(rows)
+                }
+    return facts
+
+
+def needed(rules, goals: set) -> set:
+    """Derived predicates the goals depend on, the goals included."""
+    defined = {predicate(rule.head) for rule in rules}
+    result, stack = set(), list(goals)
+    while stack:
+        pred = stack.pop()
+        if pred in result or pred not in defined:
+            continue
+        result.add(pred)
+        for rule in rules:
+            if predicate(rule.head) == pred:
+                stack.extend(predicate(a) for a, _ in body_atoms(rule.body))
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    rows = [
+        row
+        for path in sorted(LITROACP.glob("*.csv"))
+        for row in csv.DictReader(path.open(encoding="utf-8", newline=""))
+    ]
+    for unfold in (False, True):
+        cheng, crampton = ChengTranslator(unfold), CramptonTranslator(unfold)
+        start = time.perf_counter()
+        policies = sum(
+            len(out["cheng"].split("\n"))
+            for row in rows
+            for out in cheng.translate_row(row)
+        )
+        paths = sum(len(crampton.translate_row(row)) for row in rows)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{'unfolded' if unfold else 'original'}: {policies} Cheng policies, "
+            f"{paths} Crampton paths from {len(rows)} rows in {elapsed:.2f}s"
+        )
+    print(cheng.unfold_stats.report())
+
+    stats = UnfoldStats()
+    checked = agreed = helpers_before = helpers_after = 0
+    for row in rows:
+        try:
+            context = parse_program(row.get("datalog_relationships") or "")
+            actions = parse_program(row.get("datalog_actions") or "")
+        except DatalogSyntaxError:
+            continue
+        unfolder = Unfolder(context + actions, stats=stats)
+        flat = [r for rule in actions for r in unfolder.unfold(rule)]
+        goals = {predicate(rule.head) for rule in actions}
+        original = context + actions
+        unfolded = context + flat
+        helpers_before += len(needed(original, goals) - goals)
+        helpers_after += len(needed(unfolded, goals) - goals)
+        facts = random_facts(original, rng)
+        try:
+            before = evaluate_naive(original, facts)
+            after = evaluate_naive(unfolded, facts)
+        except (ValueError, KeyError, TypeError):
+            continue  # unsafe or unstratifiable generated rules
+        checked += 1
+        agreed += all(before[g] == after[g] for g in goals)
+    print(
+        f"{agreed} of {checked} evaluable rows derive the same action facts; "
+        f"derived helper predicates to materialise: {helpers_before} -> {helpers_after}"
+    )
+
+
+if __name__ == "__main__":
+    main()
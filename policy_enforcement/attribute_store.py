@@ -0,0 +1,138 @@
+"""Node attributes as NumPy columns indexed by node id.
+
+Generated rules read attributes through binary atoms such as `age(U, A)`
+and compare them (`A >= 18`).  An `AttributeStore` holds one column per
+attribute over the ids of a `GraphStore`: the values as float64 with a mask
+of the nodes whose value is a number, a fixed-width string array of all
+values when some are not numbers, and a mask of the nodes that have a
+value.  A comparison over a whole frontier of nodes is then one vectorised
+expression (see pushdown.py), and an attribute with a few non-numeric
+values still compares numerically on the others.
+
+    attributes = AttributeStore.from_graph(store, read_attributes("attrs.csv"))
+"""
+
+import csv
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+
+@dataclass
+class Column:
+    values: np.ndarray  # float64, NaN where the value is missing or not a number
+    present: np.ndarray  # bool, False where the node has no value
+    number: np.ndarray  # bool, True where the value is a number
+    text: np.ndarray | None = None  # every value as text; None if all are numbers
+
+    @property
+    def numeric(self) -> bool:
+        return self.text is None
+
+    @property
+    def nbytes(self) -> int:
+        text = 0 if self.text is None else self.text.nbytes
+        return self.values.nbytes + self.present.nbytes + self.number.nbytes + text
+
+    @property
+    def kind(self) -> str:
+        if self.numeric:
+            return "number"
+        return "mixed" if self.number.any() else "text"
+
+
+def read_attributes(path: Path) -> Iterator[tuple[str, str, str]]:
+    """(node, attribute, value) triples from a CSV with those columns."""
+    with Path(path).open(encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield row["node"], row["attribute"], row["value"]
+
+
+def _number(value: object) -> float | None:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+class AttributeStore:
+    """Columns of node attributes over node ids 0..node_count-1."""
+
+    def __init__(self, node_count: int, columns: dict[str, Column] | None = None):
+        self.node_count = node_count
+        self.columns = dict(columns or {})
+
+    @classmethod
+    def build(
+        cls, rows: Iterable[tuple[int, str, object]], node_count: int
+    ) -> "AttributeStore":
+        values: dict[str, dict[int, object]] = defaultdict(dict)
+        for node, attribute, value in rows:
+            values[attribute][node] = value
+        columns = {}
+        for attribute, by_node in values.items():
+            ids = np.fromiter(by_node, dtype=np.int64, count=len(by_node))
+            numbers = [_number(v) for v in by_node.values()]
+            is_number = np.array([n is not None for n in numbers], dtype=bool)
+            column = np.full(node_count, np.nan)
+            column[ids[is_number]] = [n for n in numbers if n is not None]
+            number = np.zeros(node_count, dtype=bool)
+            number[ids[is_number]] = True
+            text = None
+            if not is_number.all():
+                texts = np.array([str(v) for v in by_node.values()])
+                text = np.zeros(node_count, dtype=texts.dtype)
+                text[ids] = texts
+            present = np.zeros(node_count, dtype=bool)
+            present[ids] = True
+            columns[attribute] = Column(column, present, number, text)
+        return cls(node_count, columns)
+
+    @classmethod
+    def from_graph(
+        cls, store, rows: Iterable[tuple[str, str, object]]
+    ) -> "AttributeStore":
+        """Store (node name, attribute, value) rows over the ids of a GraphStore."""
+        interned = (
+            (node, attribute, value)
+            for node, attribute, value in (
+                (store.node_id(name), a, v) for name, a, v in rows
+            )
+            if node is not None
+        )
+        return cls.build(interned, store.node_count)
+
+    def __contains__(self, attribute: object) -> bool:
+        return attribute in self.columns
+
+    def column(self, attribute: str) -> Column:
+        if attribute not in self.columns:
+            absent = np.zeros(self.node_count, bool)
+            return Column(np.full(self.node_count, np.nan), absent, absent)
+        return self.columns[attribute]
+
+    def value(self, node: int, attribute: str) -> float | str | None:
+        column = self.columns.get(attribute)
+        if column is None or not column.present[node]:
+            return None
+        if column.number[node]:
+            return column.values[node].item()
+        return column.text[node].item()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.columns.values())
+
+    def report(self) -> str:
+        kinds = ", ".join(
+            f"{name} ({c.kind})" for name, c in sorted(self.columns.items())
+        )
+        return (
+            f"attribute store: {self.node_count} nodes, {kinds or 'no attributes'}, "
+            f"{self.nbytes / 2**20:.1f} MiB"
+        )
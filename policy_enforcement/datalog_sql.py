@@ -0,0 +1,678 @@
+"""Compile generated Datalog rules to SQLite and evaluate them in bulk.
+
+Every predicate p of arity n becomes a table `"p/n"` with columns c0..cn-1
+and a UNIQUE constraint over all of them, so derived facts are sets.  The
+rules are stratified over their strongly connected components; each
+stratum is evaluated with one `INSERT OR IGNORE ... SELECT` per rule.
+
+* a positive body atom is a table in FROM, shared variables become join
+  conditions and constants WHERE filters;
+* `not p(...)` becomes `NOT EXISTS (SELECT 1 FROM "p/n" ...)`;
+* comparisons become WHERE conditions, and `X = expr` with X not yet bound
+  binds X;
+* a linearly recursive predicate is evaluated by one recursive CTE; mutual
+  or non-linear recursion, which SQLite CTEs cannot express, is iterated
+  until no rule adds a row.
+
+Indexes are derived from the compiled rules: for every table and every set
+of columns a rule looks rows up by, a covering index starting with those
+columns is created before evaluation.
+
+    program = SQLProgram.from_text(relationships, actions)
+    program.load("friend", edges)
+    program.run()
+    program.authorize("can_view", [("alice", "doc1"), ("bob", "doc1")])
+"""
+
+import sqlite3
+import time
+from collections import defaultdict
+from typing import Iterable, Iterator, Sequence
+
+from policy_translation.datalog import (
+    BUILTIN_ATOMS,
+    Atom,
+    BinOp,
+    Collection,
+    Comparison,
+    Const,
+    Disjunction,
+    Literal,
+    Rule,
+    Term,
+    Var,
+    parse_program,
+    term_variables,
+)
+
+Predicate = tuple[str, int]
+
+SQL_OPS = {"=": "=", "==": "=", "!=": "<>", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+
+class CompileError(ValueError):
+    pass
+
+
+class StratificationError(ValueError):
+    pass
+
+
+def predicate(atom: Atom) -> Predicate:
+    return atom.name, len(atom.args)
+
+
+def table(pred: Predicate) -> str:
+    name = f"{pred[0]}/{pred[1]}".replace('"', '""')
+    return f'"{name}"'
+
+
+def columns(arity: int) -> list[str]:
+    # A proposition is a one-column table holding 1 when it is true
+    return [f"c{i}" for i in range(max(arity, 1))]
+
+
+def stored(row: Sequence) -> tuple:
+    return tuple(row) or (1,)
+
+
+def constant(term: Const) -> object:
+    text = term.value
+    if text[:1] in ("'", '"'):
+        return text[1:-1]
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def literal_sql(value: object) -> str:
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def sqlite_order(value: object) -> tuple:
+    return (0, value) if isinstance(value, (int, float)) else (1, str(value))
+
+
+def sqlite_number(value: object) -> int | float | None:
+    """Numeric value of `value` in SQLite arithmetic; text that is no number is 0."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+    return 0
+
+
+def expand_disjunctions(rule: Rule) -> list[Rule]:
+    """Equivalent rules without positive disjunctions in their bodies."""
+    rules, done = [rule], []
+    while rules:
+        rule = rules.pop()
+        for i, literal in enumerate(rule.body):
+            if isinstance(literal, Disjunction) and not literal.negated:
+                before, after = rule.body[:i], rule.body[i + 1 :]
+                rules.extend(
+                    Rule(rule.head, before + branch + after)
+                    for branch in literal.branches
+                )
+                break
+        else:
+            done.append(rule)
+    return done[::-1]
+
+
+def body_atoms(
+    body: Iterable[Literal], negated: bool = False
+) -> Iterator[tuple[Atom, bool]]:
+    for literal in body:
+        if isinstance(literal, Atom):
+            if literal.name not in BUILTIN_ATOMS:
+                yield literal, negated or literal.negated
+        elif isinstance(literal, Disjunction):
+            for branch in literal.branches:
+                yield from body_atoms(branch, negated or literal.negated)
+
+
+def stratify(rules: list[Rule]) -> list[list[Predicate]]:
+    """Strongly connected components of the head predicates, dependencies first.
+
+    Raises StratificationError when a predicate depends negatively on its
+    own component.
+    """
+    graph: dict[Predicate, set[tuple[Predicate, bool]]] = defaultdict(set)
+    for rule in rules:
+        head = predicate(rule.head)
+        graph[head] |= {(predicate(a), neg) for a, neg in body_atoms(rule.body)}
+
+    index: dict[Predicate, int] = {}
+    low: dict[Predicate, int] = {}
+    stack: list[Predicate] = []
+    on_stack: set[Predicate] = set()
+    components: list[list[Predicate]] = []
+
+    def visit(node: Predicate) -> None:
+        index[node] = low[node] = len(index)
+        stack.append(node)
+        on_stack.add(node)
+        for target, _ in graph.get(node, ()):
+            if target not in graph:
+                continue  # extensional predicate
+            if target not in index:
+                visit(target)
+                low[node] = min(low[node], low[target])
+            elif target in on_stack:
+                low[node] = min(low[node], index[target])
+        if low[node] == index[node]:
+            component = []
+            while True:
+                member = stack.pop()
+                on_stack.discard(member)
+                component.append(member)
+                if member == node:
+                    break
+            components.append(sorted(component))
+
+    for node in list(graph):
+        if node not in index:
+            visit(node)
+    for component in components:
+        members = set(component)
+        for node in component:
+            for target, negated in graph[node]:
+                if negated and target in members:
+                    raise StratificationError(
+                        f"{node[0]}/{node[1]} depends negatively on "
+                        f"{target[0]}/{target[1]} in a recursive cycle"
+                    )
+    return components
+
+
+class RuleCompiler:
+    """SELECT statement for one rule; `rename` swaps tables for CTE names."""
+
+    def __init__(self, rule: Rule, rename: dict[Predicate, str] | None = None):
+        self.rule = rule
+        self.rename = rename or {}
+        self.bindings: dict[str, str] = {}
+        self.where: list[str] = []
+        self.aliases = 0
+        # (predicate, columns looked up) pairs, for the index advisor
+        self.lookups: list[tuple[Predicate, tuple[int, ...]]] = []
+
+    def table(self, atom: Atom) -> str:
+        pred = predicate(atom)
+        return self.rename.get(pred, table(pred))
+
+    def alias(self) -> str:
+        self.aliases += 1
+        return f"t{self.aliases}"
+
+    def expr(self, term: Term) -> str:
+        if isinstance(term, Var):
+            if term.name not in self.bindings:
+                raise CompileError(f"unsafe rule, variable {term.name} is not bound")
+            return self.bindings[term.name]
+        if isinstance(term, Const):
+            return literal_sql(constant(term))
+        if isinstance(term, BinOp):
+            return f"({self.expr(term.left)} {term.op} {self.expr(term.right)})"
+        raise CompileError(f"collection {term} used as a value")
+
+    def bound(self, term: Term) -> bool:
+        return all(v in self.bindings for v in term_variables(term))
+
+    def match(self, atom: Atom, alias: str, local: bool) -> list[str]:
+        """Conditions tying the columns of `alias` to the atom's arguments.
+
+        Unbound variables are bound to the column; with `local` (inside
+        EXISTS) only for the duration of the subquery.
+        """
+        conditions, lookup, new = [], [], []
+        for i, arg in enumerate(atom.args):
+            column = f"{alias}.c{i}"
+            if isinstance(arg, Var) and arg.name == "_":
+                continue
+            if isinstance(arg, Var) and arg.name not in self.bindings:
+                self.bindings[arg.name] = column
+                new.append(arg.name)
+                continue
+            if not self.bound(arg):
+                raise CompileError(f"argument {arg} of {atom} is not bound")
+            conditions.append(f"{column} = {self.expr(arg)}")
+            lookup.append(i)
+        if local:
+            for name in new:
+                del self.bindings[name]
+        if lookup:
+            self.lookups.append((predicate(atom), tuple(lookup)))
+        return conditions
+
+    def condition(self, literal: Literal) -> str:
+        if isinstance(literal, Atom):
+            if literal.name in BUILTIN_ATOMS:
+                sql = "1" if literal.name == "true" else "0"
+            else:
+                alias = self.alias()
+                saved = dict(self.bindings)
+                # Variables first seen here are existential within the subquery
+                new = [
+                    v
+                    for v in term_variables_of(literal)
+                    if v not in self.bindings and v != "_"
+                ]
+                for i, arg in enumerate(literal.args):
+                    if isinstance(arg, Var) and arg.name in new:
+                        self.bindings.setdefault(arg.name, f"{alias}.c{i}")
+                conditions = []
+                lookup = []
+                for i, arg in enumerate(literal.args):
+                    column = f"{alias}.c{i}"
+                    if isinstance(arg, Var) and (
+                        arg.name == "_" or self.bindings[arg.name] == column
+                    ):
+                        continue
+                    conditions.append(f"{column} = {self.expr(arg)}")
+                    lookup.append(i)
+                self.bindings = saved
+                if lookup:
+                    self.lookups.append((predicate(literal), tuple(lookup)))
+                sql = (
+                    f"EXISTS (SELECT 1 FROM {self.table(literal)} AS {alias}"
+                    f" WHERE {' AND '.join(conditions) or '1'})"
+                )
+        elif isinstance(literal, Comparison):
+            if literal.op == "in":
+                if not isinstance(literal.right, Collection):
+                    raise CompileError(f"'in' needs a literal collection: {literal}")
+                items = ", ".join(self.expr(item) for item in literal.right.items)
+                sql = f"{self.expr(literal.left)} IN ({items})"
+            else:
+                op = SQL_OPS[literal.op]
+                sql = f"{self.expr(literal.left)} {op} {self.expr(literal.right)}"
+        else:
+            branches = [
+                " AND ".join(self.condition(lit) for lit in branch) or "1"
+                for branch in literal.branches
+            ]
+            sql = " OR ".join(f"({branch})" for branch in branches)
+        return f"NOT ({sql})" if literal.negated else sql
+
+    def assignment(self, literal: Literal) -> bool:
+        """Bind X for `X = expr` when expr is bound and X is not."""
+        if not (
+            isinstance(literal, Comparison)
+            and literal.op in ("=", "==")
+            and not literal.negated
+        ):
+            return False
+        for var, value in (
+            (literal.left, literal.right),
+            (literal.right, literal.left),
+        ):
+            if (
+                isinstance(var, Var)
+                and var.name not in self.bindings
+                and self.bound(value)
+            ):
+                self.bindings[var.name] = self.expr(value)
+                return True
+        return False
+
+    def select(self) -> str:
+        froms = []
+        positive = [
+            lit
+            for lit in self.rule.body
+            if isinstance(lit, Atom)
+            and not lit.negated
+            and lit.name not in BUILTIN_ATOMS
+        ]
+        for atom in positive:
+            alias = self.alias()
+            froms.append(f"{self.table(atom)} AS {alias}")
+            self.where += self.match(atom, alias, local=False)
+        rest = [lit for lit in self.rule.body if not any(lit is a for a in positive)]
+        progress = True
+        while progress:
+            progress = False
+            for literal in list(rest):
+                if self.assignment(literal):
+                    rest.remove(literal)
+                    progress = True
+        self.where += [self.condition(literal) for literal in rest]
+        head = [self.expr(arg) for arg in self.rule.head.args]
+        sql = f"SELECT DISTINCT {', '.join(head) or '1'}"
+        if froms:
+            sql += f" FROM {', '.join(froms)}"
+        if self.where:
+            sql += f" WHERE {' AND '.join(self.where)}"
+        return sql
+
+
+def term_variables_of(atom: Atom) -> Iterator[str]:
+    for arg in atom.args:
+        yield from term_variables(arg)
+
+
+def references(rule: Rule, pred: Predicate) -> int:
+    return sum(1 for atom, _ in body_atoms(rule.body) if predicate(atom) == pred)
+
+
+class SQLProgram:
+    """A Datalog program compiled to SQLite over one connection."""
+
+    def __init__(
+        self, rules: Iterable[Rule], connection: sqlite3.Connection | None = None
+    ):
+        self.db = connection or sqlite3.connect(":memory:")
+        self.rules = [r for rule in rules for r in expand_disjunctions(rule)]
+        self.strata = stratify(self.rules)
+        self.arity: dict[Predicate, int] = {}
+        for rule in self.rules:
+            for atom in [rule.head] + [a for a, _ in body_atoms(rule.body)]:
+                self.arity[predicate(atom)] = len(atom.args)
+        self.lookups: dict[Predicate, set[tuple[int, ...]]] = defaultdict(set)
+        self.steps = [self._compile(component) for component in self.strata]
+        for pred in self.arity:
+            cols = ", ".join(columns(pred[1]))
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table(pred)} ({cols}, UNIQUE ({cols}))"
+            )
+        self.timings: dict[str, float] = {}
+
+    @classmethod
+    def from_text(cls, *programs: str, **kwargs) -> "SQLProgram":
+        return cls(
+            [rule for text in programs for rule in parse_program(text)], **kwargs
+        )
+
+    def _select(self, rule: Rule, rename: dict[Predicate, str] | None = None) -> str:
+        compiler = RuleCompiler(rule, rename)
+        sql = compiler.select()
+        for pred, lookup in compiler.lookups:
+            self.lookups[pred].add(lookup)
+        return sql
+
+    def _compile(self, component: list[Predicate]) -> tuple[str, list[str]]:
+        """('once', statements), ('cte', [statement]) or ('fixpoint', statements)."""
+        members = set(component)
+        rules = [r for r in self.rules if predicate(r.head) in members]
+        recursive = [r for r in rules if any(references(r, p) for p in members)]
+        if not recursive:
+            return "once", [
+                f"INSERT OR IGNORE INTO {table(predicate(r.head))} {self._select(r)}"
+                for r in rules
+            ]
+        pred = component[0]
+        if len(component) == 1 and all(references(r, pred) == 1 for r in recursive):
+            name = f'"rec {pred[0]}/{pred[1]}"'
+            cols = ", ".join(columns(pred[1]))
+            base = [f"SELECT * FROM {table(pred)}"] + [
+                self._select(r) for r in rules if r not in recursive
+            ]
+            steps = [self._select(r, {pred: name}) for r in recursive]
+            # UNION (not UNION ALL) keeps cyclic data from recursing forever
+            return "cte", [
+                f"WITH RECURSIVE {name}({cols}) AS ({' UNION '.join(base + steps)}) "
+                f"INSERT OR IGNORE INTO {table(pred)} SELECT * FROM {name}"
+            ]
+        return "fixpoint", [
+            f"INSERT OR IGNORE INTO {table(predicate(r.head))} {self._select(r)}"
+            for r in rules
+        ]
+
+    def script(self) -> str:
+        """The compiled SQL, one statement per line."""
+        lines = [self.index_sql(pred, cols) for pred, cols in self.indexes()]
+        for kind, statements in self.steps:
+            lines.append(f"-- {kind}")
+            lines.extend(f"{s};" for s in statements)
+        return "\n".join(lines)
+
+    def indexes(self) -> list[tuple[Predicate, tuple[int, ...]]]:
+        """Covering indexes for the lookups the rules make.
+
+        The UNIQUE constraint already serves lookups by a prefix of
+        c0..cn-1; other column sets get an index starting with them.
+        """
+        result = []
+        for pred, lookups in sorted(self.lookups.items()):
+            n = pred[1]
+            seen = set()
+            for lookup in sorted(lookups, key=lambda cols: (-len(cols), cols)):
+                key = tuple(sorted(lookup))
+                if key == tuple(range(len(key))):
+                    continue
+                order = key + tuple(i for i in range(n) if i not in key)
+                if any(other[: len(key)] == key for other in seen):
+                    continue
+                seen.add(order)
+                result.append((pred, order))
+        return result
+
+    @staticmethod
+    def index_sql(pred: Predicate, order: tuple[int, ...]) -> str:
+        name = f"{pred[0]}/{pred[1]} by {','.join(map(str, order))}".replace('"', "")
+        cols = ", ".join(f"c{i}" for i in order)
+        return f'CREATE INDEX IF NOT EXISTS "{name}" ON {table(pred)} ({cols});'
+
+    def load(self, name: str, rows: Iterable[Sequence]) -> int:
+        """Insert extensional facts; returns the number of new rows."""
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+        pred = (name, len(first))
+        cols = ", ".join(columns(pred[1]))
+        if pred not in self.arity:
+            self.arity[pred] = pred[1]
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table(pred)} ({cols}, UNIQUE ({cols}))"
+            )
+        marks = ", ".join("?" * max(pred[1], 1))
+        before = self.db.total_changes
+        self.db.executemany(
+            f"INSERT OR IGNORE INTO {table(pred)} VALUES ({marks})",
+            [stored(first)] + [stored(row) for row in rows],
+        )
+        return self.db.total_changes - before
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        for pred, order in self.indexes():
+            self.db.execute(self.index_sql(pred, order))
+        self.db.execute("ANALYZE")
+        self.timings["index"] = time.perf_counter() - start
+        start = time.perf_counter()
+        for kind, statements in self.steps:
+            while True:
+                before = self.db.total_changes
+                for statement in statements:
+                    self.db.execute(statement)
+                if kind != "fixpoint" or self.db.total_changes == before:
+                    break
+        self.db.commit()
+        self.timings["evaluate"] = time.perf_counter() - start
+
+    def query(self, name: str, arity: int) -> set[tuple]:
+        rows = self.db.execute(f"SELECT * FROM {table((name, arity))}")
+        return {row[:arity] for row in rows}
+
+    def authorize(self, name: str, requests: Sequence[Sequence]) -> list[bool]:
+        """Whether each request tuple is a derived `name` fact, in one query."""
+        if not requests:
+            return []
+        n = len(requests[0])
+        if (name, n) not in self.arity:
+            return [False] * len(requests)
+        cols = columns(n)
+        self.db.execute("DROP TABLE IF EXISTS temp.requests")
+        self.db.execute(
+            f"CREATE TEMP TABLE requests (id INTEGER PRIMARY KEY, {', '.join(cols)})"
+        )
+        self.db.executemany(
+            f"INSERT INTO temp.requests VALUES (?, {', '.join('?' * len(cols))})",
+            [(i, *stored(request)) for i, request in enumerate(requests)],
+        )
+        match = " AND ".join(f"a.{c} = r.{c}" for c in cols)
+        allowed = {
+            row[0]
+            for row in self.db.execute(
+                f"SELECT r.id FROM temp.requests AS r WHERE EXISTS "
+                f"(SELECT 1 FROM {table((name, n))} AS a WHERE {match})"
+            )
+        }
+        return [i in allowed for i in range(len(requests))]
+
+    def report(self) -> str:
+        kinds = defaultdict(int)
+        for kind, _ in self.steps:
+            kinds[kind] += 1
+        strata = ", ".join(f"{n} {kind}" for kind, n in sorted(kinds.items()))
+        timing = ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in self.timings.items())
+        return (
+            f"sql program: {len(self.rules)} rules, {len(self.strata)} strata "
+            f"({strata}), {len(self.indexes())} extra indexes"
+            + (f", {timing}" if timing else "")
+        )
+
+
+def evaluate_naive(
+    rules: Iterable[Rule], facts: dict[Predicate, set[tuple]]
+) -> dict[Predicate, set[tuple]]:
+    """Reference bottom-up evaluation in Python: every rule is re-applied to
+    all facts until nothing changes, stratum by stratum."""
+    rules = [r for rule in rules for r in expand_disjunctions(rule)]
+    db: dict[Predicate, set[tuple]] = defaultdict(set)
+    for pred, rows in facts.items():
+        db[pred] |= set(rows)
+
+    def value(term: Term, env: dict) -> object:
+        if isinstance(term, Var):
+            return env[term.name]
+        if isinstance(term, Const):
+            return constant(term)
+        if isinstance(term, BinOp):
+            left = sqlite_number(value(term.left, env))
+            right = sqlite_number(value(term.right, env))
+            if left is None or right is None:
+                return None
+            if term.op == "/":
+                if right == 0:
+                    return None
+                if isinstance(left, int) and isinstance(right, int):
+                    return int(left / right)
+                return left / right
+            return {"+": left + right, "-": left - right, "*": left * right}[term.op]
+        return tuple(value(item, env) for item in term.items)
+
+    def unify(atom: Atom, row: tuple, env: dict) -> dict | None:
+        env = dict(env)
+        for arg, v in zip(atom.args, row):
+            if isinstance(arg, Var):
+                if arg.name == "_":
+                    continue
+                if arg.name in env:
+                    if env[arg.name] != v:
+                        return None
+                else:
+                    env[arg.name] = v
+            elif value(arg, env) != v:
+                return None
+        return env
+
+    def holds(literal: Literal, env: dict) -> bool:
+        if isinstance(literal, Atom):
+            if literal.name in BUILTIN_ATOMS:
+                result = literal.name == "true"
+            else:
+                rows = db.get(predicate(literal), ())
+                result = any(unify(literal, row, env) is not None for row in rows)
+        elif isinstance(literal, Comparison):
+            left = value(literal.left, env)
+            right = value(literal.right, env)
+            if left is None or right is None:
+                result = False  # NULL never compares true
+            elif literal.op in ("=", "=="):
+                result = left == right
+            elif literal.op == "!=":
+                result = left != right
+            elif literal.op == "in":
+                result = left in right
+            else:
+                # SQLite orders every number before every string
+                left, right = sqlite_order(left), sqlite_order(right)
+                result = {
+                    "<": lambda: left < right,
+                    "<=": lambda: left <= right,
+                    ">": lambda: left > right,
+                    ">=": lambda: left >= right,
+                }[literal.op]()
+        else:
+            result = any(
+                all(holds(lit, env) for lit in branch) for branch in literal.branches
+            )
+        return not result if literal.negated else result
+
+    def solutions(body: list[Literal], env: dict) -> Iterator[dict]:
+        if not body:
+            yield env
+            return
+        literal, rest = body[0], body[1:]
+        if (
+            isinstance(literal, Atom)
+            and not literal.negated
+            and literal.name not in BUILTIN_ATOMS
+        ):
+            for row in list(db.get(predicate(literal), ())):
+                bound = unify(literal, row, env)
+                if bound is not None:
+                    yield from solutions(rest, bound)
+            return
+        if isinstance(literal, Comparison) and literal.op in ("=", "=="):
+            for var, other in (
+                (literal.left, literal.right),
+                (literal.right, literal.left),
+            ):
+                if isinstance(var, Var) and var.name not in env and not literal.negated:
+                    yield from solutions(rest, {**env, var.name: value(other, env)})
+                    return
+        if holds(literal, env):
+            yield from solutions(rest, env)
+
+    def ordered(rule: Rule) -> list[Literal]:
+        # Positive atoms bind variables before the conditions use them
+        positive = [
+            lit
+            for lit in rule.body
+            if isinstance(lit, Atom)
+            and not lit.negated
+            and lit.name not in BUILTIN_ATOMS
+        ]
+        return positive + [
+            lit for lit in rule.body if not any(lit is p for p in positive)
+        ]
+
+    for component in stratify(rules):
+        members = set(component)
+        stratum = [(r, ordered(r)) for r in rules if predicate(r.head) in members]
+        changed = True
+        while changed:
+            changed = False
+            for rule, body in stratum:
+                head = predicate(rule.head)
+                derived = {
+                    tuple(value(arg, env) for arg in rule.head.args)
+                    for env in solutions(body, {})
+                }
+                if not derived <= db[head]:
+                    db[head] |= derived
+                    changed = True
+    return db
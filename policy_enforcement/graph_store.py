@@ -0,0 +1,239 @@
+"""On-disk relationship graph opened with memory maps.
+
+A store is a directory of `.npy` arrays plus `meta.json`:
+
+    out_indptr.npy, out_nodes.npy, out_types.npy    outgoing edges (CSR)
+    in_indptr.npy, in_nodes.npy, in_types.npy       incoming edges (CSR)
+    names.bin, name_offsets.npy                      UTF-8 node names
+    name_order.npy                                   node ids sorted by name
+
+`GraphStore.open` maps the arrays read-only, so opening is constant time
+and every process that opens the same store shares the page cache.  Nodes
+are integer ids; `node_id`/`node_name` translate through the intern table.
+`neighbors(id)` follows the `Graph` protocol of path_evaluator and reports
+incoming edges with the inverse marker.
+
+    python -m policy_enforcement.graph_store build edges.csv --output graph/
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from policy_enforcement.policies import INVERSE
+
+ARRAYS = (
+    "out_indptr",
+    "out_nodes",
+    "out_types",
+    "in_indptr",
+    "in_nodes",
+    "in_types",
+    "name_offsets",
+    "name_order",
+)
+EDGE_FIELDS = ("source", "type", "target")
+
+
+def read_edges(
+    path: Path, fields: tuple[str, str, str] = EDGE_FIELDS
+) -> Iterator[tuple[str, str, str]]:
+    """Stream (source, type, target) triples from a CSV (with header) or JSONL file."""
+    path = Path(path)
+    with path.open(encoding="utf-8", newline="") as f:
+        if path.suffix == ".jsonl":
+            for line in f:
+                if line.strip():
+                    edge = json.loads(line)
+                    yield tuple(str(edge[field]) for field in fields)
+        else:
+            for edge in csv.DictReader(f):
+                yield tuple(edge[field] for field in fields)
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, types: np.ndarray, n: int):
+    order = np.argsort(keys, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+    return indptr, values[order], types[order]
+
+
+class GraphStore:
+    """Typed directed graph over CSR arrays (memory-mapped or in memory)."""
+
+    def __init__(
+        self,
+        arrays: dict[str, np.ndarray],
+        names: bytes | np.ndarray,
+        edge_types: list[str],
+    ):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.names = names
+        self.edge_types = list(edge_types)
+        self._forward = self.edge_types
+        self._backward = [t + INVERSE for t in self.edge_types]
+
+    @classmethod
+    def build(
+        cls, edges: Iterable[tuple[str, str, str]], path: Path | None = None
+    ) -> "GraphStore":
+        """Intern and sort an edge list; write it to `path` when given."""
+        node_ids: dict[str, int] = {}
+        type_ids: dict[str, int] = {}
+        sources, targets, types = array("i"), array("i"), array("h")
+        for source, edge_type, target in edges:
+            sources.append(node_ids.setdefault(source, len(node_ids)))
+            targets.append(node_ids.setdefault(target, len(node_ids)))
+            types.append(type_ids.setdefault(edge_type, len(type_ids)))
+        n = len(node_ids)
+        src = np.frombuffer(sources, dtype=np.int32)
+        dst = np.frombuffer(targets, dtype=np.int32)
+        typ = np.frombuffer(types, dtype=np.int16)
+
+        arrays = {}
+        arrays["out_indptr"], arrays["out_nodes"], arrays["out_types"] = _csr(
+            src, dst, typ, n
+        )
+        arrays["in_indptr"], arrays["in_nodes"], arrays["in_types"] = _csr(
+            dst, src, typ, n
+        )
+        encoded = [name.encode("utf-8") for name in node_ids]
+        arrays["name_offsets"] = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=arrays["name_offsets"][1:])
+        arrays["name_order"] = np.array(
+            sorted(range(n), key=encoded.__getitem__), dtype=np.int32
+        )
+        names = b"".join(encoded)
+        del node_ids, encoded
+
+        store = cls(arrays, names, list(type_ids))
+        if path is not None:
+            store.save(path)
+            return cls.open(path)
+        return store
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        (path / "names.bin").write_bytes(bytes(self.names))
+        meta = {
+            "version": 1,
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "edge_types": self.edge_types,
+        }
+        (path / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    @classmethod
+    def open(cls, path: Path) -> "GraphStore":
+        """Map a saved store without reading it into memory."""
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text())
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ARRAYS}
+        names_path = path / "names.bin"
+        names = (
+            np.memmap(names_path, dtype=np.uint8, mode="r")
+            if names_path.stat().st_size
+            else np.zeros(0, dtype=np.uint8)
+        )
+        return cls(arrays, names, meta["edge_types"])
+
+    @property
+    def node_count(self) -> int:
+        return len(self.out_indptr) - 1
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.out_nodes)
+
+    def node_name(self, node: int) -> str:
+        start, end = self.name_offsets[node], self.name_offsets[node + 1]
+        return bytes(self.names[start:end]).decode("utf-8")
+
+    def node_id(self, name: str) -> int | None:
+        """Binary search of the intern table; None for unknown names."""
+        key = name.encode("utf-8")
+        lo, hi = 0, self.node_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            node = int(self.name_order[mid])
+            start, end = self.name_offsets[node], self.name_offsets[node + 1]
+            if bytes(self.names[start:end]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.node_count:
+            node = int(self.name_order[lo])
+            if self.node_name(node) == name:
+                return node
+        return None
+
+    def out_edges(self, node: int) -> tuple[np.ndarray, np.ndarray]:
+        start, end = self.out_indptr[node], self.out_indptr[node + 1]
+        return self.out_nodes[start:end], self.out_types[start:end]
+
+    def in_edges(self, node: int) -> tuple[np.ndarray, np.ndarray]:
+        start, end = self.in_indptr[node], self.in_indptr[node + 1]
+        return self.in_nodes[start:end], self.in_types[start:end]
+
+    def neighbors(self, node: int) -> list[tuple[int, str]]:
+        if not 0 <= node < self.node_count:
+            return []
+        forward, backward = self._forward, self._backward
+        nbrs, types = self.out_edges(node)
+        result = [(n, forward[t]) for n, t in zip(nbrs.tolist(), types.tolist())]
+        nbrs, types = self.in_edges(node)
+        result += [(n, backward[t]) for n, t in zip(nbrs.tolist(), types.tolist())]
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ARRAYS) + len(self.names)
+
+    def report(self) -> str:
+        return (
+            f"graph store: {self.node_count} nodes, {self.edge_count} edges, "
+            f"{len(self.edge_types)} edge types, {self.nbytes / 2**20:.1f} MiB"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="convert a CSV/JSONL edge list")
+    build.add_argument("edges", type=Path)
+    build.add_argument("--output", type=Path, required=True)
+    build.add_argument(
+        "--fields",
+        nargs=3,
+        default=list(EDGE_FIELDS),
+        metavar=("SOURCE", "TYPE", "TARGET"),
+        help="column/key names of the edge list",
+    )
+    info = sub.add_parser("info", help="open a store and print its size")
+    info.add_argument("store", type=Path)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "build":
+        store = GraphStore.build(
+            read_edges(args.edges, tuple(args.fields)), args.output
+        )
+    else:
+        store = GraphStore.open(args.store)
+    print(f"{store.report()} ({time.perf_counter() - start:.3f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
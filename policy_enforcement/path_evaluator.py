@@ -0,0 +1,179 @@
+"""Evaluate many Cheng path specs in one traversal of the relationship graph.
+
+Every spec ("[t1.t2]", h) is expanded into the edge-type sequences it
+accepts (t1.t2 repeated k >= 1 times, at most h edges) and all sequences
+are merged into one trie.  Walking the graph from the requester in step
+with the trie visits each shared prefix such as `friend.friend` once, no
+matter how many policies start with it, and reports every spec whose
+sequence ends on a node.
+
+Graphs only need `neighbors(node)` yielding (neighbor, edge_type), with
+inverse edges reported as "type^{-1}"; `RelationshipGraph` is the in-memory
+implementation.
+"""
+
+from collections import defaultdict
+from typing import Container, Hashable, Iterable, Iterator, Protocol
+
+from policy_enforcement.policies import INVERSE, PathSpec, Policy
+
+Node = Hashable
+
+
+class Graph(Protocol):
+    def neighbors(self, node: Node) -> Iterable[tuple[Node, str]]: ...
+
+
+class RelationshipGraph:
+    """Directed, typed edges; each edge is also traversable as its inverse."""
+
+    def __init__(self, edges: Iterable[tuple[Node, str, Node]] = ()):
+        self.adj: dict[Node, list[tuple[Node, str]]] = defaultdict(list)
+        for source, edge_type, target in edges:
+            self.add_edge(source, edge_type, target)
+
+    def add_edge(self, source: Node, edge_type: str, target: Node) -> None:
+        self.adj[source].append((target, edge_type))
+        self.adj[target].append((source, edge_type + INVERSE))
+
+    def remove_edge(self, source: Node, edge_type: str, target: Node) -> None:
+        self.adj[source].remove((target, edge_type))
+        self.adj[target].remove((source, edge_type + INVERSE))
+
+    def neighbors(self, node: Node) -> list[tuple[Node, str]]:
+        return self.adj.get(node, [])
+
+    @property
+    def edge_types(self) -> set[str]:
+        return {t for edges in self.adj.values() for _, t in edges if INVERSE not in t}
+
+
+def expand(spec: PathSpec) -> Iterator[tuple[str, ...]]:
+    """Edge-type sequences accepted by `spec`."""
+    if not spec.types:
+        return
+    for k in range(1, max(1, spec.hops // len(spec.types)) + 1):
+        yield spec.types * k
+
+
+class PathEvaluator:
+    """Trie automaton over the path specs of a set of policies."""
+
+    def __init__(self, policies: Iterable[Policy] = ()):
+        self.children: list[dict[str, int]] = [{}]
+        self.accepting: list[list[int]] = [[]]
+        self.specs: list[PathSpec] = []
+        self.spec_ids: dict[tuple, int] = {}
+        self.policies: dict[int, tuple[Policy, list[int]]] = {}
+        self.sequence_edges = 0
+        for policy in policies:
+            self.add_policy(policy)
+
+    def _spec_id(self, spec: PathSpec) -> int:
+        key = (spec.types, spec.hops)
+        if key in self.spec_ids:
+            return self.spec_ids[key]
+        spec_id = self.spec_ids[key] = len(self.specs)
+        self.specs.append(PathSpec(spec.types, spec.hops))
+        for sequence in expand(spec):
+            self.sequence_edges += len(sequence)
+            state = 0
+            for edge_type in sequence:
+                nxt = self.children[state].get(edge_type)
+                if nxt is None:
+                    nxt = self.children[state][edge_type] = len(self.children)
+                    self.children.append({})
+                    self.accepting.append([])
+                state = nxt
+            self.accepting[state].append(spec_id)
+        return spec_id
+
+    def add_policy(self, policy: Policy) -> None:
+        self.policies[policy.id] = (policy, [self._spec_id(s) for s in policy.specs])
+
+    @property
+    def sharing(self) -> float:
+        """Edges in the expanded sequences per trie edge (prefix overlap)."""
+        return self.sequence_edges / max(1, len(self.children) - 1)
+
+    def reach(
+        self, graph: Graph, start: Node, targets: Container[Node] | None = None
+    ) -> dict[Node, set[int]]:
+        """Walk from `start` once; map each reached node to the specs ending there.
+
+        With `targets` (e.g. the type candidates of a TypeIndex) only nodes in
+        it are reported, and a walk whose last edge leaves it is not taken.
+        """
+        matched: dict[Node, set[int]] = defaultdict(set)
+        seen = {(start, 0)}
+        frontier = [(start, 0)]
+        while frontier:
+            next_frontier = []
+            for node, state in frontier:
+                children = self.children[state]
+                for neighbor, edge_type in graph.neighbors(node):
+                    nxt = children.get(edge_type)
+                    if nxt is None or (neighbor, nxt) in seen:
+                        continue
+                    hit = targets is None or neighbor in targets
+                    if not (hit or self.children[nxt]):
+                        continue  # the walk can only end here, outside the targets
+                    seen.add((neighbor, nxt))
+                    if hit and self.accepting[nxt]:
+                        matched[neighbor].update(self.accepting[nxt])
+                    if self.children[nxt]:
+                        next_frontier.append((neighbor, nxt))
+            frontier = next_frontier
+        return matched
+
+    def granted(self, matched: set[int]) -> list[Policy]:
+        """Policies whose positive specs all matched and negated ones did not."""
+        return [
+            policy
+            for policy, spec_ids in self.policies.values()
+            if all(
+                (spec_id in matched) != spec.negated
+                for spec, spec_id in zip(policy.specs, spec_ids)
+            )
+        ]
+
+    def evaluate(
+        self, graph: Graph, requester: Node, target: Node, action: str | None = None
+    ) -> list[Policy]:
+        """Policies (for `action`, if given) granting `requester` access to `target`."""
+        matched = self.reach(graph, requester).get(target, set())
+        policies = self.granted(matched)
+        if action is not None:
+            policies = [p for p in policies if p.action == action]
+        return policies
+
+
+def spec_matches(graph: Graph, start: Node, target: Node, spec: PathSpec) -> bool:
+    """Check one spec with its own traversal; the reference for PathEvaluator."""
+    for sequence in expand(spec):
+        frontier = {start}
+        for edge_type in sequence:
+            frontier = {
+                neighbor
+                for node in frontier
+                for neighbor, t in graph.neighbors(node)
+                if t == edge_type
+            }
+            if not frontier:
+                break
+        if target in frontier:
+            return True
+    return False
+
+
+def evaluate_separately(
+    graph: Graph, policies: Iterable[Policy], requester: Node, target: Node
+) -> list[Policy]:
+    return [
+        policy
+        for policy in policies
+        if all(
+            spec_matches(graph, requester, target, spec) != spec.negated
+            for spec in policy.specs
+        )
+    ]
@@ -0,0 +1,344 @@
+"""Local policy decision point (PDP) over HTTP.
+
+The parent process loads the relationship graph (a GraphStore directory)
+and the policy index, copies both into `multiprocessing.shared_memory`
+blocks and forks N workers that accept on one listening socket.  Workers
+attach to the shared blocks without copying the graph, so memory does not
+grow with the worker count.
+
+Each worker collects the checks that arrive during one tick and decides
+them together: checks with the same subject share one traversal of the
+graph by the PathEvaluator trie.
+
+    python -m policy_enforcement.pdp_service --graph graph/ \\
+        --policies policy_index.bin --workers 4 --port 8181
+
+    POST /check {"subject": "alice", "object": "bob", "action": "can_view"}
+    POST /check {"checks": [{"subject": ..., "object": ..., "action": ...}, ...]}
+    -> {"decisions": [{"allowed": true, "policies": [12, 40]}, ...]}
+    GET /health
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+
+import numpy as np
+
+from policy_enforcement.graph_store import ARRAYS, GraphStore
+from policy_enforcement.path_evaluator import PathEvaluator
+from policy_enforcement.policy_index import PolicyIndex
+
+DEFAULT_TICK = 0.002
+MAX_BATCH = 256
+
+
+def share_graph(store: GraphStore) -> tuple[list[SharedMemory], dict]:
+    """Copy the store's arrays into shared memory; return blocks and a spec."""
+    blocks, spec = [], {"arrays": {}, "edge_types": store.edge_types}
+    for name in ARRAYS + ("names",):
+        array = np.asarray(getattr(store, name))
+        if name == "names":
+            array = np.frombuffer(bytes(array), dtype=np.uint8)
+        block = SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+        blocks.append(block)
+        spec["arrays"][name] = (block.name, array.dtype.str, array.shape)
+    return blocks, spec
+
+
+def attach_graph(spec: dict) -> tuple[GraphStore, list[SharedMemory]]:
+    blocks, arrays = [], {}
+    for name, (block_name, dtype, shape) in spec["arrays"].items():
+        block = SharedMemory(name=block_name)
+        blocks.append(block)
+        array = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    names = arrays.pop("names")
+    return GraphStore(arrays, names, spec["edge_types"]), blocks
+
+
+def share_bytes(data: bytes) -> tuple[SharedMemory, tuple[str, int]]:
+    block = SharedMemory(create=True, size=max(1, len(data)))
+    block.buf[: len(data)] = data
+    return block, (block.name, len(data))
+
+
+def parse_checks(body: object) -> list[dict]:
+    """The checks of a request body; ValueError unless each is an object of
+    string fields."""
+    if not isinstance(body, dict):
+        raise ValueError("body must be a JSON object")
+    checks = body["checks"] if "checks" in body else [body]
+    if not isinstance(checks, list):
+        raise ValueError("'checks' must be a list")
+    for check in checks:
+        if not isinstance(check, dict):
+            raise ValueError("each check must be a JSON object")
+        for field in ("subject", "object", "action"):
+            if field in check and not isinstance(check[field], str):
+                raise ValueError(f"'{field}' must be a string")
+    return checks
+
+
+class Decider:
+    """Batches checks per tick and decides them against one graph.
+
+    Request threads call `submit`; a single decision thread drains the
+    queue every `tick` seconds, so the evaluator itself runs without locks.
+    """
+
+    def __init__(self, graph: GraphStore, evaluator: PathEvaluator, tick: float):
+        self.graph = graph
+        self.evaluator = evaluator
+        self.tick = tick
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.batches = 0
+        self.checks = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, checks: list[dict]) -> Future:
+        future = Future()
+        self.queue.put((checks, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.tick
+            while len(batch) < MAX_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._decide(batch)
+            except Exception as e:  # fail this batch, keep deciding the next
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _decide(self, batch: list[tuple[list[dict], Future]]) -> None:
+        self.batches += 1
+        by_subject = defaultdict(list)
+        results = [[None] * len(checks) for checks, _ in batch]
+        for i, (checks, _) in enumerate(batch):
+            for j, check in enumerate(checks):
+                self.checks += 1
+                subject = self.graph.node_id(str(check.get("subject", "")))
+                by_subject[subject].append((i, j, check))
+        for subject, checks in by_subject.items():
+            reached = (
+                {} if subject is None else self.evaluator.reach(self.graph, subject)
+            )
+            for i, j, check in checks:
+                target = self.graph.node_id(str(check.get("object", "")))
+                matched = reached.get(target, set()) if target is not None else set()
+                action = check.get("action")
+                policies = [
+                    p.id
+                    for p in self.evaluator.granted(matched)
+                    if action is None or p.action == action
+                ]
+                results[i][j] = {"allowed": bool(policies), "policies": policies}
+        for (checks, future), decisions in zip(batch, results):
+            future.set_result(decisions)
+
+
+class PDPHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        if self.path != "/health":
+            return self._send(404, {"error": "not found"})
+        decider = self.server.decider
+        self._send(
+            200,
+            {
+                "pid": os.getpid(),
+                "checks": decider.checks,
+                "batches": decider.batches,
+            },
+        )
+
+    def do_POST(self) -> None:
+        if self.path != "/check":
+            return self._send(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            checks = parse_checks(json.loads(self.rfile.read(length) or b"{}"))
+        except ValueError as e:
+            return self._send(400, {"error": f"bad request: {e}"})
+        try:
+            decisions = self.server.decider.submit(checks).result()
+        except Exception as e:
+            return self._send(500, {"error": f"decision failed: {e}"})
+        self._send(200, {"decisions": decisions})
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class PDPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, sock: socket.socket, decider: Decider):
+        super().__init__(("", 0), PDPHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.decider = decider
+
+    def get_request(self):
+        request, address = self.socket.accept()
+        if request.family == socket.AF_INET:
+            request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return request, address or ("unix", 0)
+
+
+def worker_main(sock: socket.socket, graph_spec: dict, policy_spec: tuple, tick: float):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    graph, blocks = attach_graph(graph_spec)
+    block = SharedMemory(name=policy_spec[0])
+    index = PolicyIndex.from_bytes(block.buf[: policy_spec[1]])
+    evaluator = PathEvaluator(index.policies.values())
+    server = PDPServer(sock, Decider(graph, evaluator, tick))
+    server.serve_forever()
+
+
+def listen(
+    host: str = "127.0.0.1", port: int = 8181, unix: str | None = None
+) -> socket.socket:
+    if unix:
+        if os.path.exists(unix):
+            os.unlink(unix)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(unix)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+    sock.listen(1024)
+    return sock
+
+
+class PDPService:
+    """Parent process: owns the shared blocks and the worker processes."""
+
+    def __init__(
+        self,
+        graph_path: Path,
+        policy_index: PolicyIndex,
+        workers: int = 1,
+        host: str = "127.0.0.1",
+        port: int = 8181,
+        unix: str | None = None,
+        tick: float = DEFAULT_TICK,
+    ):
+        self.store = GraphStore.open(graph_path)
+        self.policy_index = policy_index
+        self.workers = workers
+        self.tick = tick
+        self.sock = listen(host, port, unix)
+        self.address = unix or self.sock.getsockname()
+        self.blocks: list[SharedMemory] = []
+        self.processes: list[mp.Process] = []
+
+    def start(self) -> "PDPService":
+        graph_blocks, graph_spec = share_graph(self.store)
+        policy_block, policy_spec = share_bytes(self.policy_index.to_bytes())
+        self.blocks = graph_blocks + [policy_block]
+        context = mp.get_context(
+            "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        )
+        for _ in range(self.workers):
+            process = context.Process(
+                target=worker_main,
+                args=(self.sock, graph_spec, policy_spec, self.tick),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def stop(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.processes.clear()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+        self.sock.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--graph", type=Path, required=True, help="GraphStore directory"
+    )
+    parser.add_argument("--policies", type=Path, default=Path("policy_index.bin"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8181)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument(
+        "--tick", type=float, default=DEFAULT_TICK, help="batch window in seconds"
+    )
+    args = parser.parse_args(argv)
+
+    service = PDPService(
+        args.graph,
+        PolicyIndex.load(args.policies),
+        args.workers,
+        args.host,
+        args.port,
+        args.unix,
+        args.tick,
+    )
+    with service:
+        print(
+            f"PDP listening on {service.address} with {args.workers} workers "
+            f"({service.store.report()}, {len(service.policy_index)} policies)"
+        )
+        # Blocked only now so that the forked workers stay killable
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT, signal.SIGTERM})
+        signal.sigwait({signal.SIGINT, signal.SIGTERM})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Translated ReBAC policies as data.
+
+The Cheng and Crampton translators write their policies as strings, e.g.
+
+    < can_view, (u_a, ("[has_patient.has_data]", 2) ∧ ¬ ("[blocked]", 1)) >
+    has_patient.has_data
+
+This module parses both back into `Policy` objects with one `PathSpec` per
+conjunct, which is what the enforcement side indexes and evaluates.
+"""
+
+import csv
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+INVERSE = "^{-1}"
+MODELS = ("cheng", "crampton")
+
+_CHENG_POLICY = re.compile(r"^<\s*(\w+)\s*,\s*\((\w+)\s*,\s*(.*)\)\s*>$")
+_CHENG_SPEC = re.compile(r'(¬\s*)?\(\s*"\[([^\]]*)\]"\s*,\s*(\d+)\s*\)')
+_RULE_HEAD = re.compile(r"^\s*(\w+)\s*\(")
+
+
+def base_type(edge_type: str) -> str:
+    """Relationship name without the inverse marker."""
+    return edge_type.removesuffix(INVERSE)
+
+
+@dataclass(frozen=True)
+class PathSpec:
+    """Walk of `types` (repeated) of at most `hops` edges; `negated` forbids it."""
+
+    types: tuple[str, ...]
+    hops: int
+    negated: bool = False
+
+    def __str__(self) -> str:
+        spec = f'("[{".".join(self.types)}]", {self.hops})'
+        return f"¬ {spec}" if self.negated else spec
+
+
+@dataclass(frozen=True)
+class Policy:
+    """One translated policy: `action` is granted when every spec holds."""
+
+    id: int
+    model: str
+    action: str
+    specs: tuple[PathSpec, ...]
+    start: str = "u_a"
+    source: str = ""
+    row: int = 0
+
+    @property
+    def edge_types(self) -> set[str]:
+        return {base_type(t) for spec in self.specs for t in spec.types}
+
+    def __str__(self) -> str:
+        if self.model == "crampton":
+            return ".".join(self.specs[0].types)
+        specs = " ∧ ".join(str(spec) for spec in self.specs)
+        return f"< {self.action}, ({self.start}, {specs}) >"
+
+
+def parse_cheng(text: str) -> list[tuple[str, str, tuple[PathSpec, ...]]]:
+    """Parse a Cheng cell into (action, start, specs), one per policy line."""
+    policies = []
+    for line in text.splitlines():
+        match = _CHENG_POLICY.match(line.strip())
+        if not match:
+            continue
+        action, start, body = match.groups()
+        specs = tuple(
+            PathSpec(tuple(path.split(".")) if path else (), int(hops), bool(neg))
+            for neg, path, hops in _CHENG_SPEC.findall(body)
+        )
+        if specs:
+            policies.append((action, start, specs))
+    return policies
+
+
+def parse_crampton(path: str, rule: str) -> tuple[str, tuple[PathSpec, ...]] | None:
+    """Parse a Crampton path; the action is the head of the translated rule."""
+    match = _RULE_HEAD.match(rule)
+    if not path.strip() or not match:
+        return None
+    types = tuple(path.strip().split("."))
+    return match.group(1), (PathSpec(types, len(types)),)
+
+
+def iter_policies(paths: Iterable[Path], first_id: int = 0) -> Iterator[Policy]:
+    """Read policies from translator output CSVs.
+
+    The model is taken from the translator column of each file (`cheng` or
+    `crampton`); files from other translators are skipped.
+    """
+    next_id = first_id
+    for path in paths:
+        path = Path(path)
+        with path.open(encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            model = next((m for m in MODELS if m in (reader.fieldnames or [])), None)
+            if model is None:
+                continue
+            source = f"{model}/{path.stem}"
+            for row_no, row in enumerate(reader):
+                if model == "cheng":
+                    parsed = parse_cheng(row["cheng"])
+                else:
+                    # The rule that was translated; older outputs only
+                    # have the action line it came from
+                    rule = row.get("datalog_unfolded") or row.get("datalog_actions", "")
+                    crampton = parse_crampton(row["crampton"], rule)
+                    parsed = [(crampton[0], "u_a", crampton[1])] if crampton else []
+                for action, start, specs in parsed:
+                    yield Policy(next_id, model, action, specs, start, source, row_no)
+                    next_id += 1
+
+
+def translator_outputs(root: Path = Path("policy_translation/output")) -> list[Path]:
+    return sorted(p for model in MODELS for p in (root / model).glob("*.csv"))
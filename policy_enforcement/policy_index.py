@@ -0,0 +1,269 @@
+"""Inverted index over translated Cheng/Crampton policies.
+
+Postings map an action, an edge type (inverse markers stripped) or a hop
+bucket to the ids of the policies that use it, so candidate policies for a
+request are found with a few dict lookups instead of a scan.  The index is
+stored in a small binary file:
+
+    magic "RBPI", version u16
+    string table    u32 count, then (u16 length, UTF-8 bytes) per string
+    policies        u32 count, then per policy
+                    u8 model, u32 action, u32 start, u32 source, u32 row,
+                    u16 n_specs, u32 id, then per spec u8 negated, u16 hops,
+                    u16 n_types, u32 type ids
+    postings        for actions, edge types and hop buckets in turn:
+                    u32 n_keys, then per key u32 key, u32 n_ids, u32 ids
+
+String ids index the string table and posting lists are sorted.
+
+    python -m policy_enforcement.policy_index build --output policy_index.bin
+    python -m policy_enforcement.policy_index query policy_index.bin --action can_view
+"""
+
+import argparse
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable
+
+from policy_enforcement.policies import (
+    MODELS,
+    PathSpec,
+    Policy,
+    base_type,
+    iter_policies,
+    translator_outputs,
+)
+
+MAGIC = b"RBPI"
+VERSION = 1
+# Hop counts of 1..MAX_HOP_BUCKET-1 get their own bucket, longer ones share one
+MAX_HOP_BUCKET = 4
+
+
+def hop_bucket(hops: int) -> int:
+    return min(hops, MAX_HOP_BUCKET)
+
+
+class PolicyIndex:
+    """Policies with action, edge-type and hop-bucket posting lists."""
+
+    def __init__(self, policies: Iterable[Policy] = ()):
+        self.policies: dict[int, Policy] = {}
+        self.by_action: dict[str, array] = {}
+        self.by_edge_type: dict[str, array] = {}
+        self.by_hops: dict[int, array] = {}
+        for policy in policies:
+            self.policies[policy.id] = policy
+        self._build_postings()
+
+    def _build_postings(self) -> None:
+        by_action = defaultdict(set)
+        by_edge_type = defaultdict(set)
+        by_hops = defaultdict(set)
+        for policy in self.policies.values():
+            by_action[policy.action].add(policy.id)
+            for edge_type in policy.edge_types:
+                by_edge_type[edge_type].add(policy.id)
+            for spec in policy.specs:
+                by_hops[hop_bucket(spec.hops)].add(policy.id)
+        self.by_action = {k: array("I", sorted(v)) for k, v in by_action.items()}
+        self.by_edge_type = {k: array("I", sorted(v)) for k, v in by_edge_type.items()}
+        self.by_hops = {k: array("I", sorted(v)) for k, v in by_hops.items()}
+
+    def __len__(self) -> int:
+        return len(self.policies)
+
+    def lookup(
+        self,
+        action: str | None = None,
+        edge_type: str | None = None,
+        hops: int | None = None,
+    ) -> list[Policy]:
+        """Policies matching every given key; no key returns nothing."""
+        postings = []
+        if action is not None:
+            postings.append(self.by_action.get(action, array("I")))
+        if edge_type is not None:
+            postings.append(self.by_edge_type.get(base_type(edge_type), array("I")))
+        if hops is not None:
+            postings.append(self.by_hops.get(hop_bucket(hops), array("I")))
+        if not postings:
+            return []
+        postings.sort(key=len)
+        ids = postings[0]
+        for other in postings[1:]:
+            ids = [i for i in ids if _contains(other, i)]
+        return [self.policies[i] for i in ids]
+
+    def candidates(self, action: str, edge_types: Iterable[str]) -> list[Policy]:
+        """Policies for `action` that only use edge types in `edge_types`.
+
+        Used to skip policies that cannot match a graph without those types.
+        """
+        available = {base_type(t) for t in edge_types}
+        return [p for p in self.lookup(action=action) if p.edge_types <= available]
+
+    def save(self, path: Path) -> None:
+        Path(path).write_bytes(self.to_bytes())
+
+    def to_bytes(self) -> bytes:
+        strings: dict[str, int] = {}
+
+        def sid(s: str) -> int:
+            return strings.setdefault(s, len(strings))
+
+        body = bytearray()
+        body += struct.pack("<I", len(self.policies))
+        for policy in self.policies.values():
+            body += struct.pack(
+                "<BIIIIH",
+                MODELS.index(policy.model),
+                sid(policy.action),
+                sid(policy.start),
+                sid(policy.source),
+                policy.row,
+                len(policy.specs),
+            )
+            body += struct.pack("<I", policy.id)
+            for spec in policy.specs:
+                body += struct.pack("<BHH", spec.negated, spec.hops, len(spec.types))
+                body += array("I", [sid(t) for t in spec.types]).tobytes()
+        for postings, key_id in (
+            (self.by_action, sid),
+            (self.by_edge_type, sid),
+            (self.by_hops, int),
+        ):
+            body += struct.pack("<I", len(postings))
+            for key, ids in postings.items():
+                body += struct.pack("<II", key_id(key), len(ids))
+                body += ids.tobytes()
+
+        header = bytearray(MAGIC + struct.pack("<HI", VERSION, len(strings)))
+        for s in strings:
+            encoded = s.encode("utf-8")
+            header += struct.pack("<H", len(encoded)) + encoded
+        return bytes(header + body)
+
+    @classmethod
+    def load(cls, path: Path) -> "PolicyIndex":
+        return cls.from_bytes(Path(path).read_bytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes | memoryview) -> "PolicyIndex":
+        data = memoryview(data)
+        if bytes(data[:4]) != MAGIC:
+            raise ValueError("not a policy index")
+        version, n_strings = struct.unpack_from("<HI", data, 4)
+        if version != VERSION:
+            raise ValueError(f"unsupported policy index version {version}")
+        offset = 10
+        strings = []
+        for _ in range(n_strings):
+            (length,) = struct.unpack_from("<H", data, offset)
+            offset += 2
+            strings.append(str(data[offset : offset + length], "utf-8"))
+            offset += length
+
+        def ids(count: int) -> array:
+            nonlocal offset
+            values = array("I")
+            values.frombytes(data[offset : offset + 4 * count])
+            offset += 4 * count
+            return values
+
+        index = cls()
+        (n_policies,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        for _ in range(n_policies):
+            model, action, start, source, row, n_specs, policy_id = struct.unpack_from(
+                "<BIIIIHI", data, offset
+            )
+            offset += struct.calcsize("<BIIIIHI")
+            specs = []
+            for _ in range(n_specs):
+                negated, hops, n_types = struct.unpack_from("<BHH", data, offset)
+                offset += 5
+                types = tuple(strings[t] for t in ids(n_types))
+                specs.append(PathSpec(types, hops, bool(negated)))
+            index.policies[policy_id] = Policy(
+                policy_id,
+                MODELS[model],
+                strings[action],
+                tuple(specs),
+                strings[start],
+                strings[source],
+                row,
+            )
+        for name, key_of in (
+            ("by_action", strings.__getitem__),
+            ("by_edge_type", strings.__getitem__),
+            ("by_hops", int),
+        ):
+            (n_keys,) = struct.unpack_from("<I", data, offset)
+            offset += 4
+            postings = {}
+            for _ in range(n_keys):
+                key, count = struct.unpack_from("<II", data, offset)
+                offset += 8
+                postings[key_of(key)] = ids(count)
+            setattr(index, name, postings)
+        return index
+
+    def report(self) -> str:
+        return (
+            f"policy index: {len(self.policies)} policies, "
+            f"{len(self.by_action)} actions, {len(self.by_edge_type)} edge types, "
+            f"hop buckets {sorted(self.by_hops)}"
+        )
+
+
+def _contains(ids: array, value: int) -> bool:
+    i = bisect_left(ids, value)
+    return i < len(ids) and ids[i] == value
+
+
+def build_index(paths: Iterable[Path] | None = None) -> PolicyIndex:
+    return PolicyIndex(iter_policies(translator_outputs() if paths is None else paths))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="index the Cheng/Crampton outputs")
+    build.add_argument("inputs", nargs="*", type=Path)
+    build.add_argument("--output", type=Path, default=Path("policy_index.bin"))
+    query = sub.add_parser("query", help="look up policies in a saved index")
+    query.add_argument("index", type=Path)
+    query.add_argument("--action")
+    query.add_argument("--edge-type")
+    query.add_argument("--hops", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        index = build_index(args.inputs or None)
+        index.save(args.output)
+        print(index.report())
+        print(f"Saved {args.output} ({args.output.stat().st_size} bytes)")
+        return 0
+
+    start = time.perf_counter()
+    index = PolicyIndex.load(args.index)
+    loaded = time.perf_counter()
+    policies = index.lookup(args.action, args.edge_type, args.hops)
+    done = time.perf_counter()
+    for policy in policies:
+        print(f"{policy.id:6d} {policy.source}:{policy.row}  {policy}")
+    print(
+        f"{len(policies)} policies (load {(loaded - start) * 1000:.1f} ms, "
+        f"lookup {(done - loaded) * 1e6:.0f} µs)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""Comparison pushdown into the path walk of a generated rule.
+
+`plan_rule` turns a rule such as
+
+    can_view(U, R) :- friend(U, F), age(F, A), A >= 18, owns(F, R).
+
+into a walk from the subject to the object over the relationship atoms
+(U -friend-> F -owns-> R).  Binary atoms naming a column of the
+`AttributeStore` (`age(F, A)`) become lookups, and each comparison is
+attached to the first step after which all of its variables are bound,
+here right after `friend`.  `evaluate` walks a `GraphStore` frontier-wise
+with NumPy and applies every check at its step, so branches that fail a
+constraint are dropped before they are expanded further.  With
+`pushdown=False` all checks run after the last step, as an evaluator of
+the translators' output would have to.
+
+Literals the walk cannot express (type guards, negated atoms, atoms off
+the path, comparisons over variables the walk never binds) are kept in
+`PathPlan.residual`; see type_index.py for the type guards.
+"""
+
+import operator
+from collections import deque
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from policy_enforcement.attribute_store import AttributeStore
+from policy_enforcement.datalog_sql import constant
+from policy_enforcement.graph_store import GraphStore
+from policy_enforcement.policies import INVERSE, base_type
+from policy_translation.datalog import (
+    Atom,
+    BinOp,
+    Collection,
+    Comparison,
+    Const,
+    Literal,
+    Rule,
+    Term,
+    Var,
+    literal_variables,
+)
+
+COMPARE = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+ARITHMETIC = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
+
+
+class PlanError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Step:
+    edge_type: str  # inverse edges carry the INVERSE marker
+    source: str
+    target: str
+
+
+@dataclass
+class PathPlan:
+    start: str
+    end: str
+    steps: list[Step]
+    # value variable -> (node variable, attribute)
+    lookups: dict[str, tuple[str, str]] = field(default_factory=dict)
+    # checks[i] runs once i steps are taken (checks[0] on the subject alone)
+    checks: list[list[Comparison]] = field(default_factory=list)
+    residual: list[Literal] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        def checked(i: int) -> str:
+            return f" [{', '.join(map(str, self.checks[i]))}]" if self.checks[i] else ""
+
+        parts = [self.start + checked(0)]
+        for i, step in enumerate(self.steps, 1):
+            parts.append(f"-{step.edge_type}-> {step.target}{checked(i)}")
+        return " ".join(parts)
+
+
+def plan_rule(rule: Rule, attributes: AttributeStore | set[str]) -> PathPlan:
+    """Walk from the first to the last head argument with checks pushed down."""
+    head = [arg for arg in rule.head.args if isinstance(arg, Var)]
+    if len(head) < 2:
+        raise PlanError(f"{rule.head} needs a subject and an object variable")
+    start, end = head[0].name, head[-1].name
+
+    edges: dict[str, list[tuple[str, str, Atom]]] = {}
+    lookups: dict[str, tuple[str, str]] = {}
+    comparisons: list[Comparison] = []
+    residual: list[Literal] = []
+    for literal in rule.body:
+        if isinstance(literal, Comparison):
+            comparisons.append(literal)
+            continue
+        if not (
+            isinstance(literal, Atom)
+            and not literal.negated
+            and len(literal.args) == 2
+            and isinstance(literal.args[0], Var)
+        ):
+            residual.append(literal)
+            continue
+        node, value = literal.args
+        if literal.name in attributes:
+            if not isinstance(value, Var):
+                # `role(U, "doctor")` compares the looked-up value
+                name = f"{literal.name}({node.name})"
+                comparisons.append(Comparison(Var(name), "=", value))
+                value = Var(name)
+            lookups[value.name] = (node.name, literal.name)
+        elif isinstance(value, Var):
+            edges.setdefault(node.name, []).append((literal.name, value.name, literal))
+            edges.setdefault(value.name, []).append(
+                (literal.name + INVERSE, node.name, literal)
+            )
+        else:
+            residual.append(literal)
+
+    # Shortest walk over the relationship atoms
+    previous: dict[str, tuple[str, str, Atom] | None] = {start: None}
+    queue = deque([start])
+    while queue and end not in previous:
+        var = queue.popleft()
+        for edge_type, other, atom in edges.get(var, ()):
+            if other not in previous:
+                previous[other] = (edge_type, var, atom)
+                queue.append(other)
+    if end not in previous:
+        raise PlanError(f"no relationship path from {start} to {end} in {rule}")
+    steps, used, var = [], set(), end
+    while previous[var] is not None:
+        edge_type, source, atom = previous[var]
+        steps.append(Step(edge_type, source, var))
+        used.add(id(atom))
+        var = source
+    steps.reverse()
+    residual += [
+        atom
+        for pairs in edges.values()
+        for _, _, atom in pairs
+        if id(atom) not in used and atom not in residual
+    ]
+
+    bound_at = {start: 0}
+    for i, step in enumerate(steps, 1):
+        bound_at[step.target] = i
+    checks: list[list[Comparison]] = [[] for _ in range(len(steps) + 1)]
+    for comparison in comparisons:
+        nodes = {
+            lookups[v][0] if v in lookups else v for v in literal_variables(comparison)
+        }
+        if nodes <= bound_at.keys():
+            checks[max((bound_at[n] for n in nodes), default=0)].append(comparison)
+        else:
+            residual.append(comparison)
+    return PathPlan(start, end, steps, lookups, checks, residual)
+
+
+class _Frontier:
+    """Bindings of the walk so far, one NumPy column per variable."""
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values())))
+
+    def take(self, rows: np.ndarray) -> "_Frontier":
+        return _Frontier({v: a[rows] for v, a in self.columns.items()})
+
+    def project(self, keep: set[str]) -> "_Frontier":
+        """Drop the variables not in `keep` and the rows that become duplicates."""
+        names = [v for v in self.columns if v in keep]
+        if len(names) == len(self.columns) or not len(self):
+            return _Frontier({v: self.columns[v] for v in names})
+        rows = np.unique(np.stack([self.columns[v] for v in names]), axis=1)
+        return _Frontier(dict(zip(names, rows)))
+
+
+def _operands(term: Term) -> set[str]:
+    """The kinds of operand (number, text) of the constants and arithmetic
+    in `term`."""
+    if isinstance(term, Const):
+        return {"text" if isinstance(constant(term), str) else "number"}
+    if isinstance(term, BinOp):
+        return {"number"} | _operands(term.left) | _operands(term.right)
+    if isinstance(term, Collection):
+        return set().union(*(_operands(item) for item in term.items))
+    return set()
+
+
+def _term(
+    term: Term,
+    frontier: _Frontier,
+    plan: PathPlan,
+    attributes,
+    present,
+    mode: str | None,
+):
+    if isinstance(term, Var):
+        if term.name in plan.lookups:
+            node, attribute = plan.lookups[term.name]
+            column = attributes.column(attribute)
+            ids = frontier.columns[node]
+            if mode == "number" or (mode is None and column.numeric):
+                # Values that are not numbers fail a numeric comparison
+                present &= column.number[ids]
+                return column.values[ids]
+            present &= column.present[ids]
+            return column.values[ids] if column.numeric else column.text[ids]
+        return frontier.columns[term.name]
+    if isinstance(term, Const):
+        return constant(term)
+    if isinstance(term, BinOp):
+        left = _term(term.left, frontier, plan, attributes, present, mode)
+        right = _term(term.right, frontier, plan, attributes, present, mode)
+        return ARITHMETIC[term.op](left, right)
+    return [
+        _term(item, frontier, plan, attributes, present, mode) for item in term.items
+    ]
+
+
+def check_mask(
+    comparison: Comparison,
+    frontier: _Frontier,
+    plan: PathPlan,
+    attributes: AttributeStore,
+) -> np.ndarray:
+    """Rows of `frontier` satisfying `comparison`; missing values fail it.
+
+    Attributes are compared as numbers against numeric constants and
+    arithmetic, as text against text constants, and otherwise as numbers
+    when the attribute has only numbers.
+    """
+    present = np.ones(len(frontier), dtype=bool)
+    operands = _operands(comparison.left) | _operands(comparison.right)
+    mode = operands.pop() if len(operands) == 1 else None
+    try:
+        left = _term(comparison.left, frontier, plan, attributes, present, mode)
+        right = _term(comparison.right, frontier, plan, attributes, present, mode)
+        if comparison.op == "in":
+            if not isinstance(comparison.right, Collection):
+                raise PlanError(f"'in' needs a literal collection: {comparison}")
+            mask = np.isin(left, right)
+        else:
+            mask = np.asarray(COMPARE[comparison.op](left, right), dtype=bool)
+    except TypeError:  # e.g. text compared with a number
+        mask = np.zeros(len(frontier), dtype=bool)
+    mask = np.broadcast_to(mask, present.shape)
+    if comparison.negated:
+        mask = ~mask
+    return mask & present
+
+
+@dataclass
+class WalkStats:
+    expanded: int = 0  # edges scanned
+    rows: int = 0  # partial bindings produced by the steps
+
+
+def _expand(
+    graph: GraphStore, step: Step, frontier: _Frontier, stats: WalkStats
+) -> _Frontier:
+    inverse = step.edge_type.endswith(INVERSE)
+    name = base_type(step.edge_type)
+    if inverse:
+        indptr, nodes, types = graph.in_indptr, graph.in_nodes, graph.in_types
+    else:
+        indptr, nodes, types = graph.out_indptr, graph.out_nodes, graph.out_types
+    sources = frontier.columns[step.source]
+    if name not in graph.edge_types or not len(sources):
+        empty = frontier.take(np.zeros(0, dtype=np.int64))
+        empty.columns[step.target] = np.zeros(0, dtype=np.int64)
+        return empty
+    starts = indptr[sources]
+    counts = indptr[sources + 1] - starts
+    total = int(counts.sum())
+    stats.expanded += total
+    rows = np.repeat(np.arange(len(sources)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    positions = np.repeat(starts, counts) + offsets
+    keep = types[positions] == graph.edge_types.index(name)
+    rows, targets = rows[keep], nodes[positions[keep]].astype(np.int64)
+    frontier = frontier.take(rows)
+    if step.target in frontier.columns:  # the walk closes a cycle
+        frontier = frontier.take(
+            np.flatnonzero(frontier.columns[step.target] == targets)
+        )
+    else:
+        frontier.columns[step.target] = targets
+    stats.rows += len(frontier)
+    return frontier
+
+
+def evaluate(
+    plan: PathPlan,
+    graph: GraphStore,
+    attributes: AttributeStore,
+    requesters,
+    pushdown: bool = True,
+    stats: WalkStats | None = None,
+) -> set[tuple[int, int]]:
+    """(requester, object) node pairs the plan's walk and checks allow.
+
+    The residual literals are not evaluated.
+    """
+    stats = stats if stats is not None else WalkStats()
+    frontier = _Frontier({plan.start: np.unique(np.asarray(requesters, np.int64))})
+    pending = [c for level in plan.checks for c in level]
+
+    def needed(after: int) -> set[str]:
+        later = [c for level in plan.checks[after + 1 :] for c in level]
+        checks = later if pushdown else pending
+        variables = {v for c in checks for v in literal_variables(c)}
+        return (
+            {plan.start, plan.end}
+            | {step.source for step in plan.steps[after:]}
+            | {plan.lookups[v][0] if v in plan.lookups else v for v in variables}
+        )
+
+    def apply(checks: list[Comparison]) -> None:
+        nonlocal frontier
+        for comparison in checks:
+            if not len(frontier):
+                return
+            mask = check_mask(comparison, frontier, plan, attributes)
+            frontier = frontier.take(np.flatnonzero(mask))
+
+    if pushdown:
+        apply(plan.checks[0])
+    for i, step in enumerate(plan.steps, 1):
+        frontier = _expand(graph, step, frontier, stats)
+        if pushdown:
+            apply(plan.checks[i])
+        frontier = frontier.project(needed(i))
+    if not pushdown:
+        apply(pending)
+    return set(
+        zip(frontier.columns[plan.start].tolist(), frontier.columns[plan.end].tolist())
+    )
@@ -0,0 +1,265 @@
+"""Precomputed reachability for the most frequent path sequences.
+
+For an edge-type sequence t1..tn the walk is split at its midpoint m.
+Every node u gets an out-label, the nodes reached from u by t1..tm, and
+every node v an in-label, the nodes from which v is reached by
+t(m+1)..tn.  Then u reaches v by the whole sequence iff the two labels
+intersect, which is a binary search over two short sorted arrays instead of
+a BFS at request time.  Labels are kept in NumPy CSR arrays; edge updates
+recompute only the labels of the nodes whose walks can pass through the
+changed edge and keep them in an overlay until the next `compact()`.
+
+    index = ReachabilityIndex(graph, frequent_specs(policies, top=20))
+    index.matches(graph, requester, target, spec)
+"""
+
+from collections import Counter
+from typing import Hashable, Iterable
+
+import numpy as np
+
+from policy_enforcement.path_evaluator import (
+    Graph,
+    RelationshipGraph,
+    expand,
+    spec_matches,
+)
+from policy_enforcement.policies import INVERSE, PathSpec, Policy
+
+Node = Hashable
+
+# Labels shorter than this in total are intersected as Python sets
+SMALL_LABELS = 64
+
+
+def inverse(edge_type: str) -> str:
+    if edge_type.endswith(INVERSE):
+        return edge_type.removesuffix(INVERSE)
+    return edge_type + INVERSE
+
+
+def reverse_sequence(sequence: tuple[str, ...]) -> tuple[str, ...]:
+    """Sequence that walks `sequence` backwards."""
+    return tuple(inverse(t) for t in reversed(sequence))
+
+
+def walk(graph: Graph, start: Node, sequence: Iterable[str]) -> set[Node]:
+    frontier = {start}
+    for edge_type in sequence:
+        frontier = {
+            neighbor
+            for node in frontier
+            for neighbor, t in graph.neighbors(node)
+            if t == edge_type
+        }
+        if not frontier:
+            break
+    return frontier
+
+
+def frequent_specs(policies: Iterable[Policy], top: int = 20) -> list[PathSpec]:
+    """The `top` positive path specs used by the most policies."""
+    counts = Counter(
+        PathSpec(spec.types, spec.hops)
+        for policy in policies
+        for spec in policy.specs
+        if spec.types
+    )
+    return [spec for spec, _ in counts.most_common(top)]
+
+
+class WalkLabels:
+    """For every node, the sorted ids of the nodes `sequence` leads to."""
+
+    def __init__(self, sequence: tuple[str, ...], node_ids: dict[Node, int]):
+        self.sequence = sequence
+        self.node_ids = node_ids
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.overlay: dict[int, np.ndarray] = {}
+
+    def label_of(self, graph: Graph, node: Node) -> np.ndarray:
+        ids = [
+            self.node_ids.setdefault(n, len(self.node_ids))
+            for n in walk(graph, node, self.sequence)
+        ]
+        return np.array(sorted(ids), dtype=np.int32)
+
+    def build(self, graph: Graph, nodes: list[Node]) -> None:
+        labels = [self.label_of(graph, node) for node in nodes]
+        self.indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum([len(label) for label in labels], out=self.indptr[1:])
+        self.indices = np.concatenate(labels) if labels else np.zeros(0, dtype=np.int32)
+        self.overlay.clear()
+
+    def get(self, node_id: int) -> np.ndarray:
+        label = self.overlay.get(node_id)
+        if label is not None:
+            return label
+        if node_id + 1 >= len(self.indptr):
+            return self.indices[:0]
+        return self.indices[self.indptr[node_id] : self.indptr[node_id + 1]]
+
+    def affected(
+        self, graph: Graph, source: Node, edge_type: str, target: Node
+    ) -> set[Node]:
+        """Nodes whose walk may use the edge source -edge_type-> target."""
+        nodes = set()
+        for i, t in enumerate(self.sequence):
+            # The edge is traversed forwards as edge_type, backwards as its inverse
+            if t == edge_type:
+                nodes |= walk(graph, source, reverse_sequence(self.sequence[:i]))
+            if t == inverse(edge_type):
+                nodes |= walk(graph, target, reverse_sequence(self.sequence[:i]))
+        return nodes
+
+    def refresh(self, graph: Graph, nodes: Iterable[Node]) -> None:
+        for node in nodes:
+            self.overlay[self.node_ids[node]] = self.label_of(graph, node)
+
+    def compact(self, size: int) -> None:
+        labels = [self.get(i) for i in range(size)]
+        self.indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum([len(label) for label in labels], out=self.indptr[1:])
+        self.indices = np.concatenate(labels) if labels else np.zeros(0, dtype=np.int32)
+        self.overlay.clear()
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.indptr.nbytes
+            + self.indices.nbytes
+            + sum(label.nbytes for label in self.overlay.values())
+        )
+
+
+class SequenceLabels:
+    """2-hop labels for one edge-type sequence."""
+
+    def __init__(self, sequence: tuple[str, ...], node_ids: dict[Node, int]):
+        mid = (len(sequence) + 1) // 2
+        self.sequence = sequence
+        self.out = WalkLabels(sequence[:mid], node_ids)
+        # Empty when the sequence has one edge: the in-label of v is v itself
+        self.into = WalkLabels(reverse_sequence(sequence[mid:]), node_ids)
+
+    def parts(self) -> list[WalkLabels]:
+        return [self.out, self.into] if self.into.sequence else [self.out]
+
+    def reaches(self, source_id: int, target_id: int) -> bool:
+        out = self.out.get(source_id)
+        if not len(out):
+            return False
+        if not self.into.sequence:
+            i = out.searchsorted(target_id)
+            return i < len(out) and out[i] == target_id
+        return _intersects(out, self.into.get(target_id))
+
+
+def _intersects(a: np.ndarray, b: np.ndarray) -> bool:
+    if not len(a) or not len(b):
+        return False
+    if len(a) + len(b) <= SMALL_LABELS:
+        # NumPy call overhead dominates for the typical short label
+        return not set(a.tolist()).isdisjoint(b.tolist())
+    if len(a) > len(b):
+        a, b = b, a
+    i = np.searchsorted(b, a)
+    i[i == len(b)] = len(b) - 1
+    return bool((b[i] == a).any())
+
+
+class ReachabilityIndex:
+    """2-hop labels for a chosen set of path specs over one graph.
+
+    Specs that are not indexed fall back to a BFS in `matches`.
+    """
+
+    def __init__(
+        self,
+        graph: RelationshipGraph,
+        specs: Iterable[PathSpec],
+        compact_ratio: float = 0.1,
+    ):
+        self.graph = graph
+        self.compact_ratio = compact_ratio
+        self.node_ids: dict[Node, int] = {}
+        self.sequences: dict[tuple[str, ...], SequenceLabels] = {}
+        self.specs: dict[tuple, list[SequenceLabels]] = {}
+        for spec in specs:
+            labels = []
+            for sequence in expand(spec):
+                if sequence not in self.sequences:
+                    self.sequences[sequence] = SequenceLabels(sequence, self.node_ids)
+                labels.append(self.sequences[sequence])
+            self.specs[(spec.types, spec.hops)] = labels
+        self.build()
+
+    def build(self) -> None:
+        nodes = list(self.graph.adj)
+        for node in nodes:
+            self.node_ids.setdefault(node, len(self.node_ids))
+        nodes = sorted(self.node_ids, key=self.node_ids.__getitem__)
+        for labels in self.sequences.values():
+            for part in labels.parts():
+                part.build(self.graph, nodes)
+
+    def covers(self, spec: PathSpec) -> bool:
+        return (spec.types, spec.hops) in self.specs
+
+    def reaches(self, source: Node, target: Node, spec: PathSpec) -> bool:
+        source_id = self.node_ids.get(source)
+        target_id = self.node_ids.get(target)
+        if source_id is None or target_id is None:
+            return False
+        return any(
+            labels.reaches(source_id, target_id)
+            for labels in self.specs[(spec.types, spec.hops)]
+        )
+
+    def matches(self, graph: Graph, source: Node, target: Node, spec: PathSpec) -> bool:
+        if graph is self.graph and self.covers(spec):
+            return self.reaches(source, target, spec)
+        return spec_matches(graph, source, target, spec)
+
+    def _update(self, source: Node, edge_type: str, target: Node, change) -> None:
+        for node in (source, target):
+            self.node_ids.setdefault(node, len(self.node_ids))
+        parts = [p for labels in self.sequences.values() for p in labels.parts()]
+        # Walks through the edge are found before a removal and after an insertion
+        before = {
+            id(p): p.affected(self.graph, source, edge_type, target) for p in parts
+        }
+        change(source, edge_type, target)
+        for part in parts:
+            nodes = before[id(part)] | part.affected(
+                self.graph, source, edge_type, target
+            )
+            part.refresh(self.graph, nodes)
+        overlay = max((len(p.overlay) for p in parts), default=0)
+        if overlay > self.compact_ratio * len(self.node_ids):
+            self.compact()
+
+    def add_edge(self, source: Node, edge_type: str, target: Node) -> None:
+        self._update(source, edge_type, target, self.graph.add_edge)
+
+    def remove_edge(self, source: Node, edge_type: str, target: Node) -> None:
+        self._update(source, edge_type, target, self.graph.remove_edge)
+
+    def compact(self) -> None:
+        for labels in self.sequences.values():
+            for part in labels.parts():
+                part.compact(len(self.node_ids))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            p.nbytes for labels in self.sequences.values() for p in labels.parts()
+        )
+
+    def report(self) -> str:
+        return (
+            f"reachability index: {len(self.specs)} specs, "
+            f"{len(self.sequences)} sequences, {len(self.node_ids)} nodes, "
+            f"{self.nbytes / 1024:.0f} KiB"
+        )
@@ -0,0 +1,310 @@
+"""Unary type predicates as compressed bitmaps over node ids.
+
+Generated rules guard their variables with unary atoms such as
+`Prescriber(D), Patient(P), Drug(DR)`, which the translators drop.  A
+`TypeIndex` keeps each of them as a `Bitmap` over the integer node ids of a
+`GraphStore`, so the candidates of a variable are computed with a few
+vectorised AND / OR / AND-NOT operations before any traversal:
+
+    types = TypeIndex.from_graph(store, read_types("types.csv"))
+    guards = types.candidates(rule)      # {"D": Bitmap, "P": ..., "DR": ...}
+    evaluator.reach(store, requester, targets=guards["DR"])
+
+`Bitmap` follows the Roaring layout: ids are split by their high 16 bits
+into chunks, and each chunk stores its low 16 bits either as a sorted
+uint16 array (sparse, at most 4096 values) or as a 65536-bit uint64 bitmap
+(dense).
+"""
+
+import csv
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from policy_translation.datalog import Atom, Rule, Var
+
+# A chunk with more values than this is stored as a bitmap
+ARRAY_MAX = 4096
+WORDS = 1024  # uint64 words per bitmap chunk
+
+if hasattr(np, "bitwise_count"):
+
+    def _popcount(words: np.ndarray) -> int:
+        return int(np.bitwise_count(words).sum())
+
+else:  # NumPy < 2.0
+
+    def _popcount(words: np.ndarray) -> int:
+        return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def _words(low: np.ndarray) -> np.ndarray:
+    bits = np.zeros(1 << 16, dtype=bool)
+    bits[low] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _values(chunk: np.ndarray) -> np.ndarray:
+    if chunk.dtype == np.uint16:
+        return chunk
+    bits = np.unpackbits(chunk.view(np.uint8), bitorder="little")
+    return np.flatnonzero(bits).astype(np.uint16)
+
+
+def _test(words: np.ndarray, low: np.ndarray) -> np.ndarray:
+    return (words[low >> 6] >> (low & 63).astype(np.uint64)) & np.uint64(1) == 1
+
+
+def _chunk_len(chunk: np.ndarray) -> int:
+    return len(chunk) if chunk.dtype == np.uint16 else _popcount(chunk)
+
+
+def _normalize(chunk: np.ndarray) -> np.ndarray | None:
+    """The smaller representation of a chunk, None when it is empty."""
+    n = _chunk_len(chunk)
+    if n == 0:
+        return None
+    if chunk.dtype == np.uint16:
+        return _words(chunk) if n > ARRAY_MAX else chunk
+    return _values(chunk) if n <= ARRAY_MAX else chunk
+
+
+def _and(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if a.dtype == np.uint16 and b.dtype == np.uint16:
+        return np.intersect1d(a, b, assume_unique=True)
+    if a.dtype == np.uint16:
+        return a[_test(b, a)]
+    if b.dtype == np.uint16:
+        return b[_test(a, b)]
+    return a & b
+
+
+def _or(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if a.dtype == np.uint16 and b.dtype == np.uint16:
+        return np.union1d(a, b)
+    return (a if a.dtype == np.uint64 else _words(a)) | (
+        b if b.dtype == np.uint64 else _words(b)
+    )
+
+
+def _andnot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if a.dtype == np.uint16:
+        if b.dtype == np.uint16:
+            return np.setdiff1d(a, b, assume_unique=True)
+        return a[~_test(b, a)]
+    return a & ~(b if b.dtype == np.uint64 else _words(b))
+
+
+class Bitmap:
+    """Immutable set of non-negative integer ids below 2**32."""
+
+    __slots__ = ("keys", "chunks", "probe")
+
+    def __init__(self, keys: Iterable[int] = (), chunks: Iterable[np.ndarray] = ()):
+        self.keys = np.asarray(list(keys), dtype=np.uint16)
+        self.chunks = list(chunks)
+        self.probe: bytes | None = None
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int] | np.ndarray) -> "Bitmap":
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        if len(ids) == 0:
+            return cls()
+        high = ids >> 16
+        bounds = np.flatnonzero(np.diff(high)) + 1
+        keys, chunks = [], []
+        for part in np.split(ids, bounds):
+            keys.append(int(part[0] >> 16))
+            chunks.append(_normalize((part & 0xFFFF).astype(np.uint16)))
+        return cls(keys, chunks)
+
+    @classmethod
+    def range(cls, n: int) -> "Bitmap":
+        """All ids in [0, n)."""
+        keys, chunks = [], []
+        for key in range(-(-n // (1 << 16))):
+            size = min(1 << 16, n - (key << 16))
+            words = np.zeros(WORDS, dtype=np.uint64)
+            words[: size // 64] = np.uint64(0xFFFFFFFFFFFFFFFF)
+            if size % 64:
+                words[size // 64] = np.uint64((1 << (size % 64)) - 1)
+            keys.append(key)
+            chunks.append(_normalize(words))
+        return cls(keys, chunks)
+
+    def _combine(self, other: "Bitmap", op, keep_left: bool, keep_right: bool):
+        keys, chunks = [], []
+        i = j = 0
+        while i < len(self.keys) or j < len(other.keys):
+            a = self.keys[i] if i < len(self.keys) else None
+            b = other.keys[j] if j < len(other.keys) else None
+            if b is None or (a is not None and a < b):
+                if keep_left:
+                    keys.append(a)
+                    chunks.append(self.chunks[i])
+                i += 1
+            elif a is None or b < a:
+                if keep_right:
+                    keys.append(b)
+                    chunks.append(other.chunks[j])
+                j += 1
+            else:
+                chunk = _normalize(op(self.chunks[i], other.chunks[j]))
+                if chunk is not None:
+                    keys.append(a)
+                    chunks.append(chunk)
+                i += 1
+                j += 1
+        return Bitmap(keys, chunks)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, _and, False, False)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, _or, True, True)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        return self._combine(other, _andnot, True, False)
+
+    def complement(self, n: int) -> "Bitmap":
+        """Ids in [0, n) not in the bitmap."""
+        return Bitmap.range(n) - self
+
+    def _dense(self) -> bytes:
+        # Probing a plain bit string is much faster than searching the chunks
+        ids = self.to_array()
+        bits = np.zeros(int(ids[-1]) + 1 if len(ids) else 0, dtype=bool)
+        bits[ids] = True
+        self.probe = np.packbits(bits, bitorder="little").tobytes()
+        return self.probe
+
+    def __contains__(self, node: object) -> bool:
+        probe = self.probe if self.probe is not None else self._dense()
+        try:
+            return node >= 0 and probe[node >> 3] >> (node & 7) & 1 == 1
+        except (IndexError, TypeError):
+            return False
+
+    def __len__(self) -> int:
+        return sum(_chunk_len(chunk) for chunk in self.chunks)
+
+    def __bool__(self) -> bool:
+        return bool(self.chunks)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Bitmap):
+            return NotImplemented
+        return np.array_equal(self.keys, other.keys) and all(
+            np.array_equal(a, b) for a, b in zip(self.chunks, other.chunks)
+        )
+
+    def to_array(self) -> np.ndarray:
+        parts = [
+            (int(key) << 16) + _values(chunk).astype(np.int64)
+            for key, chunk in zip(self.keys, self.chunks)
+        ]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.to_array().tolist())
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + sum(chunk.nbytes for chunk in self.chunks)
+
+    def __repr__(self) -> str:
+        return f"Bitmap({len(self)} ids, {len(self.chunks)} chunks)"
+
+
+def read_types(path: Path) -> Iterator[tuple[str, str]]:
+    """(node, type) pairs from a CSV with `node,type` columns."""
+    with Path(path).open(encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield row["node"], row["type"]
+
+
+def unary_guards(rule: Rule) -> dict[str, tuple[list[str], list[str]]]:
+    """Per variable, the unary predicates the rule body requires and forbids."""
+    guards: dict[str, tuple[list[str], list[str]]] = {}
+    for literal in rule.body:
+        if not (
+            isinstance(literal, Atom)
+            and len(literal.args) == 1
+            and isinstance(literal.args[0], Var)
+            and literal.args[0].name != "_"
+        ):
+            continue
+        required, forbidden = guards.setdefault(literal.args[0].name, ([], []))
+        (forbidden if literal.negated else required).append(literal.name)
+    return guards
+
+
+class TypeIndex:
+    """One bitmap per unary predicate over node ids 0..node_count-1."""
+
+    def __init__(self, node_count: int, bitmaps: dict[str, Bitmap] | None = None):
+        self.node_count = node_count
+        self.bitmaps = dict(bitmaps or {})
+
+    @classmethod
+    def build(cls, facts: Iterable[tuple[int, str]], node_count: int) -> "TypeIndex":
+        ids: dict[str, list[int]] = defaultdict(list)
+        for node, type_name in facts:
+            ids[type_name].append(node)
+        return cls(node_count, {t: Bitmap.from_ids(v) for t, v in ids.items()})
+
+    @classmethod
+    def from_graph(cls, store, facts: Iterable[tuple[str, str]]) -> "TypeIndex":
+        """Index (node name, type) facts over the ids of a GraphStore."""
+        interned = (
+            (node, type_name)
+            for node, type_name in ((store.node_id(n), t) for n, t in facts)
+            if node is not None
+        )
+        return cls.build(interned, store.node_count)
+
+    def __getitem__(self, type_name: str) -> Bitmap:
+        return self.bitmaps.get(type_name) or Bitmap()
+
+    def select(
+        self, required: Iterable[str] = (), forbidden: Iterable[str] = ()
+    ) -> Bitmap:
+        """Nodes of every `required` type and of no `forbidden` type."""
+        required = sorted(required, key=lambda t: len(self[t]))
+        if required:
+            result = self[required[0]]
+            for type_name in required[1:]:
+                if not result:
+                    break
+                result = result & self[type_name]
+        else:
+            result = Bitmap.range(self.node_count)
+        for type_name in forbidden:
+            result = result - self[type_name]
+        return result
+
+    def any_of(self, types: Iterable[str]) -> Bitmap:
+        result = Bitmap()
+        for type_name in types:
+            result = result | self[type_name]
+        return result
+
+    def candidates(self, rule: Rule) -> dict[str, Bitmap]:
+        """Nodes each type-guarded variable of `rule` may be bound to."""
+        return {
+            var: self.select(required, forbidden)
+            for var, (required, forbidden) in unary_guards(rule).items()
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bitmap.nbytes for bitmap in self.bitmaps.values())
+
+    def report(self) -> str:
+        facts = sum(len(bitmap) for bitmap in self.bitmaps.values())
+        return (
+            f"type index: {len(self.bitmaps)} types, {facts} facts over "
+            f"{self.node_count} nodes, {self.nbytes / 1024:.1f} KiB"
+        )
@@ -0,0 +1,151 @@
+"""Local pre-filter that keeps non-policy sentences away from the LLM.
+
+A logistic regression over hashed word uni-/bigrams and character
+trigrams, trained with NumPy on the LitroACP policy sentences (data_acp)
+against the non-policy ones (data_non).  Training takes about a second, so
+the model is fitted on first use instead of being shipped as a file.
+"""
+
+import json
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+ACP_DIR = Path("datasets/litroacp/data_acp")
+NON_ACP_DIR = Path("datasets/litroacp/data_non")
+
+_WORD = re.compile(r"[a-z0-9]+|[^\sa-z0-9]")
+
+
+def load_corpus(
+    acp_dir: Path = ACP_DIR, non_acp_dir: Path = NON_ACP_DIR
+) -> tuple[list[str], np.ndarray]:
+    """Return (texts, labels) with label 1 for policies and 0 for the rest."""
+    texts, labels = [], []
+    for directory, label in ((acp_dir, 1), (non_acp_dir, 0)):
+        for path in sorted(Path(directory).glob("*.jsonl")):
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        texts.append(json.loads(line).get("text", "") or "")
+                        labels.append(label)
+    return texts, np.array(labels, dtype=np.float64)
+
+
+class ACPFilter:
+    """Hashed n-gram logistic regression: is this sentence an access policy?
+
+    `threshold` trades recall for avoided calls; the default leans towards
+    letting doubtful sentences through, since a missed policy is worse than
+    one wasted request.
+    """
+
+    def __init__(self, n_features: int = 2**16, threshold: float = 0.3):
+        self.n_features = n_features
+        self.threshold = threshold
+        self.weights = np.zeros(n_features)
+        self.bias = 0.0
+        self.checked = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def features(self, text: str) -> np.ndarray:
+        text = text.lower()
+        words = _WORD.findall(text)
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        padded = f" {' '.join(words)} "
+        grams += [f"#{padded[i : i + 3]}" for i in range(len(padded) - 2)]
+        return np.unique(
+            np.fromiter(
+                (zlib.crc32(g.encode()) % self.n_features for g in grams),
+                dtype=np.int64,
+                count=len(grams),
+            )
+        )
+
+    def _matrix(self, texts: Iterable[str]) -> tuple[np.ndarray, np.ndarray]:
+        rows, cols = [], []
+        for i, text in enumerate(texts):
+            idx = self.features(text)
+            rows.append(np.full(len(idx), i))
+            cols.append(idx)
+        if not cols:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def fit(
+        self,
+        texts: list[str],
+        labels: np.ndarray,
+        epochs: int = 300,
+        learning_rate: float = 5.0,
+        l2: float = 1e-4,
+    ) -> "ACPFilter":
+        """Full-batch gradient descent on the class-balanced log loss."""
+        rows, cols = self._matrix(texts)
+        n = len(texts)
+        # Binary features scaled by 1/sqrt(count) so long sentences do not
+        # dominate the logit
+        counts = np.bincount(rows, minlength=n)
+        values = 1 / np.sqrt(counts[rows])
+        sample_weight = np.where(
+            labels == 1, n / (2 * labels.sum()), n / (2 * (n - labels.sum()))
+        )
+        self.weights = np.zeros(self.n_features)
+        self.bias = 0.0
+        for _ in range(epochs):
+            logits = np.bincount(rows, self.weights[cols] * values, n) + self.bias
+            error = (1 / (1 + np.exp(-logits)) - labels) * sample_weight / n
+            grad = np.bincount(cols, error[rows] * values, self.n_features)
+            self.weights -= learning_rate * (grad + l2 * self.weights)
+            self.bias -= learning_rate * error.sum()
+        return self
+
+    def probability(self, text: str) -> float:
+        idx = self.features(text)
+        if not len(idx):
+            return 0.0
+        logit = self.weights[idx].sum() / np.sqrt(len(idx)) + self.bias
+        return float(1 / (1 + np.exp(-logit)))
+
+    def predict_proba(self, texts: list[str]) -> np.ndarray:
+        return np.array([self.probability(text) for text in texts])
+
+    def is_policy(self, text: str) -> bool:
+        keep = self.probability(text) >= self.threshold
+        with self.lock:
+            self.checked += 1
+            self.skipped += not keep
+        return keep
+
+    def save(self, path: Path) -> None:
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            threshold=self.threshold,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "ACPFilter":
+        data = np.load(path)
+        model = cls(n_features=len(data["weights"]), threshold=float(data["threshold"]))
+        model.weights = data["weights"]
+        model.bias = float(data["bias"])
+        return model
+
+    def report(self) -> str:
+        share = self.skipped / self.checked if self.checked else 0.0
+        return (
+            f"acp filter: {self.skipped}/{self.checked} statements skipped as "
+            f"non-policy ({share:.1%} LLM calls avoided, threshold {self.threshold})"
+        )
+
+
+def train_filter(threshold: float = 0.3) -> ACPFilter:
+    texts, labels = load_corpus()
+    return ACPFilter(threshold=threshold).fit(texts, labels)
@@ -0,0 +1,322 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Iterator
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+OLLAMA_BASE_URL = "http://localhost:11434"
+LLAMACPP_BASE_URL = "http://localhost:8080"
+
+
+class BackendError(Exception):
+    """Provider failure normalised across backends.
+
+    `status` is the HTTP status code, or None for timeouts and connection
+    errors; `retry_after` is the server's Retry-After hint in seconds.
+    """
+
+    def __init__(
+        self, message: str, status: int | None = None, retry_after: float | None = None
+    ):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self) -> bool:
+        return self.status == 429
+
+    @property
+    def retryable(self) -> bool:
+        return (
+            self.status is None or self.status in (408, 409, 429) or self.status >= 500
+        )
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class GenerationBackend:
+    """Chat-completion provider used by the policy generation scripts.
+
+    Subclasses implement `stream` (or `complete`); `complete_many` fans the
+    prompts out over `num_parallel` threads and yields results in input order.
+    """
+
+    name = "base"
+
+    def __init__(
+        self, model: str, num_parallel: int = 1, temperature: float | None = None
+    ):
+        self.model = model
+        self.num_parallel = max(1, num_parallel)
+        self.temperature = temperature
+
+    def stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        yield self.complete(system_prompt, user_prompt)
+
+    def complete(self, system_prompt: str, user_prompt: str) -> str:
+        return "".join(self.stream(system_prompt, user_prompt))
+
+    def complete_many(
+        self,
+        system_prompt: str,
+        user_prompts: Iterable[str],
+        return_exceptions: bool = False,
+    ) -> Iterator[str | Exception]:
+        """Yield one response per prompt, in order.
+
+        With `return_exceptions` a failed prompt yields its exception instead
+        of aborting the remaining ones.
+        """
+
+        def call(prompt: str) -> str | Exception:
+            try:
+                return self.complete(system_prompt, prompt)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        if self.num_parallel == 1:
+            yield from map(call, user_prompts)
+            return
+        with ThreadPoolExecutor(max_workers=self.num_parallel) as pool:
+            yield from pool.map(call, user_prompts)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class OpenAIBackend(GenerationBackend):
+    """Remote OpenAI-compatible API (DeepSeek by default)."""
+
+    name = "deepseek"
+
+    def __init__(
+        self,
+        model: str = "deepseek-chat",
+        base_url: str = DEEPSEEK_BASE_URL,
+        api_key: str | None = None,
+        num_parallel: int = 1,
+        temperature: float | None = None,
+    ):
+        super().__init__(model, num_parallel, temperature)
+        import openai
+
+        if api_key is None:
+            from dotenv import load_dotenv
+
+            if not load_dotenv(dotenv_path=".env"):
+                raise RuntimeError(".env file NOT found!")
+            api_key = os.getenv("DEEPSEEK_API_KEY")
+        if not api_key:
+            raise RuntimeError("DEEPSEEK_API_KEY is not set")
+
+        self.openai = openai
+        # Retries are handled by ResilientBackend, not by the SDK
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+    def complete(self, system_prompt: str, user_prompt: str) -> str:
+        extra = {} if self.temperature is None else {"temperature": self.temperature}
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format={"type": "json_object"},
+                **extra,
+            )
+        except self.openai.APIStatusError as e:
+            retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+            raise BackendError(str(e), e.status_code, retry_after) from e
+        except (self.openai.APITimeoutError, self.openai.APIConnectionError) as e:
+            raise BackendError(str(e)) from e
+        return response.choices[0].message.content or "{}"
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class LocalBackend(GenerationBackend):
+    """Local Ollama or llama.cpp server through its OpenAI-compatible endpoint.
+
+    A single keep-alive `httpx.Client` is shared by all worker threads, so up
+    to `num_parallel` requests are in flight over reused connections.  The
+    server must be allowed to decode that many sequences at once
+    (`OLLAMA_NUM_PARALLEL` for Ollama, `--parallel` for llama-server).
+    Responses are read as server-sent events and yielded chunk by chunk.
+    """
+
+    name = "ollama"
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str = OLLAMA_BASE_URL,
+        num_parallel: int = 4,
+        temperature: float = 0,
+        timeout: float = 600,
+    ):
+        super().__init__(model, num_parallel, temperature)
+        import httpx
+
+        self.httpx = httpx
+        self.client = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            timeout=httpx.Timeout(timeout, connect=10),
+            limits=httpx.Limits(
+                max_connections=self.num_parallel,
+                max_keepalive_connections=self.num_parallel,
+                keepalive_expiry=300,
+            ),
+        )
+
+    def stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": self.temperature,
+            "stream": True,
+        }
+        try:
+            with self.client.stream("POST", "/v1/chat/completions", json=payload) as r:
+                if r.status_code >= 400:
+                    r.read()
+                    raise BackendError(
+                        f"{r.status_code} {r.text[:200]}",
+                        r.status_code,
+                        parse_retry_after(r.headers.get("retry-after")),
+                    )
+                for line in r.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:") :].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    chunk = choices[0].get("delta", {}).get("content")
+                    if chunk:
+                        yield chunk
+        except self.httpx.TransportError as e:
+            raise BackendError(f"{type(e).__name__}: {e}") from e
+
+    def complete(self, system_prompt: str, user_prompt: str) -> str:
+        return "".join(self.stream(system_prompt, user_prompt)) or "{}"
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def make_backend(
+    name: str | None = None, resilient: bool = True, **kwargs
+) -> GenerationBackend:
+    """Build a backend from `name` or the GENERATION_BACKEND env variable.
+
+    GENERATION_MODEL, GENERATION_BASE_URL and GENERATION_NUM_PARALLEL override
+    the defaults of the selected backend.  Unless `resilient` is False the
+    backend is wrapped with retries, adaptive concurrency and a circuit
+    breaker.  GENERATION_TPM / GENERATION_RPM pace the requests to the
+    provider's tokens- and requests-per-minute allowance.
+
+    GENERATION_ENDPOINTS, a comma-separated list of backend names or URLs of
+    OpenAI-compatible servers, balances and hedges requests over several
+    endpoints (see multi_endpoint.py); GENERATION_HEDGE_PERCENTILE sets
+    when a slow request is duplicated ("off" disables hedging).
+    """
+    endpoints = [e.strip() for e in os.getenv("GENERATION_ENDPOINTS", "").split(",")]
+    if name is None and any(endpoints):
+        from policy_generation.multi_endpoint import MultiEndpointBackend
+
+        percentile = os.getenv("GENERATION_HEDGE_PERCENTILE", "95")
+        backend = MultiEndpointBackend(
+            [_make_endpoint(e, **kwargs) for e in endpoints if e],
+            hedge_percentile=None if percentile == "off" else float(percentile),
+        )
+    else:
+        backend = _make_raw_backend(name, **kwargs)
+    if os.getenv("GENERATION_TPM") or os.getenv("GENERATION_RPM"):
+        from policy_generation.scheduler import PacedBackend, budget_from_env
+
+        backend = PacedBackend(backend, budget_from_env())
+    if not resilient:
+        return backend
+    from policy_generation.resilience import ResilientBackend
+
+    return ResilientBackend(backend)
+
+
+def _make_raw_backend(name: str | None = None, **kwargs) -> GenerationBackend:
+    name = (name or os.getenv("GENERATION_BACKEND", "deepseek")).lower()
+    if os.getenv("GENERATION_MODEL"):
+        kwargs.setdefault("model", os.environ["GENERATION_MODEL"])
+    if os.getenv("GENERATION_BASE_URL"):
+        kwargs.setdefault("base_url", os.environ["GENERATION_BASE_URL"])
+    if os.getenv("GENERATION_NUM_PARALLEL"):
+        kwargs.setdefault("num_parallel", int(os.environ["GENERATION_NUM_PARALLEL"]))
+
+    if name == "deepseek":
+        return OpenAIBackend(**kwargs)
+    if name == "ollama":
+        kwargs.setdefault("model", "deepseek-v3.1:671b-cloud")
+        return LocalBackend(**kwargs)
+    if name in ("llamacpp", "llama.cpp"):
+        kwargs.setdefault("model", "local")
+        kwargs.setdefault("base_url", LLAMACPP_BASE_URL)
+        backend = LocalBackend(**kwargs)
+        backend.name = "llamacpp"
+        return backend
+    raise ValueError(f"Unknown generation backend: {name}")
+
+
+def _make_endpoint(spec: str, **kwargs) -> GenerationBackend:
+    if "://" not in spec:
+        return _make_raw_backend(spec, **kwargs)
+    backend = _make_raw_backend("llamacpp", base_url=spec, **kwargs)
+    backend.name = "openai-compatible"
+    return backend
+
+
+class Throughput:
+    """Wall-clock rows/s counter printed at the end of each dataset."""
+
+    def __init__(self, backend: GenerationBackend):
+        self.backend = backend
+        self.start = time.perf_counter()
+        self.rows = 0
+
+    def add(self, n: int = 1) -> None:
+        self.rows += n
+
+    def report(self, name: str) -> str:
+        elapsed = time.perf_counter() - self.start
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        return (
+            f"{name}: {self.rows} rows in {elapsed:.1f}s "
+            f"({rate:.2f} rows/s, backend={self.backend.name}, "
+            f"num_parallel={self.backend.num_parallel})"
+        )
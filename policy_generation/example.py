@@ -1,60 +1,18 @@
 import json
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
-from pathlib import Path
 
-
-API_KEY: str | None | RuntimeError = (
-    os.getenv("DEEPSEEK_API_KEY")
-    if load_dotenv(dotenv_path=".env")
-    else RuntimeError(".env file NOT found!")
-)
-
-# For type checking
-assert isinstance(API_KEY, str)
-
-client = OpenAI(
-    api_key=API_KEY,
-    base_url="https://api.deepseek.com",
-)
+from policy_generation.xacml import translate2datalog
+from policy_generation.validation import DATALOG_FIELDS
 
 
 def translate_statement(text: str) -> dict[str, str]:
-    system_prompt_path = Path(
-        "policy_generation/input/prompts/system_prompt_for_xacml.txt"
-    )
-    system_prompt = system_prompt_path.read_text(encoding="utf-8")
     if not text.strip():
-        return {
-            "datalog_subjects": "",
-            "datalog_objects": "",
-            "datalog_relationships": "",
-            "datalog_actions": "",
-        }
-
-    response = client.chat.completions.create(
-        model="deepseek-chat",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": text},
-        ],
-        response_format={"type": "json_object"},
-    )
-
-    content = response.choices[0].message.content or "{}"
-    parsed = json.loads(content)
+        return dict.fromkeys(DATALOG_FIELDS, "")
 
-    return {
-        "datalog_subjects": parsed.get("datalog_subjects", ""),
-        "datalog_objects": parsed.get("datalog_objects", ""),
-        "datalog_relationships": parsed.get("datalog_relationships", ""),
-        "datalog_actions": parsed.get("datalog_actions", ""),
-    }
+    return translate2datalog(text)
 
 
-output = translate_statement(
-    """
+if __name__ == "__main__":
+    output = translate_statement("""
     <?xml version="1.0" encoding="UTF-8"?>
     <Policy xmlns="urn:oasis:names:tc:xacml:3.0:core:schema:wd-17" PolicyId="medi-xpath-test-policy" RuleCombiningAlgId="urn:oasis:names:tc:xacml:1.0:rule-combining-algorithm:first-applicable" Version="1.0">
     <Description>XPath evaluation is done with respect to content elementand check for a matching value. Here content element has been bounded with custom namespace and prefix</Description>
@@ -87,6 +45,5 @@ output = translate_statement(
         <Description>Deny rule</Description>
     </Rule>
     </Policy>
-    """
-)
-print(json.dumps(output, indent=2))
+    """)
+    print(json.dumps(output, indent=2))
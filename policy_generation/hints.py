@@ -0,0 +1,45 @@
+"""Structured hints built from the LitroACP span annotations.
+
+The annotations already say which words are the subject, action, resource,
+condition and purpose of a statement.  Passing them to the model lets the
+annotated system prompt drop the worked example and the echo of the input,
+which shortens both the request and the response.
+"""
+
+from policy_generation.ingest import Record
+
+# Order in which labels are listed in the hint
+LABELS = ("Subject", "Action", "Resource", "Condition", "Purpose")
+
+
+def build_hint(record: Record) -> str:
+    """Return one "Label: span; span" line per annotated label, or ""."""
+    spans: dict[str, list[str]] = {}
+    for label, span in record.labelled_spans():
+        span = " ".join(span.split())
+        if span and span not in spans.setdefault(label, []):
+            spans[label].append(span)
+
+    lines = [
+        f"{label}: {'; '.join(spans.pop(label))}" for label in LABELS if label in spans
+    ]
+    lines += [
+        f"{label}: {'; '.join(values)}" for label, values in sorted(spans.items())
+    ]
+
+    by_id = {e.get("id"): e for e in record.entities}
+    for relation in record.relations:
+        source = by_id.get(relation.get("from_id"))
+        target = by_id.get(relation.get("to_id"))
+        if source is None or target is None:
+            continue
+        lines.append(
+            f"Relation: {relation.get('type', 'related')}("
+            f"{record.text[source['start_offset'] : source['end_offset']]}, "
+            f"{record.text[target['start_offset'] : target['end_offset']]})"
+        )
+    return "\n".join(lines)
+
+
+def annotated_prompt(text: str, hint: str) -> str:
+    return f"STATEMENT: {text}\nHINT:\n{hint}"
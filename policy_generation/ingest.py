@@ -0,0 +1,119 @@
+"""Lazy ingestion of LitroACP JSONL files.
+
+Records are read one line at a time and handed to the generation engine
+through a bounded window of in-flight requests, and translated rows are
+written to the CSV as soon as they are ready, so memory does not grow with
+the size of the corpus.
+"""
+
+import csv
+import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from policy_generation.validation import DATALOG_FIELDS
+
+TEXT_FIELD = "natural_language_statements"
+ANNOTATION_FIELDS = ("entities", "relations")
+
+
+@dataclass
+class Record:
+    """One annotated statement; `entities`/`relations` are the span labels."""
+
+    text: str
+    id: int | None = None
+    source: str = ""
+    line: int = 0
+    entities: list[dict] = field(default_factory=list)
+    relations: list[dict] = field(default_factory=list)
+
+    def labelled_spans(self) -> list[tuple[str, str]]:
+        """Return (label, surface text) for each entity annotation."""
+        return [
+            (e.get("label", ""), self.text[e["start_offset"] : e["end_offset"]])
+            for e in self.entities
+            if "start_offset" in e and "end_offset" in e
+        ]
+
+
+def iter_records(paths: Iterable[Path]) -> Iterator[Record]:
+    """Stream the records of any number of JSONL files, skipping blank lines."""
+    for path in paths:
+        path = Path(path)
+        with path.open(encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                obj = json.loads(line)
+                yield Record(
+                    text=obj.get("text", "") or "",
+                    id=obj.get("id"),
+                    source=path.stem,
+                    line=line_no,
+                    entities=obj.get("entities") or [],
+                    relations=obj.get("relations") or [],
+                )
+
+
+def bounded_map(
+    fn: Callable[[Record], dict[str, str]],
+    records: Iterable[Record],
+    max_workers: int,
+    max_in_flight: int | None = None,
+) -> Iterator[tuple[Record, dict[str, str] | Exception]]:
+    """Apply `fn` to each record on a thread pool, yielding results in order.
+
+    At most `max_in_flight` records (default twice the worker count) are
+    pulled from `records` ahead of the consumer; a slow writer or backend
+    therefore stalls the reader instead of letting the queue grow.
+    A failing record yields its exception.
+    """
+    max_in_flight = max_in_flight or 2 * max_workers
+    pending: deque[tuple[Record, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for record in records:
+            pending.append((record, pool.submit(fn, record)))
+            if len(pending) >= max_in_flight:
+                yield _result(*pending.popleft())
+        while pending:
+            yield _result(*pending.popleft())
+
+
+def _result(record: Record, future: Future) -> tuple[Record, dict | Exception]:
+    try:
+        return record, future.result()
+    except Exception as e:
+        return record, e
+
+
+def write_rows(
+    output_path: Path,
+    rows: Iterable[tuple[Record, dict[str, str]]],
+    annotations: bool = False,
+) -> int:
+    """Write translated rows to CSV incrementally; return the row count.
+
+    With `annotations` the entity and relation spans are kept as JSON
+    columns after the Datalog fields.
+    """
+    fieldnames = [TEXT_FIELD, *DATALOG_FIELDS]
+    if annotations:
+        fieldnames += ANNOTATION_FIELDS
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with output_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        for record, datalog in rows:
+            row = {TEXT_FIELD: record.text, **datalog}
+            if annotations:
+                row["entities"] = json.dumps(record.entities)
+                row["relations"] = json.dumps(record.relations)
+            writer.writerow(row)
+            count += 1
+    return count
@@ -0,0 +1,180 @@
+"""OpenAI-compatible mock chat server with injected latency.
+
+Answers POST /v1/chat/completions with a fixed Datalog record after a
+delay of `--delay` seconds, or `--slow-delay` seconds for a `--slow-rate`
+fraction of the requests.  Streaming requests receive the answer in
+`--chunks` server-sent events spread over the delay, so a client that
+closes the connection stops the "generation" like on a real server.
+
+    python -m policy_generation.mock_server --port 8701 --delay 0.2 \\
+        --slow-delay 3 --slow-rate 0.05
+    GENERATION_ENDPOINTS=http://127.0.0.1:8701,http://127.0.0.1:8702 \\
+        python rebac.py generate --datasets "t2p_*"
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = {
+    "datalog_subjects": "Patient(P), Prescriber(D).",
+    "datalog_objects": "Drug(DR).",
+    "datalog_relationships": "has_allergy(P, DR) :- Patient(P), Drug(DR).",
+    "datalog_actions": (
+        "can_prescribe(D, P, DR) :- Prescriber(D), Patient(P), Drug(DR), "
+        "not has_allergy(P, DR)."
+    ),
+}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            return self._json(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        delay = server.sample_delay()
+        content = json.dumps(ANSWER)
+        server.count("requests")
+        if not request.get("stream"):
+            time.sleep(delay)
+            try:
+                self._json(
+                    200,
+                    {
+                        "object": "chat.completion",
+                        "model": request.get("model", "mock"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": content},
+                            }
+                        ],
+                    },
+                )
+            except (BrokenPipeError, ConnectionResetError):
+                server.count("cancelled")
+                self.close_connection = True
+                return
+            server.count("completed")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        step = -(-len(content) // server.chunks)
+        pieces = [content[i : i + step] for i in range(0, len(content), step)]
+        try:
+            for piece in pieces:
+                time.sleep(delay / len(pieces))
+                event = {"choices": [{"index": 0, "delta": {"content": piece}}]}
+                self._chunk(f"data: {json.dumps(event)}\n\n")
+            self._chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            server.count("completed")
+        except (BrokenPipeError, ConnectionResetError):
+            server.count("cancelled")
+            self.close_connection = True
+
+    def _chunk(self, text: str) -> None:
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int] = ("127.0.0.1", 0),
+        delay: float = 0.2,
+        slow_delay: float = 2.0,
+        slow_rate: float = 0.0,
+        chunks: int = 8,
+        seed: int | None = None,
+    ):
+        super().__init__(address, MockHandler)
+        self.delay = delay
+        self.slow_delay = slow_delay
+        self.slow_rate = slow_rate
+        self.chunks = chunks
+        self.random = random.Random(seed)
+        self.counts = {"requests": 0, "completed": 0, "cancelled": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def sample_delay(self) -> float:
+        with self.lock:
+            slow = self.random.random() < self.slow_rate
+        return self.slow_delay if slow else self.delay
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.counts[key] += 1
+
+    def handle_error(self, request, client_address) -> None:
+        # A client that cancels (a losing hedge) may also reset a keep-alive
+        # connection while it waits for the next request
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            self.count("cancelled")
+            return
+        super().handle_error(request, client_address)
+
+    def start(self) -> "MockServer":
+        """Serve from a daemon thread, for benchmarks in the same process."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8701)
+    parser.add_argument("--delay", type=float, default=0.2)
+    parser.add_argument("--slow-delay", type=float, default=2.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--chunks", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    server = MockServer(
+        (args.host, args.port),
+        args.delay,
+        args.slow_delay,
+        args.slow_rate,
+        args.chunks,
+    )
+    print(f"mock LLM server on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(server.counts)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
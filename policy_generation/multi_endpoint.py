@@ -0,0 +1,228 @@
+"""Latency-aware load balancing and hedged requests over several endpoints.
+
+`MultiEndpointBackend` spreads requests over OpenAI-compatible endpoints
+(DeepSeek, a local Ollama or llama.cpp server, the mock server), preferring
+the endpoint with the lowest expected wait: its smoothed latency times the
+requests it already has in flight.  When a request is still running after
+the `hedge_percentile` latency of its endpoint, a duplicate goes to the
+next best endpoint; the first answer wins and the other attempt is
+cancelled.  Streaming endpoints are cancelled by closing the response,
+which also stops generation on the server; a non-streaming attempt runs
+to the end and its answer is discarded.
+
+    GENERATION_ENDPOINTS="http://localhost:11434,http://localhost:8080"
+
+selects it through `make_backend`; entries are URLs of OpenAI-compatible
+servers or backend names (`deepseek`, `ollama`, `llamacpp`).
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterator
+
+from policy_generation.backends import BackendError, GenerationBackend
+
+# Latencies kept per endpoint for the percentiles
+WINDOW = 512
+# Samples needed before the endpoint's own percentile sets the hedge delay
+MIN_SAMPLES = 20
+
+
+class Cancelled(Exception):
+    pass
+
+
+class EndpointStats:
+    """Recent latencies and counters of one endpoint."""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.latencies: deque[float] = deque(maxlen=WINDOW)
+        self.ewma: float | None = None
+        self.in_flight = 0
+        self.requests = 0
+        self.wins = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+            if self.ewma is None:
+                self.ewma = latency
+            else:
+                self.ewma += self.alpha * (latency - self.ewma)
+
+    def percentile(self, q: float) -> float | None:
+        with self.lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def expected_wait(self) -> float:
+        # An endpoint without samples is tried first so that it gets some
+        return (self.ewma or 0.0) * (self.in_flight + 1)
+
+
+class MultiEndpointBackend(GenerationBackend):
+    """Balances and hedges requests over `endpoints`."""
+
+    name = "multi"
+
+    def __init__(
+        self,
+        endpoints: list[GenerationBackend],
+        hedge_percentile: float | None = 95,
+        hedge_delay: float = 10.0,
+        max_hedge_ratio: float = 0.2,
+    ):
+        if not endpoints:
+            raise ValueError("at least one endpoint is required")
+        super().__init__(
+            endpoints[0].model,
+            sum(e.num_parallel for e in endpoints),
+            endpoints[0].temperature,
+        )
+        self.endpoints = endpoints
+        self.stats = [EndpointStats() for _ in endpoints]
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.requests = 0
+        self.hedges = 0
+        self.lock = threading.Lock()
+        # Room for a primary and a hedge of every request in flight
+        self.pool = ThreadPoolExecutor(max_workers=2 * self.num_parallel)
+
+    def labels(self) -> list[str]:
+        return [
+            f"{e.name}@{getattr(getattr(e, 'client', None), 'base_url', i)}"
+            for i, e in enumerate(self.endpoints)
+        ]
+
+    def pick(self, exclude: set[int] = frozenset()) -> int | None:
+        with self.lock:
+            candidates = [i for i in range(len(self.endpoints)) if i not in exclude]
+            if not candidates:
+                return None
+            best = min(candidates, key=lambda i: self.stats[i].expected_wait())
+            self.stats[best].in_flight += 1
+            self.stats[best].requests += 1
+            return best
+
+    def hedge_after(self, i: int) -> float | None:
+        if self.hedge_percentile is None or len(self.endpoints) < 2:
+            return None
+        stats = self.stats[i]
+        if len(stats.latencies) < MIN_SAMPLES:
+            return self.hedge_delay
+        return stats.percentile(self.hedge_percentile)
+
+    def _attempt(
+        self, i: int, system_prompt: str, user_prompt: str, cancel: threading.Event
+    ) -> str:
+        stats = self.stats[i]
+        start = time.perf_counter()
+        chunks = self.endpoints[i].stream(system_prompt, user_prompt)
+        try:
+            parts = []
+            for chunk in chunks:
+                if cancel.is_set():
+                    raise Cancelled()
+                parts.append(chunk)
+            stats.record(time.perf_counter() - start)
+            return "".join(parts) or "{}"
+        except Cancelled:
+            with stats.lock:
+                stats.cancelled += 1
+            raise
+        except BackendError:
+            with stats.lock:
+                stats.errors += 1
+            raise
+        finally:
+            chunks.close()  # closes the HTTP response of a cancelled stream
+            with self.lock:
+                stats.in_flight -= 1
+
+    def _may_hedge(self) -> bool:
+        with self.lock:
+            if self.hedges >= self.max_hedge_ratio * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def complete(self, system_prompt: str, user_prompt: str) -> str:
+        with self.lock:
+            self.requests += 1
+        cancel = threading.Event()
+        attempts: dict[Future, int] = {}
+        tried: set[int] = set()
+
+        def launch() -> bool:
+            i = self.pick(tried)
+            if i is None:
+                return False
+            tried.add(i)
+            future = self.pool.submit(
+                self._attempt, i, system_prompt, user_prompt, cancel
+            )
+            attempts[future] = i
+            return True
+
+        launch()
+        error: BaseException | None = None
+        while attempts:
+            primary = next(iter(attempts)) if len(attempts) == 1 else None
+            delay = self.hedge_after(attempts[primary]) if primary else None
+            done, _ = wait(attempts, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # The request is slower than usual for its endpoint: hedge it
+                if not (self._may_hedge() and launch()):
+                    wait(attempts, return_when=FIRST_COMPLETED)
+                continue
+            for future in done:
+                i = attempts.pop(future)
+                try:
+                    result = future.result()
+                except BackendError as e:
+                    error = e
+                    continue
+                cancel.set()
+                with self.lock:
+                    self.stats[i].wins += 1
+                return result
+            # A failed attempt falls over to another endpoint at once
+            if not attempts:
+                launch()
+        raise error or BackendError("no endpoint answered")
+
+    def stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        yield self.complete(system_prompt, user_prompt)
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        for endpoint in self.endpoints:
+            endpoint.close()
+
+    def report(self) -> str:
+        lines = [
+            f"endpoints: {self.requests} requests, {self.hedges} hedged "
+            f"({self.hedges / max(1, self.requests):.1%})"
+        ]
+        for label, stats in zip(self.labels(), self.stats):
+            p50, p95, p99 = (stats.percentile(q) for q in (50, 95, 99))
+            timing = (
+                f"p50 {p50:.3f}s p95 {p95:.3f}s p99 {p99:.3f}s"
+                if p50 is not None
+                else "no completed requests"
+            )
+            lines.append(
+                f"  {label}: {stats.requests} sent, {stats.wins} won, "
+                f"{stats.cancelled} cancelled, {stats.errors} errors, {timing}"
+            )
+        return "\n".join(lines)
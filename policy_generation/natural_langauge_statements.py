@@ -1,102 +1,73 @@
+import functools
 import json
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
-import pandas as pd
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator
 
-acre_acp_path = Path("policy_generation/input/litroacp/data_acp/acre_acp.jsonl")
-acre_acp_records = [
-    {
-        "natural_language_statements": json.loads(line).get("text", ""),
-        "datalog_subjects": "",
-        "datalog_objects": "",
-        "datalog_relationships": "",
-        "datalog_actions": "",
-    }
-    for line in acre_acp_path.read_text(encoding="utf-8").splitlines()
-    if line.strip()
-]
-acre_acp_df = pd.DataFrame(acre_acp_records)
-print(acre_acp_df.head())
-
-collected_acp_path = Path(
-    "policy_generation/input/litroacp/data_acp/collected_acp.jsonl"
+from policy_generation.backends import (
+    BackendError,
+    GenerationBackend,
+    Throughput,
+    make_backend,
 )
-collected_acp_records = [
-    {
-        "natural_language_statements": json.loads(line).get("text", ""),
-        "datalog_subjects": "",
-        "datalog_objects": "",
-        "datalog_relationships": "",
-        "datalog_actions": "",
-    }
-    for line in collected_acp_path.read_text(encoding="utf-8").splitlines()
-    if line.strip()
-]
-collected_acp_df = pd.DataFrame(collected_acp_records)
-print(collected_acp_df.head())
-
-cyber_acp_path = Path("policy_generation/input/litroacp/data_acp/cyber_acp.jsonl")
-cyber_acp_records = [
-    {
-        "natural_language_statements": json.loads(line).get("text", ""),
-        "datalog_subjects": "",
-        "datalog_objects": "",
-        "datalog_relationships": "",
-        "datalog_actions": "",
-    }
-    for line in cyber_acp_path.read_text(encoding="utf-8").splitlines()
-    if line.strip()
-]
-cyber_acp_df = pd.DataFrame(cyber_acp_records)
-print(cyber_acp_df.head())
-
-ibm_acp_path = Path("policy_generation/input/litroacp/data_acp/ibm_acp.jsonl")
-ibm_acp_records = [
-    {
-        "natural_language_statements": json.loads(line).get("text", ""),
-        "datalog_subjects": "",
-        "datalog_objects": "",
-        "datalog_relationships": "",
-        "datalog_actions": "",
-    }
-    for line in ibm_acp_path.read_text(encoding="utf-8").splitlines()
-    if line.strip()
-]
-ibm_acp_df = pd.DataFrame(ibm_acp_records)
-print(ibm_acp_df.head())
-
-t2p_acp_path = Path("policy_generation/input/litroacp/data_acp/t2p_acp.jsonl")
-t2p_acp_records = [
-    {
-        "natural_language_statements": json.loads(line).get("text", ""),
-        "datalog_subjects": "",
-        "datalog_objects": "",
-        "datalog_relationships": "",
-        "datalog_actions": "",
-    }
-    for line in t2p_acp_path.read_text(encoding="utf-8").splitlines()
-    if line.strip()
-]
-t2p_acp_df = pd.DataFrame(t2p_acp_records)
-print(t2p_acp_df.head())
-
-
-API_KEY: str | None | RuntimeError = (
-    os.getenv("DEEPSEEK_API_KEY")
-    if load_dotenv(dotenv_path=".env")
-    else RuntimeError(".env file NOT found!")
+from policy_generation.hints import annotated_prompt, build_hint
+from policy_generation.ingest import Record, bounded_map, iter_records, write_rows
+from policy_generation.resilience import ResilientBackend
+from policy_generation.template_cache import TemplateCache
+from policy_generation.tokens import TokenCounter
+from policy_generation.validation import (
+    DATALOG_FIELDS,
+    ResponseFormatError,
+    Validator,
+    parse_response,
 )
 
-# For type checking
-assert isinstance(API_KEY, str)
+if TYPE_CHECKING:
+    from policy_generation.acp_filter import ACPFilter
 
-client = OpenAI(
-    api_key=API_KEY,
-    base_url="https://api.deepseek.com",
+INPUT_DIR = Path("policy_generation/input/litroacp/data_acp")
+OUTPUT_DIR = Path("policy_generation/output/litroacp")
+DATASETS = ["acre_acp", "collected_acp", "cyber_acp", "ibm_acp", "t2p_acp"]
+SYSTEM_PROMPT_PATH = Path(
+    "policy_generation/input/prompts/system_prompt_for_natural_language_statements.txt"
+)
+# Shorter prompt used when the statement comes with span annotations
+ANNOTATED_PROMPT_PATH = Path(
+    "policy_generation/input/prompts/system_prompt_for_annotated_statements.txt"
 )
 
+EMPTY_DATALOG = dict.fromkeys(DATALOG_FIELDS, "")
+
+# Near-duplicate statements are answered from already translated ones
+template_cache = TemplateCache()
+token_counter = TokenCounter()
+
+
+@functools.cache
+def get_backend() -> GenerationBackend:
+    # GENERATION_BACKEND=deepseek|ollama|llamacpp selects the provider
+    return make_backend()
+
+
+@functools.cache
+def get_system_prompt(annotated: bool = False) -> str:
+    path = ANNOTATED_PROMPT_PATH if annotated else SYSTEM_PROMPT_PATH
+    return path.read_text(encoding="utf-8")
+
+
+@functools.cache
+def get_acp_filter() -> "ACPFilter":
+    # NumPy is only needed when the pre-filter is switched on
+    from policy_generation.acp_filter import train_filter
+
+    return train_filter()
+
+
+@functools.cache
+def get_validator(annotated: bool = False) -> Validator:
+    # Malformed or unsafe Datalog gets one targeted repair request
+    return Validator(get_backend(), get_system_prompt(annotated))
+
+
 # system_prompt = """
 # You are an access control policy-translation assistant. Your task is to translate access control policies (expressed in natural language statements) into a Datalog-based Intermediate Representation (IR) that is suitable for mapping into different Relationship-Based Access Control (ReBAC) models. The user will provide some exam text. Please translate the "natural language statements" into Datalog and output them in JSON format.
 
@@ -128,68 +99,97 @@ client = OpenAI(
 
 # print(json.dumps(json_res or ""))
 
-system_prompt_path = Path(
-    "policy_generation/input/prompts/system_prompt_for_natural_language_statements.txt"
-)
-system_prompt = system_prompt_path.read_text(encoding="utf-8")
 
+def translate_statement(
+    text: str, hint: str = "", acp_filter: bool = False
+) -> dict[str, str]:
+    """Translate one statement; `hint` is a build_hint() summary of its spans.
 
-def translate_statement(text: str) -> dict[str, str]:
+    With `acp_filter`, sentences the local classifier does not take for an
+    access control policy get empty Datalog without an LLM call.
+    """
     if not text.strip():
-        return {
-            "datalog_subjects": "",
-            "datalog_objects": "",
-            "datalog_relationships": "",
-            "datalog_actions": "",
-        }
-
-    response = client.chat.completions.create(
-        model="deepseek-chat",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": text},
-        ],
-        response_format={"type": "json_object"},
+        return dict(EMPTY_DATALOG)
+    if acp_filter and not get_acp_filter().is_policy(text):
+        return dict(EMPTY_DATALOG)
+
+    cached = template_cache.lookup(text)
+    if cached is not None:
+        return cached
+
+    annotated = bool(hint)
+    system_prompt = get_system_prompt(annotated)
+    prompt = annotated_prompt(text, hint) if annotated else text
+    content = get_backend().complete(system_prompt, prompt)
+    token_counter.add(system_prompt + prompt, content)
+    datalog = get_validator(annotated).check(prompt, parse_response(content))
+    template_cache.add(text, datalog)
+    return datalog
+
+
+def translate_records(
+    name: str, records: Iterable[Record], hints: bool = True, acp_filter: bool = False
+) -> Iterator[tuple[Record, dict[str, str]]]:
+    """Translate a stream of records, yielding (record, datalog) in order.
+
+    Up to 2 * num_parallel records are in flight at a time; a row that still
+    fails after retries is yielded empty instead of aborting the dataset.
+    With `hints`, annotated records are sent with the compact span hint and
+    the shorter annotated system prompt; with `acp_filter`, statements are
+    screened by the local policy classifier first.
+    """
+    backend = get_backend()
+    if acp_filter:
+        get_acp_filter()  # train once before the worker threads need it
+    throughput = Throughput(backend)
+    failed: list[int] = []
+    print(f"Processing {name}")
+    results = bounded_map(
+        lambda record: translate_statement(
+            record.text, build_hint(record) if hints else "", acp_filter
+        ),
+        records,
+        max_workers=backend.num_parallel,
     )
-
-    content = response.choices[0].message.content or "{}"
-    parsed = json.loads(content)
-
-    return {
-        "datalog_subjects": parsed.get("datalog_subjects", ""),
-        "datalog_objects": parsed.get("datalog_objects", ""),
-        "datalog_relationships": parsed.get("datalog_relationships", ""),
-        "datalog_actions": parsed.get("datalog_actions", ""),
-    }
-
-
-def enrich_dataframe(name: str, df: pd.DataFrame) -> pd.DataFrame:
-    print(f"Processing {name} ({len(df)} rows)")
-    enrichments = df["natural_language_statements"].apply(
-        lambda text: pd.Series(translate_statement(text))
-    )
-    df[
-        [
-            "datalog_subjects",
-            "datalog_objects",
-            "datalog_relationships",
-            "datalog_actions",
-        ]
-    ] = enrichments
-    print(df.head())
-    return df
-
-
-acre_acp_df = enrich_dataframe("acre_acp", acre_acp_df)
-collected_acp_df = enrich_dataframe("collected_acp", collected_acp_df)
-cyber_acp_df = enrich_dataframe("cyber_acp", cyber_acp_df)
-ibm_acp_df = enrich_dataframe("ibm_acp", ibm_acp_df)
-t2p_acp_df = enrich_dataframe("t2p_acp", t2p_acp_df)
-acre_acp_df.to_csv("policy_generation/output/litroacp/acre_acp.csv", index=False)
-collected_acp_df.to_csv(
-    "policy_generation/output/litroacp/collected_acp.csv", index=False
-)
-cyber_acp_df.to_csv("policy_generation/output/litroacp/cyber_acp.csv", index=False)
-ibm_acp_df.to_csv("policy_generation/output/litroacp/ibm_acp.csv", index=False)
-t2p_acp_df.to_csv("policy_generation/output/litroacp/t2p_acp.csv", index=False)
-print("All done.")
+    for record, datalog in results:
+        if isinstance(datalog, Exception):
+            if not isinstance(
+                datalog, (BackendError, json.JSONDecodeError, ResponseFormatError)
+            ):
+                raise datalog
+            failed.append(record.line)
+            print(f"✗ {name} line {record.line}: {datalog}")
+            datalog = dict(EMPTY_DATALOG)
+        elif record.text.strip():
+            throughput.add()
+        yield record, datalog
+    print(throughput.report(name))
+    print(template_cache.report())
+    for annotated in sorted({False, hints}):
+        print(get_validator(annotated).report())
+    print(token_counter.report())
+    if acp_filter:
+        print(get_acp_filter().report())
+    if failed:
+        print(f"{len(failed)} rows failed and were left empty (lines {failed})")
+    if isinstance(backend, ResilientBackend):
+        print(backend.report())
+
+
+def generate_dataset(
+    input_path: Path,
+    output_path: Path,
+    annotations: bool = False,
+    hints: bool = True,
+    acp_filter: bool = False,
+) -> int:
+    name = Path(input_path).stem
+    records = iter_records([input_path])
+    rows = translate_records(name, records, hints=hints, acp_filter=acp_filter)
+    return write_rows(output_path, rows, annotations=annotations)
+
+
+if __name__ == "__main__":
+    for name in DATASETS:
+        generate_dataset(INPUT_DIR / f"{name}.jsonl", OUTPUT_DIR / f"{name}.csv")
+    print("All done.")
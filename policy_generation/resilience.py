@@ -0,0 +1,207 @@
+import random
+import threading
+import time
+from typing import Iterator
+
+from policy_generation.backends import BackendError, GenerationBackend
+
+
+class CircuitOpenError(BackendError):
+    """Raised without calling the provider while the circuit is open."""
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter.
+
+    A Retry-After hint from the server is used as the lower bound of the
+    delay, so throttled requests come back no earlier than asked.
+    """
+
+    def __init__(
+        self, max_attempts: int = 8, base_delay: float = 1.0, max_delay: float = 60.0
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class AdaptiveLimiter:
+    """AIMD limit on the number of requests in flight.
+
+    The limit grows by roughly one slot per window of successful requests and
+    is halved on a 429, at most once per `cooldown` seconds so a burst of
+    rejections from the same window counts as one signal.  A Retry-After
+    hint pauses every caller, not only the throttled one.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, cooldown: float = 1.0):
+        self.max_limit = max(min_limit, max_limit)
+        self.min_limit = min_limit
+        self.limit = float(self.max_limit)
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self.cond = threading.Condition()
+
+    def __enter__(self):
+        with self.cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self.cond.wait(timeout=wait if wait > 0 else None)
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def on_success(self) -> None:
+        with self.cond:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.cond.notify_all()
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        with self.cond:
+            self.throttled += 1
+            now = time.monotonic()
+            if now - self.last_decrease >= self.cooldown:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self.last_decrease = now
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+
+class CircuitBreaker:
+    """Stop calling a provider that keeps failing.
+
+    After `failure_threshold` consecutive hard failures (timeouts, connection
+    errors, 5xx) the circuit opens and calls fail fast for `reset_timeout`
+    seconds; then a single probe is let through and its outcome closes or
+    re-opens the circuit.  Throttling (429) and other 4xx answers are not
+    hard failures: they show the provider is reachable and close it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def check(self) -> None:
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open" and not self.probing:
+                self.probing = True
+                return
+            raise CircuitOpenError(
+                f"circuit open after {self.failures} consecutive failures"
+            )
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release_probe(self) -> None:
+        """Let another probe through when one ended without an outcome."""
+        with self.lock:
+            self.probing = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class ResilientBackend(GenerationBackend):
+    """Retry, adaptive-concurrency and circuit-breaker wrapper for a backend."""
+
+    def __init__(
+        self,
+        backend: GenerationBackend,
+        retry: RetryPolicy | None = None,
+        limiter: AdaptiveLimiter | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        super().__init__(backend.model, backend.num_parallel, backend.temperature)
+        self.backend = backend
+        self.name = backend.name
+        self.retry = retry or RetryPolicy()
+        self.limiter = limiter or AdaptiveLimiter(backend.num_parallel)
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = 0
+
+    def complete(self, system_prompt: str, user_prompt: str) -> str:
+        attempt = 0
+        while True:
+            self.breaker.check()
+            try:
+                with self.limiter:
+                    result = self.backend.complete(system_prompt, user_prompt)
+            except BackendError as e:
+                if e.throttled:
+                    # A 429 or a 4xx still shows the endpoint is reachable
+                    self.limiter.on_throttle(e.retry_after)
+                    self.breaker.record_success()
+                elif e.retryable:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                    raise
+                attempt += 1
+                if attempt >= self.retry.max_attempts:
+                    raise
+                self.retries += 1
+                time.sleep(self.retry.delay(attempt - 1, e.retry_after))
+                continue
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+            self.limiter.on_success()
+            self.breaker.record_success()
+            return result
+
+    def stream(self, system_prompt: str, user_prompt: str) -> Iterator[str]:
+        yield self.complete(system_prompt, user_prompt)
+
+    def close(self) -> None:
+        self.backend.close()
+
+    def report(self) -> str:
+        lines = [
+            f"{self.retries} retries, {self.limiter.throttled} throttled responses, "
+            f"concurrency limit {self.limiter.limit:.1f}/{self.limiter.max_limit}, "
+            f"circuit {self.breaker.state}"
+        ]
+        # The wrapped backends' own reports, e.g. per-endpoint latencies
+        inner = self.backend
+        while inner is not None:
+            if hasattr(inner, "report"):
+                lines.append(inner.report())
+            inner = getattr(inner, "backend", None)
+        return "\n".join(lines)
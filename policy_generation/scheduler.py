@@ -0,0 +1,284 @@
+"""Token-budget-aware ordering and pacing of generation work.
+
+Each dataset or XACML file becomes a `WorkItem` with an estimated number
+of requests and tokens.  `plan` orders the items by priority class and then
+largest first, assigns them greedily to the parallel job slots (LPT bin
+packing, so one huge file starts early instead of trailing at the end) and
+projects when each item and the whole run will finish under the provider's
+tokens-per-minute (TPM) and requests-per-minute (RPM) allowance.
+
+`PacedBackend` keeps the requests within that allowance.  `make_backend`
+wraps every backend with it when GENERATION_TPM or GENERATION_RPM is set;
+all backends of one process draw from the same `RateBudget`.
+"""
+
+import csv
+import functools
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from policy_generation.backends import GenerationBackend
+from policy_generation.tokens import estimate_tokens
+
+# Estimated length of one JSON answer; settled against the real one
+COMPLETION_TOKENS = 120
+URGENT, NORMAL = 0, 1
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most one minute's worth.
+
+    A request larger than the bucket is let through when the bucket is full
+    and leaves it in debt, so oversized requests still make progress.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        with self.lock:
+            self._refill()
+            return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        with self.lock:
+            self._refill()
+            self.level -= amount
+
+
+class RateBudget:
+    """TPM and RPM allowance shared by every request of a run."""
+
+    def __init__(self, tpm: float | None = None, rpm: float | None = None):
+        self.tpm = tpm
+        self.rpm = rpm
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.lock = threading.Lock()
+        self.waited = 0.0
+
+    def acquire(self, tokens: int) -> None:
+        # One caller at a time, so a large request is not starved by small ones
+        with self.lock:
+            while True:
+                wait = max(
+                    self.tokens.wait_time(tokens) if self.tokens else 0.0,
+                    self.requests.wait_time(1) if self.requests else 0.0,
+                )
+                if wait <= 0:
+                    break
+                self.waited += wait
+                time.sleep(wait)
+            if self.tokens:
+                self.tokens.take(tokens)
+            if self.requests:
+                self.requests.take(1)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        if self.tokens:
+            self.tokens.take(actual - estimated)
+
+    def minutes(self, requests: int, tokens: int) -> float | None:
+        """Minutes the budget needs for this much work; None when unlimited."""
+        bounds = []
+        if self.tpm:
+            bounds.append(tokens / self.tpm)
+        if self.rpm:
+            bounds.append(requests / self.rpm)
+        return max(bounds) if bounds else None
+
+    def report(self) -> str:
+        limits = [
+            f"{self.tpm:.0f} TPM" if self.tpm else "",
+            f"{self.rpm:.0f} RPM" if self.rpm else "",
+        ]
+        return (
+            f"rate budget: {', '.join(filter(None, limits)) or 'unlimited'}, "
+            f"{self.waited:.1f}s spent waiting"
+        )
+
+
+@functools.cache
+def shared_budget(tpm: float | None, rpm: float | None) -> RateBudget:
+    return RateBudget(tpm, rpm)
+
+
+def budget_from_env() -> RateBudget | None:
+    tpm = float(os.getenv("GENERATION_TPM") or 0) or None
+    rpm = float(os.getenv("GENERATION_RPM") or 0) or None
+    if tpm is None and rpm is None:
+        return None
+    return shared_budget(tpm, rpm)
+
+
+class PacedBackend(GenerationBackend):
+    """Waits for the rate budget before every request of `backend`."""
+
+    def __init__(self, backend: GenerationBackend, budget: RateBudget):
+        super().__init__(backend.model, backend.num_parallel, backend.temperature)
+        self.backend = backend
+        self.name = backend.name
+        self.budget = budget
+
+    def complete(self, system_prompt: str, user_prompt: str) -> str:
+        prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        estimated = prompt_tokens + COMPLETION_TOKENS
+        self.budget.acquire(estimated)
+        result = self.backend.complete(system_prompt, user_prompt)
+        self.budget.settle(estimated, prompt_tokens + estimate_tokens(result))
+        return result
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+@dataclass
+class WorkItem:
+    name: str
+    requests: int
+    tokens: int
+    priority: int = NORMAL
+    payload: object = None
+    start: float = 0.0  # projected, in minutes from the start of the run
+    finish: float = 0.0
+
+
+def _cost(system_prompt: str, prompts: Iterable[str]) -> tuple[int, int]:
+    system_tokens = estimate_tokens(system_prompt)
+    requests = tokens = 0
+    for prompt in prompts:
+        requests += 1
+        tokens += system_tokens + estimate_tokens(prompt) + COMPLETION_TOKENS
+    return requests, tokens
+
+
+def _litroacp_cost(path: Path, hints: bool) -> tuple[int, int]:
+    from policy_generation import natural_langauge_statements as nls
+    from policy_generation.hints import annotated_prompt, build_hint
+    from policy_generation.ingest import iter_records
+
+    plain, annotated = [], []
+    for record in iter_records([path]):
+        if not record.text.strip():
+            continue
+        hint = build_hint(record) if hints else ""
+        if hint:
+            annotated.append(annotated_prompt(record.text, hint))
+        else:
+            plain.append(record.text)
+    costs = [
+        _cost(nls.get_system_prompt(False), plain),
+        _cost(nls.get_system_prompt(True), annotated),
+    ]
+    return sum(c[0] for c in costs), sum(c[1] for c in costs)
+
+
+def _xacml_documents(path: Path) -> Iterator[str]:
+    if path.suffix == ".csv":
+        csv.field_size_limit(sys.maxsize)
+        with path.open(encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                yield row["xacml"]
+    else:
+        yield path.read_text(encoding="utf-8")
+
+
+def _xacml_cost(path: Path) -> tuple[int, int]:
+    from policy_generation.xacml import SYSTEM_PROMPT_PATH
+    from policy_generation.xacml_canonical import canonicalize
+    from policy_generation.xacml_chunks import split_policy
+
+    prompts = (
+        canonicalize(chunk.xml)
+        for document in _xacml_documents(path)
+        for chunk in split_policy(document)
+    )
+    return _cost(SYSTEM_PROMPT_PATH.read_text(encoding="utf-8"), prompts)
+
+
+def estimate(
+    source: str, path: Path, hints: bool = True, priority: int = NORMAL, payload=None
+) -> WorkItem:
+    """Work item for one input file of a generation source (see rebac.py)."""
+    if source == "litroacp":
+        requests, tokens = _litroacp_cost(Path(path), hints)
+    else:
+        requests, tokens = _xacml_cost(Path(path))
+    return WorkItem(str(path), requests, tokens, priority, payload)
+
+
+@dataclass
+class Plan:
+    items: list[WorkItem]
+    slots: int
+    budget: RateBudget | None = None
+    makespan: float | None = field(default=None)
+
+    def report(self) -> str:
+        lines = [f"{'priority':>8} {'requests':>9} {'tokens':>10} {'eta':>8}  item"]
+        for item in self.items:
+            eta = f"{item.finish:7.1f}m" if self.makespan is not None else "       -"
+            lines.append(
+                f"{item.priority:>8} {item.requests:>9} {item.tokens:>10} {eta}  "
+                f"{item.name}"
+            )
+        requests = sum(item.requests for item in self.items)
+        tokens = sum(item.tokens for item in self.items)
+        total = f"{len(self.items)} items, {requests} requests, {tokens} tokens"
+        if self.makespan is None:
+            return "\n".join(lines + [f"{total}; set a TPM/RPM budget to project"])
+        return "\n".join(
+            lines
+            + [
+                f"{total}; projected completion in {self.makespan:.1f} min "
+                f"on {self.slots} job slots ({self.budget.report()})"
+            ]
+        )
+
+
+def plan(
+    items: list[WorkItem], slots: int = 1, budget: RateBudget | None = None
+) -> Plan:
+    """Order `items` and project their finish times.
+
+    Urgent items come first; within a priority class the largest go first,
+    and each item starts when one of the `slots` job slots frees up.  The
+    running items share the budget evenly, so the projection simulates the
+    run: an item that would need m minutes of the whole budget progresses
+    at 1/k of that rate while k items run.
+    """
+    items = sorted(items, key=lambda item: (item.priority, -item.tokens, item.name))
+    slots = max(1, slots)
+    if budget is None or budget.minutes(1, 1) is None:
+        return Plan(items, slots, budget)
+    waiting = list(reversed(items))
+    running: list[list] = []  # [budget minutes left, item]
+    now = 0.0
+    while waiting or running:
+        while waiting and len(running) < slots:
+            item = waiting.pop()
+            item.start = now
+            running.append([budget.minutes(item.requests, item.tokens), item])
+        least = min(left for left, _ in running)
+        now += least * len(running)
+        for entry in running:
+            entry[0] -= least
+            if entry[0] <= 1e-12:
+                entry[1].finish = now
+        running = [entry for entry in running if entry[0] > 1e-12]
+    makespan = max((item.finish for item in items), default=0.0)
+    return Plan(items, slots, budget, makespan)
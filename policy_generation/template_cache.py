@@ -0,0 +1,219 @@
+import difflib
+import hashlib
+import random
+import re
+import threading
+
+TOKEN_RE = re.compile(r"[A-Za-z0-9]+|[^\sA-Za-z0-9]")
+STOPWORDS = {
+    "a",
+    "an",
+    "the",
+    "his",
+    "her",
+    "their",
+    "its",
+    "this",
+    "that",
+    "these",
+    "those",
+}
+# Words that decide whether a statement permits or forbids; a statement
+# that differs from a cached one in any of them is never rewritten
+POLARITY_WORDS = {
+    "can",
+    "cannot",
+    "may",
+    "must",
+    "not",
+    "never",
+    "no",
+    "except",
+    "unless",
+    "without",
+}
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text)
+
+
+def _lower(tokens: list[str]) -> list[str]:
+    return [t.lower() for t in tokens]
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest())
+
+
+def _spellings(words: list[str]) -> list[str]:
+    # How an entity span of the statement shows up in the generated Datalog:
+    # LabTechnician(L), HCP(H), has_lab_technician(...), can_read(...)
+    camel = "".join(w if w.isupper() and len(w) > 1 else w.capitalize() for w in words)
+    lower = [w.lower() for w in words]
+    return [camel, "".join(words).upper(), "_".join(lower), "".join(lower)]
+
+
+def _replace_spelling(text: str, old: str, new: str) -> tuple[str, int]:
+    # Whole identifiers only: `read` must not match inside `can_read`
+    pattern = re.compile(rf"(?<![A-Za-z0-9_]){re.escape(old)}(?![A-Za-z0-9_])")
+    return pattern.subn(new, text)
+
+
+def _mentions(text: str, spelling: str) -> bool:
+    """Whether `spelling` occurs in `text`, also as part of an identifier."""
+    pattern = rf"(?<![A-Za-z0-9]){re.escape(spelling)}(?![a-z0-9])"
+    return re.search(pattern, text) is not None
+
+
+class TemplateCache:
+    """MinHash/LSH index over already translated statements.
+
+    `lookup` finds a cached statement that differs from the new one only by
+    substituted word spans ("The doctor can read ..." vs "The nurse can read
+    ...") and rewrites the cached Datalog by swapping the aligned spans.  It
+    returns None when no candidate is similar enough or when a differing
+    span cannot be located in the cached Datalog, so the caller falls back to
+    the LLM.  Spans are only swapped as whole identifiers, and statements
+    that differ in a word of POLARITY_WORDS ("can" vs "cannot") are never
+    rewritten.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 32,
+        threshold: float = 0.8,
+        max_substitutions: int = 3,
+        seed: int = 1,
+    ):
+        assert num_perm % bands == 0
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self.max_substitutions = max_substitutions
+        rng = random.Random(seed)
+        self.perms = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self.buckets: list[dict[tuple[int, ...], list[int]]] = [
+            {} for _ in range(bands)
+        ]
+        self.entries: list[tuple[list[str], dict[str, str]]] = []
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _signature(self, tokens: list[str]) -> list[int]:
+        hashes = [_token_hash(t.lower()) for t in set(tokens)] or [0]
+        return [
+            min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.perms
+        ]
+
+    def _band_keys(self, signature: list[int]):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows : (band + 1) * self.rows])
+
+    def add(self, text: str, datalog: dict[str, str]) -> None:
+        tokens = tokenize(text)
+        if not tokens or not any(datalog.values()):
+            return
+        keys = list(self._band_keys(self._signature(tokens)))
+        with self.lock:
+            idx = len(self.entries)
+            self.entries.append((tokens, dict(datalog)))
+            for band, key in keys:
+                self.buckets[band].setdefault(key, []).append(idx)
+
+    def _candidates(self, tokens: list[str]) -> set[int]:
+        found: set[int] = set()
+        for band, key in self._band_keys(self._signature(tokens)):
+            found.update(self.buckets[band].get(key, ()))
+        return found
+
+    def _rewrite(
+        self, cached_tokens: list[str], tokens: list[str], datalog: dict[str, str]
+    ) -> dict[str, str] | None:
+        matcher = difflib.SequenceMatcher(
+            None, _lower(cached_tokens), _lower(tokens), autojunk=False
+        )
+        substitutions = []
+        changed = 0
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == "equal":
+                continue
+            if op != "replace":
+                return None  # inserted or dropped words change the structure
+            old, new = cached_tokens[i1:i2], tokens[j1:j2]
+            if POLARITY_WORDS.intersection(_lower(old) + _lower(new)):
+                return None  # a permission would become a prohibition
+            if set(_lower(old)) <= STOPWORDS and set(_lower(new)) <= STOPWORDS:
+                continue
+            changed += max(len(old), len(new))
+            substitutions.append((old, new))
+        if changed > self.max_substitutions:
+            return None
+
+        # A new entity that already occurs in the cached Datalog would be
+        # merged with it by the substitution.
+        for _, new in substitutions:
+            for spelling in set(_spellings(new)):
+                if any(_mentions(value, spelling) for value in datalog.values()):
+                    return None
+
+        rewritten = dict(datalog)
+        for old, new in substitutions:
+            total = 0
+            spellings = dict(zip(_spellings(old), _spellings(new)))
+            for old_spelling, new_spelling in spellings.items():
+                for field, value in rewritten.items():
+                    rewritten[field], n = _replace_spelling(
+                        value, old_spelling, new_spelling
+                    )
+                    total += n
+            if total == 0:
+                return None
+            # Left inside a longer identifier (`has_doctor`), the old entity
+            # would survive next to the new one
+            for old_spelling in spellings:
+                if any(_mentions(v, old_spelling) for v in rewritten.values()):
+                    return None
+        return rewritten
+
+    def lookup(self, text: str) -> dict[str, str] | None:
+        with self.lock:
+            return self._lookup(text)
+
+    def _lookup(self, text: str) -> dict[str, str] | None:
+        tokens = tokenize(text)
+        scored = []
+        for idx in self._candidates(tokens):
+            cached_tokens, datalog = self.entries[idx]
+            ratio = difflib.SequenceMatcher(
+                None, _lower(cached_tokens), _lower(tokens), autojunk=False
+            ).ratio()
+            if ratio >= self.threshold:
+                scored.append((ratio, idx))
+
+        for _, idx in sorted(scored, reverse=True):
+            cached_tokens, datalog = self.entries[idx]
+            if _lower(cached_tokens) == _lower(tokens):
+                self.hits += 1
+                return dict(datalog)
+            rewritten = self._rewrite(cached_tokens, tokens, datalog)
+            if rewritten is not None:
+                self.hits += 1
+                return rewritten
+
+        self.misses += 1
+        return None
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return (
+            f"template cache: {self.hits}/{lookups} statements served from cache "
+            f"({rate:.1f}% LLM calls avoided, {len(self.entries)} templates)"
+        )
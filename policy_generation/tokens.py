@@ -0,0 +1,39 @@
+import math
+import re
+import threading
+
+# Roughly how BPE tokenizers split English: words, numbers and punctuation,
+# with long words costing about one token per four characters
+_PIECE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of `text` without loading a tokenizer."""
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _PIECE.findall(text))
+
+
+class TokenCounter:
+    """Estimated prompt and completion tokens sent to the backend."""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.lock = threading.Lock()
+
+    def add(self, prompt: str, completion: str) -> None:
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(completion)
+        with self.lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def report(self) -> str:
+        n = max(1, self.requests)
+        return (
+            f"tokens (estimated): {self.prompt_tokens} in / "
+            f"{self.completion_tokens} out over {self.requests} requests "
+            f"({self.prompt_tokens / n:.0f} in, {self.completion_tokens / n:.0f} out "
+            f"per request)"
+        )
@@ -0,0 +1,139 @@
+import json
+
+from policy_generation.backends import BackendError, GenerationBackend
+from policy_translation.datalog import (
+    DatalogSyntaxError,
+    parse_atoms,
+    parse_program,
+    safety_errors,
+)
+
+DATALOG_FIELDS = (
+    "datalog_subjects",
+    "datalog_objects",
+    "datalog_relationships",
+    "datalog_actions",
+)
+
+REPAIR_TEMPLATE = """Your previous translation of the input below is not valid Datalog.
+
+INPUT:
+{source}
+
+PREVIOUS JSON OUTPUT:
+{previous}
+
+PROBLEMS:
+{problems}
+
+Fix only these problems. Every rule must end with ".", use only
+predicates, variables, constants, "not" and comparisons (no functions,
+aggregates, "or", "and" or quantifiers; use ";" inside parentheses for
+disjunction), and every variable in the head, in a negated literal or in a
+comparison must also appear in a positive body predicate. Return the
+corrected JSON object with the same four keys."""
+
+
+class ResponseFormatError(ValueError):
+    """The model answered valid JSON that is not the expected object."""
+
+
+def _field_text(field: str, value: object) -> str:
+    if value is None or isinstance(value, str):
+        return value or ""
+    # Some answers list the rules of a field instead of joining them
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return "\n".join(value)
+    raise ResponseFormatError(f"{field} is a {type(value).__name__}, not text")
+
+
+def parse_response(content: str) -> dict[str, str]:
+    parsed = json.loads(content or "{}")
+    if not isinstance(parsed, dict):
+        raise ResponseFormatError(
+            f"expected a JSON object, got a {type(parsed).__name__}"
+        )
+    return {field: _field_text(field, parsed.get(field)) for field in DATALOG_FIELDS}
+
+
+def validate_datalog(fields: dict[str, str]) -> list[str]:
+    """Return the problems found in a generated Datalog record."""
+    problems = []
+    if not fields.get("datalog_actions", "").strip():
+        problems.append("datalog_actions: no authorization rule was produced")
+
+    for field in ("datalog_subjects", "datalog_objects"):
+        text = fields.get(field, "")
+        try:
+            parse_atoms(text)
+        except DatalogSyntaxError:
+            # Some answers declare subjects/objects through rules
+            try:
+                parse_program(text)
+            except DatalogSyntaxError as e:
+                problems.append(f"{field}: syntax error, {e}")
+
+    for field in ("datalog_relationships", "datalog_actions"):
+        try:
+            rules = parse_program(fields.get(field, ""))
+        except DatalogSyntaxError as e:
+            problems.append(f"{field}: syntax error, {e}")
+            continue
+        for rule in rules:
+            problems.extend(f"{field}: {error}" for error in safety_errors(rule))
+    return problems
+
+
+class Validator:
+    """Check each generated record and ask the backend to repair bad ones.
+
+    Only records with problems cost an extra request; the repair prompt names
+    the problems so the model fixes them instead of translating again.
+    """
+
+    def __init__(
+        self, backend: GenerationBackend, system_prompt: str, max_repairs: int = 1
+    ):
+        self.backend = backend
+        self.system_prompt = system_prompt
+        self.max_repairs = max_repairs
+        self.checked = 0
+        self.invalid = 0
+        self.repaired = 0
+        self.unresolved = 0
+
+    def check(self, source: str, fields: dict[str, str]) -> dict[str, str]:
+        self.checked += 1
+        problems = validate_datalog(fields)
+        if not problems:
+            return fields
+        self.invalid += 1
+
+        for _ in range(self.max_repairs):
+            prompt = REPAIR_TEMPLATE.format(
+                source=source,
+                previous=json.dumps(fields, indent=2),
+                problems="\n".join(f"- {p}" for p in problems),
+            )
+            try:
+                candidate = parse_response(
+                    self.backend.complete(self.system_prompt, prompt)
+                )
+            except (BackendError, json.JSONDecodeError, ResponseFormatError):
+                break
+            candidate_problems = validate_datalog(candidate)
+            if len(candidate_problems) < len(problems):
+                fields, problems = candidate, candidate_problems
+            if not problems:
+                self.repaired += 1
+                return fields
+
+        self.unresolved += 1
+        print(f"✗ invalid Datalog kept after repair: {'; '.join(problems)}")
+        return fields
+
+    def report(self) -> str:
+        return (
+            f"validation: {self.invalid}/{self.checked} records invalid, "
+            f"{self.repaired} repaired, {self.unresolved} unresolved"
+        )
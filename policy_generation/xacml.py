@@ -1,83 +1,95 @@
-import json
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
-import pandas as pd
+import functools
+import sys
 from pathlib import Path
 
+from policy_generation.backends import GenerationBackend, make_backend
+from policy_generation.validation import Validator, parse_response
+from policy_generation.xacml_canonical import CompactionStats, canonicalize, legend
+from policy_generation.xacml_chunks import translate_chunked
 
-API_KEY: str | None | RuntimeError = (
-    os.getenv("DEEPSEEK_API_KEY")
-    if load_dotenv(dotenv_path=".env")
-    else RuntimeError(".env file NOT found!")
-)
+INPUT_DIR = Path("policy_generation/input/xacml")
+OUTPUT_DIR = Path("policy_generation/output/xacml")
+SYSTEM_PROMPT_PATH = Path("policy_generation/input/prompts/system_prompt_for_xacml.txt")
 
-# For type checking
-assert isinstance(API_KEY, str)
+compaction = CompactionStats()
 
-client = OpenAI(
-    api_key=API_KEY,
-    base_url="https://api.deepseek.com",
-)
+
+@functools.cache
+def get_backend() -> GenerationBackend:
+    # GENERATION_BACKEND=deepseek|ollama|llamacpp selects the provider
+    return make_backend()
+
+
+def compact_prompt(xacml_str: str) -> str:
+    # Aliased URNs and no whitespace or defaults: about half the tokens
+    compact = canonicalize(xacml_str)
+    prompt = "\n".join(filter(None, [legend(compact), compact]))
+    compaction.add(xacml_str, prompt)
+    return prompt
 
 
 def translate2datalog(xacml_str: str) -> dict[str, str]:
-    system_prompt_path = Path(
-        "policy_generation/input/prompts/system_prompt_for_xacml.txt"
-    )
-    system_prompt = system_prompt_path.read_text(encoding="utf-8")
-    response = client.chat.completions.create(
-        model="deepseek-chat",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": xacml_str,
-            },
-        ],
-        response_format={"type": "json_object"},
-    )
-
-    content = response.choices[0].message.content or "{}"
-    parsed = json.loads(content)
-
-    return {
-        "datalog_subjects": parsed.get("datalog_subjects", ""),
-        "datalog_objects": parsed.get("datalog_objects", ""),
-        "datalog_relationships": parsed.get("datalog_relationships", ""),
-        "datalog_actions": parsed.get("datalog_actions", ""),
-    }
-
-
-input_xacml_dir = Path("policy_generation/input/xacml")
-output_xacml_dir = Path("policy_generation/output/xacml")
-output_xacml_dir.mkdir(parents=True, exist_ok=True)
-
-# Recursively find all XML files
-xml_files = list(input_xacml_dir.rglob("*.xml"))
-print(f"Found {len(xml_files)} XML files to process")
-
-for xml_file in xml_files:
-    # get relative path to maintain directory structure
-    relative_path = xml_file.relative_to(input_xacml_dir)
-    output_subdir = output_xacml_dir / relative_path.parent
-    output_subdir.mkdir(parents=True, exist_ok=True)
-
-    print(f"\nProcessing {relative_path}...")
-    try:
-        xacml_str = xml_file.read_text(encoding="utf-8")
-        json_res = translate2datalog(xacml_str)
-        json_res["xacml"] = xacml_str
-
-        df = pd.DataFrame([json_res])
-        if "xacml" in df.columns:
-            cols = ["xacml"] + [c for c in df.columns if c != "xacml"]
-            df = df[cols]
-
-        output_csv_path = output_subdir / f"{xml_file.stem}.csv"
-        df.to_csv(output_csv_path, index=False)
-        print(f"✓ Saved to {output_csv_path.relative_to(output_xacml_dir.parent)}")
-    except Exception as e:
-        print(f"✗ Error processing {relative_path}: {e}")
-
-print(f"\nAll files processed. Output saved to {output_xacml_dir}")
+    backend = get_backend()
+    system_prompt = SYSTEM_PROMPT_PATH.read_text(encoding="utf-8")
+    prompt = compact_prompt(xacml_str)
+    content = backend.complete(system_prompt, prompt)
+    # Malformed or unsafe Datalog gets one targeted repair request
+    return Validator(backend, system_prompt).check(prompt, parse_response(content))
+
+
+def translate_xacml(xacml_str: str) -> dict[str, str]:
+    """Translate one XACML document; large policy sets go in parallel chunks."""
+    return translate_chunked(xacml_str, translate2datalog, get_backend().num_parallel)
+
+
+def output_path_for(xml_file: Path) -> Path:
+    # keep the directory structure of the input tree
+    xml_file = Path(xml_file)
+    if not xml_file.is_relative_to(INPUT_DIR):
+        return OUTPUT_DIR / xml_file.parent.name / xml_file.with_suffix(".csv").name
+    return OUTPUT_DIR / xml_file.relative_to(INPUT_DIR).with_suffix(".csv")
+
+
+def translate_file(xml_file: Path, output_csv_path: Path) -> None:
+    xacml_str = Path(xml_file).read_text(encoding="utf-8")
+    json_res = translate_xacml(xacml_str)
+    json_res["xacml"] = xacml_str
+
+    import pandas as pd
+
+    df = pd.DataFrame([json_res])
+    if "xacml" in df.columns:
+        cols = ["xacml"] + [c for c in df.columns if c != "xacml"]
+        df = df[cols]
+
+    Path(output_csv_path).parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(output_csv_path, index=False)
+
+
+def main(xml_files: list[Path] | None = None) -> None:
+    if xml_files is None:
+        # Recursively find all XML files
+        xml_files = list(INPUT_DIR.rglob("*.xml"))
+    print(f"Found {len(xml_files)} XML files to process")
+
+    for xml_file in xml_files:
+        relative_path = (
+            xml_file.relative_to(INPUT_DIR)
+            if xml_file.is_relative_to(INPUT_DIR)
+            else xml_file
+        )
+        print(f"\nProcessing {relative_path}...")
+        try:
+            output_csv_path = output_path_for(xml_file)
+            translate_file(xml_file, output_csv_path)
+            print(f"✓ Saved to {output_csv_path.relative_to(OUTPUT_DIR.parent)}")
+        except Exception as e:
+            print(f"✗ Error processing {relative_path}: {e}")
+
+    print(compaction.report())
+    print(f"\nAll files processed. Output saved to {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    # Files outside INPUT_DIR, e.g. datasets/xacml/XACs-DyPol/*.xml, may be named
+    main([Path(arg) for arg in sys.argv[1:]] or None)
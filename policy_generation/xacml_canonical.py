@@ -0,0 +1,196 @@
+"""Compact, reversible form of XACML documents for generation prompts.
+
+`canonicalize` drops namespaces, comments and insignificant whitespace,
+replaces the standard function, category, identifier, algorithm and
+datatype URN prefixes with short aliases (`fn:string-equal`, `xs:string`)
+and removes attributes that carry their default value: `DataType` of
+`xs:string`, `MustBePresent="false"` and `Version="1.0"`.  `expand`
+restores the URNs and `DataType`; the other defaults are implied by the
+schema.  Descriptions are kept unless `descriptions=False`.
+
+`legend` names the aliases a compact document uses so that the model can
+read them.
+
+    python -m policy_generation.xacml_canonical datasets/xacml/XACs-DyPol/*.xml
+"""
+
+import argparse
+import sys
+import threading
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from policy_generation.tokens import estimate_tokens
+
+ALIASES = {
+    "fn:": "urn:oasis:names:tc:xacml:1.0:function:",
+    "fn2:": "urn:oasis:names:tc:xacml:2.0:function:",
+    "fn3:": "urn:oasis:names:tc:xacml:3.0:function:",
+    "xs:": "http://www.w3.org/2001/XMLSchema#",
+    "dt:": "urn:oasis:names:tc:xacml:1.0:data-type:",
+    "dt2:": "urn:oasis:names:tc:xacml:2.0:data-type:",
+    "dt3:": "urn:oasis:names:tc:xacml:3.0:data-type:",
+    "subject:": "urn:oasis:names:tc:xacml:1.0:subject:",
+    "resource:": "urn:oasis:names:tc:xacml:1.0:resource:",
+    "action:": "urn:oasis:names:tc:xacml:1.0:action:",
+    "environment:": "urn:oasis:names:tc:xacml:1.0:environment:",
+    "subject-category:": "urn:oasis:names:tc:xacml:1.0:subject-category:",
+    "category:": "urn:oasis:names:tc:xacml:3.0:attribute-category:",
+    "rule-alg:": "urn:oasis:names:tc:xacml:1.0:rule-combining-algorithm:",
+    "rule-alg3:": "urn:oasis:names:tc:xacml:3.0:rule-combining-algorithm:",
+    "policy-alg:": "urn:oasis:names:tc:xacml:1.0:policy-combining-algorithm:",
+    "policy-alg3:": "urn:oasis:names:tc:xacml:3.0:policy-combining-algorithm:",
+}
+# Longest prefix first so that no URN is shortened by a shorter prefix
+_BY_PREFIX = sorted(ALIASES.items(), key=lambda item: -len(item[1]))
+
+# Elements whose DataType is required by the schema, so a missing one is ours
+TYPED = {
+    "AttributeValue",
+    "AttributeDesignator",
+    "AttributeSelector",
+    "SubjectAttributeDesignator",
+    "ResourceAttributeDesignator",
+    "ActionAttributeDesignator",
+    "EnvironmentAttributeDesignator",
+}
+STRING = "xs:string"
+DEFAULTS = {"MustBePresent": "false", "Version": "1.0"}
+
+
+def legend(compact: str) -> str:
+    """One line naming the aliases `compact` uses, to send along with it."""
+    used = [
+        alias for alias in ALIASES if f'"{alias}' in compact or f">{alias}" in compact
+    ]
+    if not used:
+        return ""
+    return "Prefixes: " + ", ".join(f"{alias} = {ALIASES[alias]}" for alias in used)
+
+
+def _local(name: str) -> str:
+    return name.rsplit("}", 1)[-1]
+
+
+def shorten(value: str) -> str:
+    for alias, urn in _BY_PREFIX:
+        if value.startswith(urn):
+            return alias + value[len(urn) :]
+    if any(value.startswith(alias) for alias in ALIASES):
+        raise ValueError(f"{value!r} already starts with an alias")
+    return value
+
+
+def lengthen(value: str) -> str:
+    alias, sep, rest = value.partition(":")
+    urn = ALIASES.get(alias + sep) if sep else None
+    return urn + rest if urn else value
+
+
+def _compact(element: ET.Element, descriptions: bool) -> ET.Element | None:
+    tag = _local(element.tag)
+    if tag == "Description" and not descriptions:
+        return None
+    attrib = {}
+    for name, value in element.attrib.items():
+        name = _local(name)  # drops xsi:schemaLocation's namespace too
+        if name == "schemaLocation" or DEFAULTS.get(name) == value:
+            continue
+        value = shorten(value)
+        if name == "DataType" and value == STRING and tag in TYPED:
+            continue
+        attrib[name] = value
+    compact = ET.Element(tag, attrib)
+    text = (element.text or "").strip()
+    if text:
+        compact.text = shorten(" ".join(text.split()) if tag == "Description" else text)
+    for child in element:
+        if isinstance(child.tag, str):
+            child = _compact(child, descriptions)
+            if child is not None:
+                compact.append(child)
+    return compact
+
+
+def canonicalize(xacml_str: str, descriptions: bool = True) -> str:
+    """Compact form of `xacml_str`.
+
+    Input that does not parse, or that already uses an alias as a literal
+    prefix and so could not be expanded again, is returned unchanged.
+    """
+    try:
+        return ET.tostring(
+            _compact(ET.fromstring(xacml_str), descriptions), encoding="unicode"
+        )
+    except (ET.ParseError, ValueError):
+        return xacml_str
+
+
+def expand(compact: str, namespace: str | None = None) -> str:
+    """Inverse of `canonicalize`, up to the defaults the schema implies."""
+    root = ET.fromstring(compact)
+    for element in root.iter():
+        tag = element.tag
+        for name, value in element.attrib.items():
+            element.set(name, lengthen(value))
+        if tag in TYPED and "DataType" not in element.attrib:
+            element.set("DataType", lengthen(STRING))
+        if element.text:
+            element.text = lengthen(element.text)
+        if namespace:
+            element.tag = f"{{{namespace}}}{tag}"
+    if namespace:
+        ET.register_namespace("", namespace)
+    return ET.tostring(root, encoding="unicode")
+
+
+class CompactionStats:
+    """Estimated prompt tokens before and after canonicalization."""
+
+    def __init__(self):
+        self.documents = 0
+        self.before = 0
+        self.after = 0
+        self.lock = threading.Lock()
+
+    def add(self, original: str, compact: str) -> None:
+        before, after = estimate_tokens(original), estimate_tokens(compact)
+        with self.lock:
+            self.documents += 1
+            self.before += before
+            self.after += after
+
+    def report(self) -> str:
+        saved = 1 - self.after / self.before if self.before else 0.0
+        return (
+            f"xacml compaction: {self.before} -> {self.after} tokens "
+            f"({saved:.0%} fewer) over {self.documents} documents"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("files", type=Path, nargs="+", help="XACML .xml files")
+    parser.add_argument("--no-descriptions", action="store_true")
+    parser.add_argument("--show", action="store_true", help="print the compact form")
+    args = parser.parse_args(argv)
+
+    stats = CompactionStats()
+    for path in args.files:
+        original = path.read_text(encoding="utf-8")
+        compact = canonicalize(original, descriptions=not args.no_descriptions)
+        # Expanding and compacting again must give the same text
+        assert canonicalize(expand(compact)) == compact, path
+        stats.add(original, compact)
+        print(
+            f"{path}: {estimate_tokens(original)} -> {estimate_tokens(compact)} "
+            f"tokens, {len(original)} -> {len(compact)} chars"
+        )
+        if args.show:
+            print(compact)
+    print(stats.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
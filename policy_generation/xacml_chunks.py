@@ -0,0 +1,223 @@
+"""Split oversized XACML policy sets into self-contained chunks.
+
+A PolicySet larger than `max_chars` is broken into groups of its child
+Policy/PolicySet elements, and a Policy that is still too large into groups
+of its Rules.  Every chunk is wrapped in copies of its ancestors with their
+attributes, Target, VariableDefinitions and obligations but without their
+other children, so each chunk carries the context it inherits.  Chunks are
+translated concurrently and their Datalog merged: predicate names that
+differ only in case or underscores get the first spelling seen, and
+duplicate declarations and rules are dropped.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, replace
+from typing import Callable
+
+from policy_generation.ingest import bounded_map
+from policy_translation.datalog import (
+    Atom,
+    DatalogSyntaxError,
+    Disjunction,
+    Rule,
+    parse_atoms,
+    parse_program,
+)
+
+MAX_CHUNK_CHARS = 12000
+
+# Children a container can be split into; everything else is context
+PARTS = {
+    "PolicySet": {"Policy", "PolicySet", "PolicyIdReference", "PolicySetIdReference"},
+    "Policy": {"Rule"},
+}
+
+
+@dataclass
+class Chunk:
+    path: str  # ids of the enclosing policies and of the first part
+    xml: str
+
+
+def local_name(element: ET.Element) -> str:
+    if not isinstance(element.tag, str):  # comments
+        return ""
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def element_id(element: ET.Element) -> str:
+    for key in ("PolicySetId", "PolicyId", "RuleId"):
+        if key in element.attrib:
+            return element.attrib[key]
+    return (element.text or "").strip() or local_name(element)
+
+
+def _size(element: ET.Element) -> int:
+    return len(ET.tostring(element, encoding="unicode"))
+
+
+class Shell:
+    """An ancestor without its parts; `position` is where the parts go."""
+
+    def __init__(self, element: ET.Element):
+        parts = PARTS[local_name(element)]
+        self.element = ET.Element(element.tag, element.attrib)
+        self.element.text = element.text
+        self.position = None
+        for child in element:
+            if local_name(child) in parts:
+                if self.position is None:
+                    self.position = len(self.element)
+            else:
+                self.element.append(child)
+        if self.position is None:
+            self.position = len(self.element)
+        self.size = _size(self.element)
+
+    def wrap(self, children: list[ET.Element]) -> ET.Element:
+        element = ET.Element(self.element.tag, self.element.attrib)
+        element.text = self.element.text
+        context = list(self.element)
+        element.extend(context[: self.position] + children + context[self.position :])
+        return element
+
+
+def _wrap(ancestors: list[Shell], parts: list[ET.Element]) -> ET.Element:
+    for shell in reversed(ancestors):
+        parts = [shell.wrap(parts)]
+    return parts[0]
+
+
+def _split(
+    element: ET.Element, ancestors: list[Shell], max_chars: int
+) -> list[tuple[list[Shell], list[ET.Element]]]:
+    if local_name(element) not in PARTS or _size(element) <= max_chars:
+        return [(ancestors, [element])]
+    shell = Shell(element)
+    ancestors = ancestors + [shell]
+    budget = max_chars - sum(a.size for a in ancestors)
+    parts = PARTS[local_name(element)]
+    groups, group, size = [], [], 0
+    for child in element:
+        if local_name(child) not in parts:
+            continue
+        n = _size(child)
+        if n > budget and local_name(child) in PARTS:
+            if group:
+                groups.append((ancestors, group))
+                group, size = [], 0
+            groups.extend(_split(child, ancestors, max_chars))
+            continue
+        # A single Rule over the budget still becomes its own chunk
+        if group and size + n > budget:
+            groups.append((ancestors, group))
+            group, size = [], 0
+        group.append(child)
+        size += n
+    if group:
+        groups.append((ancestors, group))
+    return groups
+
+
+def split_policy(xacml_str: str, max_chars: int = MAX_CHUNK_CHARS) -> list[Chunk]:
+    """Chunks of at most about `max_chars` characters; one chunk if it fits."""
+    if len(xacml_str) <= max_chars:
+        return [Chunk("", xacml_str)]
+    parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+    root = ET.fromstring(xacml_str, parser=parser)
+    namespace = re.match(r"\{(.*)\}", root.tag)
+    if namespace:
+        # Serialise with the default namespace instead of ns0: prefixes
+        ET.register_namespace("", namespace.group(1))
+    chunks = []
+    for ancestors, parts in _split(root, [], max_chars):
+        ids = [element_id(a.element) for a in ancestors] + [element_id(parts[0])]
+        xml = ET.tostring(_wrap(ancestors, parts), encoding="unicode")
+        chunks.append(Chunk("/".join(ids), xml))
+    return chunks
+
+
+def predicate_key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+class PredicateNames:
+    """First spelling seen for each predicate, keyed by `predicate_key`."""
+
+    def __init__(self):
+        self.names: dict[str, str] = {}
+
+    def atom(self, atom: Atom) -> Atom:
+        name = self.names.setdefault(predicate_key(atom.name), atom.name)
+        return atom if name == atom.name else replace(atom, name=name)
+
+    def literal(self, literal):
+        if isinstance(literal, Atom):
+            return self.atom(literal)
+        if isinstance(literal, Disjunction):
+            branches = tuple(tuple(map(self.literal, b)) for b in literal.branches)
+            return replace(literal, branches=branches)
+        return literal
+
+    def rule(self, rule: Rule) -> Rule:
+        return Rule(self.atom(rule.head), tuple(map(self.literal, rule.body)))
+
+
+DECLARATION_FIELDS = ("datalog_subjects", "datalog_objects")
+
+
+def _statements(field: str, text: str, names: PredicateNames) -> list[str]:
+    if field in DECLARATION_FIELDS:
+        try:
+            return [str(names.atom(a)) for a in parse_atoms(text)]
+        except DatalogSyntaxError:
+            pass  # some answers declare subjects/objects through rules
+    try:
+        return [str(names.rule(r)) for r in parse_program(text)]
+    except DatalogSyntaxError:
+        # Unparseable output is kept as is for the validator to report
+        return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def merge_datalog(results: list[dict[str, str]]) -> dict[str, str]:
+    """Merge per-chunk Datalog records into one record."""
+    names = PredicateNames()
+    merged = {}
+    for field in results[0] if results else ():
+        statements = list(
+            dict.fromkeys(
+                s
+                for result in results
+                for s in _statements(field, result[field], names)
+            )
+        )
+        if field in DECLARATION_FIELDS and not any(":-" in s for s in statements):
+            merged[field] = ", ".join(statements) + ("." if statements else "")
+        else:
+            merged[field] = " ".join(statements)
+    return merged
+
+
+def translate_chunked(
+    xacml_str: str,
+    translate: Callable[[str], dict[str, str]],
+    max_workers: int,
+    max_chars: int = MAX_CHUNK_CHARS,
+) -> dict[str, str]:
+    """Translate the chunks of `xacml_str` concurrently and merge the results.
+
+    A chunk whose translation fails fails the whole file, as an unchunked
+    request would.
+    """
+    chunks = split_policy(xacml_str, max_chars)
+    if len(chunks) == 1:
+        return translate(chunks[0].xml)
+    results = []
+    for chunk, result in bounded_map(
+        lambda chunk: translate(chunk.xml), chunks, max_workers=max_workers
+    ):
+        if isinstance(result, Exception):
+            raise result
+        results.append(result)
+    return merge_datalog(results)
@@ -3,8 +3,6 @@ from pathlib import Path
 import re
 import os
 
-import pandas as pd
-
 
 def parse_term(term):
     term = term.strip()
@@ -89,6 +87,58 @@ def parse_predicate(pred_str):
     return pred_str
 
 
+def convert_action(action):
+    """SWRL rule for one datalog_actions cell, or None when it has no rule."""
+    # Remove newlines
+    action = action.replace("\n", " ")
+
+    # Split Head :- Body
+    if ":-" not in action:
+        # Fact?
+        return None
+    parts = action.split(":-")
+    head_str = parts[0].strip()
+    body_str = parts[1].strip()
+    if body_str.endswith("."):
+        body_str = body_str[:-1]
+
+    # Parse Head
+    head_formatted = parse_predicate(head_str)
+
+    # Parse Body
+    body_preds = []
+    current = ""
+    depth = 0
+    for char in body_str:
+        if char == "(":
+            depth += 1
+            current += char
+        elif char == ")":
+            depth -= 1
+            current += char
+        elif char == "," and depth == 0:
+            body_preds.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current:
+        body_preds.append(current.strip())
+
+    formatted_body_preds = []
+    for pred in body_preds:
+        formatted_body_preds.append(parse_predicate(pred))
+
+    # Construct SWRL
+    # Body => Head
+    return f"{' ∧ '.join(formatted_body_preds)} => {head_formatted}"
+
+
+def translate_row(row):
+    """Input row with a `carminati` column, or [] when it has no rule."""
+    swrl = convert_action(row.get("datalog_actions", "") or "")
+    return [{**row, "carminati": swrl}] if swrl is not None else []
+
+
 def convert_datalog_to_carminati(csv_path):
     results = []
     if not os.path.exists(csv_path):
@@ -101,51 +151,9 @@ def convert_datalog_to_carminati(csv_path):
             action = row.get("datalog_actions", "")
             if not action:
                 continue
-
-            # Remove newlines
-            action = action.replace("\n", " ")
-
-            # Split Head :- Body
-            if ":-" in action:
-                parts = action.split(":-")
-                head_str = parts[0].strip()
-                body_str = parts[1].strip()
-                if body_str.endswith("."):
-                    body_str = body_str[:-1]
-
-                # Parse Head
-                head_formatted = parse_predicate(head_str)
-
-                # Parse Body
-                body_preds = []
-                current = ""
-                depth = 0
-                for char in body_str:
-                    if char == "(":
-                        depth += 1
-                        current += char
-                    elif char == ")":
-                        depth -= 1
-                        current += char
-                    elif char == "," and depth == 0:
-                        body_preds.append(current.strip())
-                        current = ""
-                    else:
-                        current += char
-                if current:
-                    body_preds.append(current.strip())
-
-                formatted_body_preds = []
-                for pred in body_preds:
-                    formatted_body_preds.append(parse_predicate(pred))
-
-                # Construct SWRL
-                # Body => Head
-                swrl = f"{' ∧ '.join(formatted_body_preds)} => {head_formatted}"
-                results.append(f"{swrl}")
-            else:
-                # Fact?
-                pass
+            swrl = convert_action(action)
+            if swrl is not None:
+                results.append(swrl)
 
     return results
 
@@ -168,6 +176,8 @@ def translate(input_path: Path, output_path: Path):
         for rule in acre_acp_swrl_rules:
             writer.writerow([rule])
     # merge the output csv file with input csv file using pandas
+    import pandas as pd
+
     acre_acp_input_df = pd.read_csv(acre_acp_input_path)
     acre_acp_output_df = pd.read_csv(output_path)
     acre_acp_merged_df = pd.concat([acre_acp_input_df, acre_acp_output_df], axis=1)
@@ -178,47 +188,32 @@ def translate(input_path: Path, output_path: Path):
 
 if __name__ == "__main__":
     # Natural Language
-    acre_acp_input_path = Path("policy_generation/output/litroacp/acre_acp.csv")
-    acre_acp_output_path = Path("policy_translation/output/carminati/acre_acp.csv")
-    translate(acre_acp_input_path, acre_acp_output_path)
-    collected_acp_input_path = Path(
-        "policy_generation/output/litroacp/collected_acp.csv"
-    )
-    collected_acp_output_path = Path(
-        "policy_translation/output/carminati/collected_acp.csv"
-    )
-    translate(collected_acp_input_path, collected_acp_output_path)
-    cyber_acp_input_path = Path("policy_generation/output/litroacp/cyber_acp.csv")
-    cyber_acp_output_path = Path("policy_translation/output/carminati/cyber_acp.csv")
-    translate(cyber_acp_input_path, cyber_acp_output_path)
-    ibm_acp_input_path = Path("policy_generation/output/litroacp/ibm_acp.csv")
-    ibm_acp_output_path = Path("policy_translation/output/carminati/ibm_acp.csv")
-    translate(ibm_acp_input_path, ibm_acp_output_path)
-    t2p_acp_input_path = Path("policy_generation/output/litroacp/t2p_acp.csv")
-    t2p_acp_output_path = Path("policy_translation/output/carminati/t2p_acp.csv")
-    translate(t2p_acp_input_path, t2p_acp_output_path)
+    files = [
+        "acre_acp.csv",
+        "collected_acp.csv",
+        "cyber_acp.csv",
+        "ibm_acp.csv",
+        "t2p_acp.csv",
+    ]
+
+    for fname in files:
+        translate(
+            Path(f"policy_generation/output/litroacp/{fname}"),
+            Path(f"policy_translation/output/carminati/{fname}"),
+        )
 
     # XACML
-    xacml2_1_input_path = Path("policy_generation/output/xacml/xacBench/xacml2_1.csv")
-    xacml2_1_output_path = Path("policy_translation/output/carminati/xacml2_1.csv")
-    translate(xacml2_1_input_path, xacml2_1_output_path)
-
-    xacml2_2_input_path = Path("policy_generation/output/xacml/xacBench/xacml2_2.csv")
-    xacml2_2_output_path = Path("policy_translation/output/carminati/xacml2_2.csv")
-    translate(xacml2_2_input_path, xacml2_2_output_path)
-
-    xacml2_3_input_path = Path("policy_generation/output/xacml/xacBench/xacml2_3.csv")
-    xacml2_3_output_path = Path("policy_translation/output/carminati/xacml2_3.csv")
-    translate(xacml2_3_input_path, xacml2_3_output_path)
-
-    xacml3_1_input_path = Path("policy_generation/output/xacml/xacBench/xacml3_1.csv")
-    xacml3_1_output_path = Path("policy_translation/output/carminati/xacml3_1.csv")
-    translate(xacml3_1_input_path, xacml3_1_output_path)
-
-    xacml3_2_input_path = Path("policy_generation/output/xacml/xacBench/xacml3_2.csv")
-    xacml3_2_output_path = Path("policy_translation/output/carminati/xacml3_2.csv")
-    translate(xacml3_2_input_path, xacml3_2_output_path)
-
-    xacml3_3_input_path = Path("policy_generation/output/xacml/xacBench/xacml3_3.csv")
-    xacml3_3_output_path = Path("policy_translation/output/carminati/xacml3_3.csv")
-    translate(xacml3_3_input_path, xacml3_3_output_path)
+    xacml_files = [
+        "xacml2_1.csv",
+        "xacml2_2.csv",
+        "xacml2_3.csv",
+        "xacml3_1.csv",
+        "xacml3_2.csv",
+        "xacml3_3.csv",
+    ]
+
+    for fname in xacml_files:
+        translate(
+            Path(f"policy_generation/output/xacml/xacBench/{fname}"),
+            Path(f"policy_translation/output/carminati/{fname}"),
+        )
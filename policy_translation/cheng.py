@@ -4,10 +4,20 @@ import os
 from pathlib import Path
 import collections
 
+from policy_translation.memo import TranslationMemo
+from policy_translation.unfolding import UnfoldStats, unfold_rules
+
+# Shared by every translator in the process that opts in (memo=True), so
+# shapes carry over datasets
+MEMO = TranslationMemo()
+
 
 class ChengTranslator:
-    def __init__(self):
-        pass
+    def __init__(self, unfold=True, memo=False):
+        # Unfold helper predicates into the rules before translating them
+        self.unfold = unfold
+        self.unfold_stats = UnfoldStats()
+        self.memo = MEMO if memo else None
 
     def parse_datalog_rule(self, rule_str):
         rule_str = rule_str.strip().rstrip(".")
@@ -58,9 +68,9 @@ class ChengTranslator:
             args = [a.strip() for a in match.group(2).split(",")]
             return {"name": name, "args": args, "negated": is_negated}
 
-        # Handle constraints
-        if any(op in pred_str for op in [">=", "<=", "==", ">", "<", "!="]):
-            return {"name": "constraint", "raw": pred_str, "negated": False}
+        # Handle constraints (not part of the translated output)
+        if any(op in pred_str for op in ["=", ">", "<", " in "]):
+            return {"name": "constraint", "raw": pred_str, "negated": is_negated}
 
         return None
 
@@ -99,8 +109,8 @@ class ChengTranslator:
 
         return adj
 
-    def find_all_paths(self, adj, start, end, path=[]):
-        path = path + [start]
+    def find_all_paths(self, adj, start, end, path=None):
+        path = (path or []) + [start]
         if start == end:
             return [
                 []
@@ -164,6 +174,11 @@ class ChengTranslator:
             return f"¬ {path_spec}"
         return path_spec
 
+    def translate_memoized(self, rule_str):
+        if self.memo is None:
+            return self.translate_rule(rule_str)
+        return self.memo.translate(rule_str, self.translate_rule)
+
     def translate_rule(self, rule_str):
         head, body = self.parse_datalog_rule(rule_str)
         if not head:
@@ -243,6 +258,63 @@ class ChengTranslator:
         full_policy = f"< {action}, {' ∧ '.join(path_rules)} >"
         return full_policy
 
+    def translate_row(self, row, source_type="natural_language_statements"):
+        """Translate one generated row; returns the output rows (zero or one)."""
+        type = ""
+        if source_type == "natural_language_statements":
+            type = source_type
+        elif source_type == "xacml":
+            type = "xacml"
+        first_field = row.get(type, "")
+        datalog_subject = row.get("datalog_subjects", "")
+        datalog_object = row.get("datalog_objects", "")
+        datalog_relationships = row.get("datalog_relationships", "")
+        datalog_action = row.get("datalog_actions", "")
+
+        # Split by newline if multiple
+        # But usually one rule per line in this dataset?
+        # The example showed multiple rules in one cell sometimes?
+        # "has_filter... has_criteria... is_empty... can_modify..."
+        # We only care about the rule that defines the action in the head?
+        # Or all of them?
+        # Usually the last one is the main authorization rule.
+        # I'll try to parse all, but filter for the one that looks like an authorization (can_...).
+
+        if self.unfold:
+            rules = [
+                rule
+                for _, rule in unfold_rules(
+                    datalog_relationships, datalog_action, self.unfold_stats
+                )
+            ]
+        else:
+            rules = datalog_action.split("\n")
+        converted_policies = []
+        for rule in rules:
+            if not rule.strip():
+                continue
+            # Heuristic: only translate rules starting with "can_" or "authorized"
+            # Or just translate everything.
+            # But helper rules like "has_specialty" are not policies.
+            if rule.strip().startswith("can_") or rule.strip().startswith("authorized"):
+                policy = self.translate_memoized(rule)
+                if policy:
+                    converted_policies.append(policy)
+
+        if not converted_policies:
+            # If no can_ rule found, maybe just try to translate the last one?
+            return []
+        return [
+            {
+                source_type: first_field,
+                "datalog_subjects": datalog_subject,
+                "datalog_objects": datalog_object,
+                "datalog_relationships": datalog_relationships,
+                "datalog_actions": datalog_action,
+                "cheng": "\n".join(converted_policies),
+            }
+        ]
+
     def process_csv(
         self, input_file, output_file, source_type="natural_language_statements"
     ):
@@ -250,67 +322,7 @@ class ChengTranslator:
         with open(input_file, "r") as f:
             reader = csv.DictReader(f)
             for row in reader:
-                type = ""
-                if source_type == "natural_language_statements":
-                    type = source_type
-                elif source_type == "xacml":
-                    type = "xacml"
-                first_field = row.get(type, "")
-                datalog_subject = row.get("datalog_subjects", "")
-                datalog_object = row.get("datalog_objects", "")
-                datalog_relationships = row.get("datalog_relationships", "")
-                datalog_action = row.get("datalog_actions", "")
-
-                # Split by newline if multiple
-                # But usually one rule per line in this dataset?
-                # The example showed multiple rules in one cell sometimes?
-                # "has_filter... has_criteria... is_empty... can_modify..."
-                # We only care about the rule that defines the action in the head?
-                # Or all of them?
-                # Usually the last one is the main authorization rule.
-                # I'll try to parse all, but filter for the one that looks like an authorization (can_...).
-
-                rules = datalog_action.split("\n")
-                converted_policies = []
-                for rule in rules:
-                    if not rule.strip():
-                        continue
-                    # Heuristic: only translate rules starting with "can_" or "authorized"
-                    # Or just translate everything.
-                    # But helper rules like "has_specialty" are not policies.
-                    if rule.strip().startswith("can_") or rule.strip().startswith(
-                        "authorized"
-                    ):
-                        policy = self.translate_rule(rule)
-                        if policy:
-                            converted_policies.append(policy)
-
-                if converted_policies:
-                    if source_type == "natural_language_statements":
-                        results.append(
-                            {
-                                "natural_language_statements": first_field,
-                                "datalog_subjects": datalog_subject,
-                                "datalog_objects": datalog_object,
-                                "datalog_relationships": datalog_relationships,
-                                "datalog_actions": datalog_action,
-                                "cheng": "\n".join(converted_policies),
-                            }
-                        )
-                    elif source_type == "xacml":
-                        results.append(
-                            {
-                                "xacml": first_field,
-                                "datalog_subjects": datalog_subject,
-                                "datalog_objects": datalog_object,
-                                "datalog_relationships": datalog_relationships,
-                                "datalog_actions": datalog_action,
-                                "cheng": "\n".join(converted_policies),
-                            }
-                        )
-                else:
-                    # If no can_ rule found, maybe just try to translate the last one?
-                    pass
+                results.extend(self.translate_row(row, source_type))
 
         # Write output
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
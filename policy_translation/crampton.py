@@ -5,10 +5,20 @@ import re
 import os
 from pathlib import Path
 
+from policy_translation.memo import TranslationMemo
+from policy_translation.unfolding import UnfoldStats, unfold_rules
+
+# Shared by every translator in the process that opts in (memo=True), so
+# shapes carry over datasets
+MEMO = TranslationMemo()
+
 
 class CramptonTranslator:
-    def __init__(self):
-        pass
+    def __init__(self, unfold=True, memo=False):
+        # Unfold helper predicates into the rules before translating them
+        self.unfold = unfold
+        self.unfold_stats = UnfoldStats()
+        self.memo = MEMO if memo else None
 
     def parse_datalog_rule(self, rule_str):
         # Remove trailing dot
@@ -68,7 +78,7 @@ class CramptonTranslator:
             or ">" in pred_str
             or "<" in pred_str
         ):
-            return {"name": "constraint", "raw": pred_str, "negated": False}
+            return {"name": "constraint", "raw": pred_str, "negated": is_negated}
         return None
 
     def build_dependency_graph(self, body_preds):
@@ -140,6 +150,11 @@ class CramptonTranslator:
                         queue.append((neighbor, new_path))
         return None
 
+    def translate_memoized(self, rule_str):
+        if self.memo is None:
+            return self.translate_rule(rule_str)
+        return self.memo.translate(rule_str, self.translate_rule)
+
     def translate_rule(self, rule_str):
         head, body = self.parse_datalog_rule(rule_str)
         if not head:
@@ -172,6 +187,45 @@ class CramptonTranslator:
 
         return ".".join(path)
 
+    def translate_row(self, row, source_type="natural_language_statements"):
+        """Translate one generated row; returns one output row per path found."""
+        type = ""
+        if source_type == "natural_language_statements":
+            type = source_type
+        elif source_type == "xacml":
+            type = "xacml"
+        first_field = row.get(type, "")
+        datalog_subject = row.get("datalog_subjects", "")
+        datalog_object = row.get("datalog_objects", "")
+        datalog_relationships = row.get("datalog_relationships", "")
+        datalog_action = row.get("datalog_actions", "")
+
+        results = []
+        # Split by newline if multiple
+        if self.unfold:
+            rules = unfold_rules(
+                datalog_relationships, datalog_action, self.unfold_stats
+            )
+        else:
+            rules = [(line, line) for line in datalog_action.split("\n")]
+        for line, rule in rules:
+            if not rule.strip():
+                continue
+            path_condition = self.translate_memoized(rule)
+            if path_condition:
+                results.append(
+                    {
+                        source_type: first_field,
+                        "datalog_subjects": datalog_subject,
+                        "datalog_objects": datalog_object,
+                        "datalog_relationships": datalog_relationships,
+                        "datalog_actions": line,
+                        "datalog_unfolded": rule,
+                        "crampton": path_condition,
+                    }
+                )
+        return results
+
     def process_csv(
         self, input_file, output_file, source_type="natural_language_statements"
     ):
@@ -179,46 +233,7 @@ class CramptonTranslator:
         with open(input_file, "r") as f:
             reader = csv.DictReader(f)
             for row in reader:
-                type = ""
-                if source_type == "natural_language_statements":
-                    type = source_type
-                elif source_type == "xacml":
-                    type = "xacml"
-                first_field = row.get(type, "")
-                datalog_subject = row.get("datalog_subjects", "")
-                datalog_object = row.get("datalog_objects", "")
-                datalog_relationships = row.get("datalog_relationships", "")
-                datalog_action = row.get("datalog_actions", "")
-
-                # Split by newline if multiple
-                rules = datalog_action.split("\n")
-                for rule in rules:
-                    if not rule.strip():
-                        continue
-                    path_condition = self.translate_rule(rule)
-                    if path_condition:
-                        if source_type == "natural_language_statements":
-                            results.append(
-                                {
-                                    "natural_language_statements": first_field,
-                                    "datalog_subjects": datalog_subject,
-                                    "datalog_objects": datalog_object,
-                                    "datalog_relationships": datalog_relationships,
-                                    "datalog_actions": rule,
-                                    "crampton": path_condition,
-                                }
-                            )
-                        elif source_type == "xacml":
-                            results.append(
-                                {
-                                    "xacml": first_field,
-                                    "datalog_subjects": datalog_subject,
-                                    "datalog_objects": datalog_object,
-                                    "datalog_relationships": datalog_relationships,
-                                    "datalog_actions": rule,
-                                    "crampton": path_condition,
-                                }
-                            )
+                results.extend(self.translate_row(row, source_type))
 
         # Write output
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -231,6 +246,7 @@ class CramptonTranslator:
                     "datalog_objects",
                     "datalog_relationships",
                     "datalog_actions",
+                    "datalog_unfolded",
                     "crampton",
                 ],
             )
@@ -0,0 +1,441 @@
+"""Datalog intermediate representation: grammar, AST and safety checks.
+
+The grammar accepts what the generation prompts ask for plus the extensions
+the LLM commonly uses and the translators already understand:
+
+    program     := rule*
+    rule        := atom [":-" body] "."
+    body        := literal ("," literal)*
+    literal     := ["not"] atom | comparison | "(" body (";" body)* ")"
+    comparison  := expr op expr | expr "in" collection
+    atom        := name ["(" term ("," term)* ")"]
+    term        := Variable | constant | number | string | collection | expr
+
+Variables start with an uppercase letter or "_".  A missing "." is tolerated
+when the next rule starts on a new line, since many generated cells are
+newline separated.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterator, Union
+
+COMPARISON_OPS = ("==", "!=", "<=", ">=", "=", "<", ">")
+ARITHMETIC_OPS = ("+", "-", "*", "/")
+BUILTIN_ATOMS = {"true", "false"}
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>[ \t\r]+)
+  | (?P<nl>\n)
+  | (?P<comment>%[^\n]*)
+  | (?P<if>:-)
+  | (?P<number>\d+(?:\.\d+)?(?![\w]))
+  | (?P<string>'[^']*'|"[^"]*")
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>==|!=|<=|>=|=|<|>|\+|-|\*|/)
+  | (?P<punct>[(),.;\[\]{}])
+    """,
+    re.VERBOSE,
+)
+
+
+class DatalogSyntaxError(ValueError):
+    def __init__(self, message: str, text: str, pos: int):
+        line = text.count("\n", 0, pos) + 1
+        super().__init__(f"{message} at line {line}: {text[pos:pos + 40]!r}")
+        self.pos = pos
+
+
+@dataclass(frozen=True)
+class Var:
+    name: str
+
+    def __str__(self):
+        return self.name
+
+
+@dataclass(frozen=True)
+class Const:
+    value: str
+
+    def __str__(self):
+        return self.value
+
+
+@dataclass(frozen=True)
+class Collection:
+    items: tuple["Term", ...]
+    brackets: str = "[]"
+
+    def __str__(self):
+        return f"{self.brackets[0]}{', '.join(map(str, self.items))}{self.brackets[1]}"
+
+
+@dataclass(frozen=True)
+class BinOp:
+    left: "Term"
+    op: str
+    right: "Term"
+
+    def __str__(self):
+        return f"{self.left} {self.op} {self.right}"
+
+
+Term = Union[Var, Const, Collection, BinOp]
+
+
+@dataclass(frozen=True)
+class Atom:
+    name: str
+    args: tuple[Term, ...] = ()
+    negated: bool = False
+
+    def __str__(self):
+        text = self.name
+        if self.args:
+            text += f"({', '.join(map(str, self.args))})"
+        return f"not {text}" if self.negated else text
+
+
+@dataclass(frozen=True)
+class Comparison:
+    left: Term
+    op: str
+    right: Term
+    negated: bool = False
+
+    def __str__(self):
+        text = f"{self.left} {self.op} {self.right}"
+        return f"not {text}" if self.negated else text
+
+
+@dataclass(frozen=True)
+class Disjunction:
+    branches: tuple[tuple["Literal", ...], ...]
+    negated: bool = False
+
+    def __str__(self):
+        text = " ; ".join(", ".join(map(str, b)) for b in self.branches)
+        return f"not ({text})" if self.negated else f"({text})"
+
+
+Literal = Union[Atom, Comparison, Disjunction]
+
+
+@dataclass(frozen=True)
+class Rule:
+    head: Atom
+    body: tuple[Literal, ...] = ()
+
+    def __str__(self):
+        if not self.body:
+            return f"{self.head}."
+        return f"{self.head} :- {', '.join(map(str, self.body))}."
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens: list[tuple[str, str, int, bool]] = []
+        newline = True
+        pos = 0
+        while pos < len(text):
+            m = TOKEN_RE.match(text, pos)
+            if not m:
+                raise DatalogSyntaxError("unexpected character", text, pos)
+            kind = m.lastgroup
+            if kind == "nl":
+                newline = True
+            elif kind not in ("ws", "comment"):
+                self.tokens.append((kind, m.group(), pos, newline))
+                newline = False
+            pos = m.end()
+        self.i = 0
+
+    def peek(self, offset: int = 0) -> tuple[str, str, int, bool]:
+        if self.i + offset < len(self.tokens):
+            return self.tokens[self.i + offset]
+        return ("eof", "", len(self.text), True)
+
+    def next(self) -> tuple[str, str, int, bool]:
+        token = self.peek()
+        self.i += 1
+        return token
+
+    def at(self, value: str) -> bool:
+        kind, text, _, _ = self.peek()
+        return kind != "string" and text == value
+
+    def expect(self, value: str) -> None:
+        if not self.at(value):
+            raise DatalogSyntaxError(f"expected {value!r}", self.text, self.peek()[2])
+        self.i += 1
+
+    def error(self, message: str) -> DatalogSyntaxError:
+        return DatalogSyntaxError(message, self.text, self.peek()[2])
+
+    def program(self) -> list[Rule]:
+        rules = []
+        while self.peek()[0] != "eof":
+            rules.append(self.rule())
+        return rules
+
+    def rule(self) -> Rule:
+        head = self.atom()
+        body: tuple[Literal, ...] = ()
+        if self.peek()[0] == "if":
+            self.next()
+            body = self.body()
+        self.end_of_rule()
+        return Rule(head, body)
+
+    def end_of_rule(self) -> None:
+        if self.at("."):
+            self.next()
+        elif not self.peek()[3]:
+            raise self.error("expected '.' at end of rule")
+
+    def body(self) -> tuple[Literal, ...]:
+        literals = [self.literal()]
+        while self.at(","):
+            self.next()
+            literals.append(self.literal())
+        return tuple(literals)
+
+    def literal(self) -> Literal:
+        negated = False
+        if self.at("not") and self.peek(1)[0] in ("name", "punct"):
+            self.next()
+            negated = True
+
+        if self.at("("):
+            start = self.i
+            self.next()
+            try:
+                branches = [self.body()]
+                while self.at(";"):
+                    self.next()
+                    branches.append(self.body())
+                self.expect(")")
+            except DatalogSyntaxError:
+                branches = []
+            # "(X + 1) > Y" is an arithmetic group, not a conjunction
+            if branches and not (self.peek()[0] == "op" or self.at("in")):
+                if len(branches) == 1 and len(branches[0]) == 1 and not negated:
+                    return branches[0][0]
+                return Disjunction(tuple(branches), negated)
+            self.i = start
+            return self.comparison(negated)
+
+        kind, text, _, _ = self.peek()
+        if kind == "name" and text != "in":
+            follow = self.peek(1)
+            is_call = follow[0] == "punct" and follow[1] == "("
+            is_comparison = follow[0] == "op" or (
+                follow[0] == "name" and follow[1] == "in"
+            )
+            if is_call or (text[0].islower() and not is_comparison):
+                atom = self.atom()
+                return Atom(atom.name, atom.args, negated)
+        return self.comparison(negated)
+
+    def comparison(self, negated: bool) -> Comparison:
+        left = self.expr()
+        kind, text, _, _ = self.peek()
+        if text == "in" and kind == "name":
+            self.next()
+            return Comparison(left, "in", self.term(), negated)
+        if kind != "op" or text not in COMPARISON_OPS:
+            raise self.error("expected comparison operator")
+        self.next()
+        return Comparison(left, text, self.expr(), negated)
+
+    def atom(self) -> Atom:
+        kind, name, _, _ = self.peek()
+        if kind != "name":
+            raise self.error("expected predicate name")
+        self.next()
+        args: list[Term] = []
+        if self.at("("):
+            self.next()
+            if not self.at(")"):
+                args.append(self.term())
+                while self.at(","):
+                    self.next()
+                    args.append(self.term())
+            self.expect(")")
+        return Atom(name, tuple(args))
+
+    def expr(self) -> Term:
+        left = self.term()
+        while self.peek()[0] == "op" and self.peek()[1] in ARITHMETIC_OPS:
+            op = self.next()[1]
+            left = BinOp(left, op, self.term())
+        return left
+
+    def term(self) -> Term:
+        kind, text, _, _ = self.peek()
+        if kind in ("number", "string"):
+            self.next()
+            return Const(text)
+        if text == "-" and self.peek(1)[0] == "number":
+            self.next()
+            return Const("-" + self.next()[1])
+        if kind == "name":
+            if self.peek(1)[1] == "(" and self.peek(1)[0] == "punct":
+                raise self.error("function terms are not Datalog")
+            self.next()
+            if text[0].isupper() or text[0] == "_":
+                return Var(text)
+            return Const(text)
+        if text in ("[", "{"):
+            closing = "]" if text == "[" else "}"
+            self.next()
+            items: list[Term] = []
+            if not self.at(closing):
+                items.append(self.term())
+                while self.at(","):
+                    self.next()
+                    items.append(self.term())
+            self.expect(closing)
+            return Collection(tuple(items), text + closing)
+        if text == "(":
+            self.next()
+            inner = self.expr()
+            self.expect(")")
+            return inner
+        raise self.error("expected term")
+
+
+def parse_program(text: str) -> list[Rule]:
+    """Parse a block of rules and facts; raises DatalogSyntaxError."""
+    return _Parser(text).program()
+
+
+def parse_rule(text: str) -> Rule:
+    rules = parse_program(text)
+    if len(rules) != 1:
+        raise DatalogSyntaxError(f"expected one rule, found {len(rules)}", text, 0)
+    return rules[0]
+
+
+def parse_atoms(text: str) -> list[Atom]:
+    """Parse a declaration list such as `Patient(P), Prescriber(D).`"""
+    parser = _Parser(text)
+    atoms = []
+    while parser.peek()[0] != "eof":
+        atoms.append(parser.atom())
+        if parser.at(",") or parser.at("."):
+            parser.next()
+        elif parser.peek()[0] != "eof" and not parser.peek()[3]:
+            raise parser.error("expected ',' between declarations")
+    return atoms
+
+
+def parse_comparison(text: str) -> Comparison:
+    """Parse one comparison such as `Count >= 0` or `not X in ["a", "b"]`."""
+    parser = _Parser(text.strip().rstrip("."))
+    literal = parser.literal()
+    if not isinstance(literal, Comparison) or parser.peek()[0] != "eof":
+        raise parser.error("expected a single comparison")
+    return literal
+
+
+def term_variables(term: Term) -> Iterator[str]:
+    if isinstance(term, Var):
+        if term.name != "_":
+            yield term.name
+    elif isinstance(term, Collection):
+        for item in term.items:
+            yield from term_variables(item)
+    elif isinstance(term, BinOp):
+        yield from term_variables(term.left)
+        yield from term_variables(term.right)
+
+
+def literal_variables(literal: Literal) -> Iterator[str]:
+    if isinstance(literal, Atom):
+        for arg in literal.args:
+            yield from term_variables(arg)
+    elif isinstance(literal, Comparison):
+        yield from term_variables(literal.left)
+        yield from term_variables(literal.right)
+    else:
+        for branch in literal.branches:
+            for lit in branch:
+                yield from literal_variables(lit)
+
+
+def bound_variables(body: tuple[Literal, ...], bound: frozenset = frozenset()) -> set:
+    """Variables bound by the positive part of a rule body.
+
+    Positive atoms bind their variables; `X = t` and `X in [...]` bind X once
+    the right-hand side is bound; a disjunction binds what every branch binds.
+    """
+    result = set(bound)
+    changed = True
+    while changed:
+        changed = False
+        for literal in body:
+            if literal.negated:
+                continue
+            new: set = set()
+            if isinstance(literal, Atom):
+                if literal.name not in BUILTIN_ATOMS:
+                    new = set(literal_variables(literal))
+            elif isinstance(literal, Comparison):
+                if literal.op in ("=", "==", "in"):
+                    for a, b in (
+                        (literal.left, literal.right),
+                        (literal.right, literal.left),
+                    ):
+                        if isinstance(a, Var) and set(term_variables(b)) <= result:
+                            new.add(a.name)
+            else:
+                branch_sets = [
+                    bound_variables(branch, frozenset(result))
+                    for branch in literal.branches
+                ]
+                new = set.intersection(*branch_sets)
+            if not new <= result:
+                result |= new
+                changed = True
+    return result
+
+
+def safety_errors(rule: Rule) -> list[str]:
+    """Range-restriction problems of a rule (empty list when the rule is safe)."""
+    errors = []
+    head_vars = list(dict.fromkeys(literal_variables(rule.head)))
+    if not rule.body:
+        if head_vars:
+            errors.append(f"fact {rule.head} contains variables {', '.join(head_vars)}")
+        return errors
+
+    bound = bound_variables(rule.body)
+    for var in head_vars:
+        if var not in bound:
+            errors.append(
+                f"head variable {var} of {rule.head.name} is not bound by a "
+                f"positive body literal"
+            )
+
+    def check(body: tuple[Literal, ...], outer: set) -> None:
+        scope = bound_variables(body, frozenset(outer))
+        for literal in body:
+            if isinstance(literal, Disjunction):
+                for branch in literal.branches:
+                    check(branch, scope)
+                continue
+            if literal.negated or isinstance(literal, Comparison):
+                unbound = [v for v in literal_variables(literal) if v not in scope]
+                if unbound:
+                    kind = "negated literal" if literal.negated else "comparison"
+                    errors.append(
+                        f"unsafe {kind} {literal}: {', '.join(dict.fromkeys(unbound))} "
+                        f"not bound by a positive literal"
+                    )
+
+    check(rule.body, set())
+    return errors
@@ -2,7 +2,12 @@ import csv
 from pathlib import Path
 import re
 import os
-import pandas as pd
+
+from policy_translation.datalog import DatalogSyntaxError, literal_variables, parse_comparison
+from policy_translation.memo import TranslationMemo
+
+# Shared by every dataset translated in the process with memo=MEMO
+MEMO = TranslationMemo()
 
 def parse_term(term):
     term = term.strip()
@@ -51,7 +56,11 @@ def parse_predicate(pred_str):
     # Infix
     infix_match = re.match(r"(.+?)\s*(=|>=|<=|>|<|!=|in)\s*(.+)", pred_str)
     if infix_match:
-        return {"infix": True, "left": infix_match.group(1), "op": infix_match.group(2), "right": infix_match.group(3), "negated": is_negated, "raw": pred_str}
+        try:
+            ast = parse_comparison(("not " if is_negated else "") + pred_str)
+        except DatalogSyntaxError:
+            ast = None
+        return {"infix": True, "left": infix_match.group(1), "op": infix_match.group(2), "right": infix_match.group(3), "negated": is_negated, "raw": pred_str, "ast": ast}
 
     return {"raw": pred_str, "negated": is_negated}
 
@@ -79,15 +88,12 @@ def datalog_to_fong_formula(head, body_preds):
     if object_var:
         all_vars.add(object_var)
 
+    comparisons = []
+
     for pred in body_preds:
         if pred.get("infix"):
-            # Treat as constraint on the variables involved
-            # For simplicity, attach to the first variable found in 'left'
-            # This is a simplification.
-            left_var = pred["left"].strip()
-            if left_var not in constraints: 
-                constraints[left_var] = []
-            constraints[left_var].append(pred["raw"])
+            # Placed once the graph is known, see below
+            comparisons.append(pred)
             continue
 
         name = pred.get("name")
@@ -131,6 +137,30 @@ def datalog_to_fong_formula(head, body_preds):
                     adj[v] = []
                 adj[v].append((f"-{name}", u))
 
+    # A comparison goes to the variable where all of its variables are
+    # bound: the one farthest from the Subject.  A comparison over a
+    # variable the walk never reaches cannot be expressed from the Subject
+    # and is left out of the formula.  Text that does not parse as a
+    # comparison keeps its left-hand side.
+    depth = {subject_var: 0}
+    queue = [subject_var]
+    for u in queue:
+        for _, v in adj.get(u, []):
+            if v not in depth:
+                depth[v] = depth[u] + 1
+                queue.append(v)
+    for pred in comparisons:
+        if pred["ast"] is None:
+            anchor = pred["left"].strip()
+        else:
+            variables = list(literal_variables(pred["ast"]))
+            if not variables or any(v not in depth for v in variables):
+                continue
+            anchor = max(variables, key=depth.get)
+        if anchor not in constraints:
+            constraints[anchor] = []
+        constraints[anchor].append(pred["raw"])
+
     # DFS/Recursive generation from Subject
     visited = set()
     
@@ -187,7 +217,51 @@ def datalog_to_fong_formula(head, body_preds):
     formula = generate(subject_var)
     return formula
 
-def convert_datalog_to_fong(csv_path):
+def convert_action(action, memo=None):
+    """Fong formula for one datalog_actions cell ("" when it has no rule)."""
+    if memo is None:
+        return _convert_action(action)
+    return memo.translate(action, _convert_action)
+
+def _convert_action(action):
+    action = action.replace("\n", " ")
+    if ":-" not in action:
+        return ""
+    parts = action.split(":-")
+    head_str = parts[0].strip()
+    body_str = parts[1].strip()
+    if body_str.endswith("."): 
+        body_str = body_str[:-1]
+    
+    head_pred = parse_predicate(head_str)
+    
+    # Parse body
+    body_preds = []
+    current = ""
+    depth = 0
+    for char in body_str:
+        if char == "(": 
+            depth += 1
+        elif char == ")": 
+            depth -= 1
+        elif char == "," and depth == 0:
+            body_preds.append(parse_predicate(current.strip()))
+            current = ""
+            continue
+        current += char
+    if current:
+        body_preds.append(parse_predicate(current.strip()))
+    
+    return datalog_to_fong_formula(head_pred, body_preds)
+
+def translate_row(row):
+    """Input row with a `fong` column, or [] when it has no action."""
+    action = row.get("datalog_actions", "") or ""
+    if not action:
+        return []
+    return [{**row, "fong": convert_action(action)}]
+
+def convert_datalog_to_fong(csv_path, memo=None):
     results = []
     if not os.path.exists(csv_path):
         return []
@@ -198,42 +272,11 @@ def convert_datalog_to_fong(csv_path):
             action = row.get("datalog_actions", "")
             if not action:
                 continue
-            action = action.replace("\n", " ")
-            
-            if ":-" in action:
-                parts = action.split(":-")
-                head_str = parts[0].strip()
-                body_str = parts[1].strip()
-                if body_str.endswith("."): 
-                    body_str = body_str[:-1]
-                
-                head_pred = parse_predicate(head_str)
-                
-                # Parse body
-                body_preds = []
-                current = ""
-                depth = 0
-                for char in body_str:
-                    if char == "(": 
-                        depth += 1
-                    elif char == ")": 
-                        depth -= 1
-                    elif char == "," and depth == 0:
-                        body_preds.append(parse_predicate(current.strip()))
-                        current = ""
-                        continue
-                    current += char
-                if current:
-                    body_preds.append(parse_predicate(current.strip()))
-                
-                fong_formula = datalog_to_fong_formula(head_pred, body_preds)
-                results.append(fong_formula)
-            else:
-                results.append("")
+            results.append(convert_action(action, memo))
     return results
 
-def translate(input_path: Path, output_path: Path):
-    fong_rules = convert_datalog_to_fong(input_path)
+def translate(input_path: Path, output_path: Path, memo=False):
+    fong_rules = convert_datalog_to_fong(input_path, MEMO if memo else None)
     
     with open(output_path, "w", encoding="utf-8", newline="") as f:
         writer = csv.writer(f)
@@ -242,6 +285,8 @@ def translate(input_path: Path, output_path: Path):
             writer.writerow([rule])
             
     # Merge
+    import pandas as pd
+
     input_df = pd.read_csv(input_path)
     output_df = pd.read_csv(output_path)
     merged_df = pd.concat([input_df, output_df], axis=1)
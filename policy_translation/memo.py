@@ -0,0 +1,239 @@
+"""Translation memo keyed on the alpha-canonical form of a rule.
+
+Generated rules repeat the same shape across datasets with other variable
+names and constants:
+
+    can_view(U, R) :- User(U), owns(U, R), level(R, 3).
+    can_view(P, D) :- User(P), owns(P, D), level(D, 5).
+
+`canonical_text` sorts the body literals and renames variables to `_V0,
+_V1, ...` in order of first occurrence and constants to `'_c0', '_c1', ...`,
+so both rules become
+
+    can_view(_V0, _V1) :- User(_V0), level(_V1, '_c0'), owns(_V0, _V1).
+
+`TranslationMemo.translate` runs a translator on the canonical text once
+and serves every rule of that shape from a bounded LRU, putting the original
+names back into the cached translation.  Memoized translations are the
+translations of the canonical rule, so conjunctions may come out in another
+order, and a path search may settle on another path of the same length,
+than when translating the rule as written.
+
+As the output can differ from a direct translation and canonicalizing costs
+about as much as the string translators themselves, the translators only
+use their memo when asked (`memo=True`, `rebac.py translate --memo`).
+
+Canonicalization works on the tokens of datalog.py rather than on the parsed
+rule, as parsing costs more than the translators' own string handling.  Text
+that is not a single rule is translated directly.
+
+    memo = TranslationMemo()
+    memo.translate(rule_text, translator.translate_rule)
+"""
+
+import functools
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+from policy_translation.datalog import TOKEN_RE
+
+MAX_ENTRIES = 4096
+PLACEHOLDER_RE = re.compile(r"(?<![\w'])_V\d+(?!\w)|'_c\d+'")
+OPEN, CLOSE = "([{", ")]}"
+
+
+def _tokens(text: str) -> list[tuple[str, str]] | None:
+    tokens, pos = [], 0
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if not m:
+            return None
+        if m.lastgroup not in ("ws", "nl", "comment"):
+            tokens.append((m.lastgroup, m.group()))
+        pos = m.end()
+    return tokens
+
+
+def _literals(tokens: list[tuple[str, str]]) -> list[list[tuple[str, str]]] | None:
+    """Split a body at its top-level commas; None unless it is one body."""
+    literals, current, depth = [], [], 0
+    for kind, text in tokens:
+        if kind == "punct" and text in OPEN:
+            depth += 1
+        elif kind == "punct" and text in CLOSE:
+            depth -= 1
+            if depth < 0:
+                return None
+        elif kind == "punct" and depth == 0 and text in ",;.":
+            if text != ",":
+                return None
+            literals.append(current)
+            current = []
+            continue
+        current.append((kind, text))
+    literals.append(current)
+    return literals if depth == 0 and all(literals) else None
+
+
+def _classify(literal: list[tuple[str, str]]) -> list[str]:
+    """'var', 'const' or 'keep' for each token of a literal."""
+    kinds, depth = [], 0
+    for i, (kind, text) in enumerate(literal):
+        after = literal[i + 1] if i + 1 < len(literal) else ("eof", "")
+        before = literal[i - 1] if i else ("bof", "")
+        if kind == "punct":
+            depth += text in OPEN
+            depth -= text in CLOSE
+        if kind in ("number", "string"):
+            kinds.append("const")
+        elif kind != "name" or after[1] == "(" or text in ("not", "in"):
+            kinds.append("keep")
+        elif text[0].isupper() or text[0] == "_":
+            kinds.append("var")
+        elif depth or "op" in (before[0], after[0]):
+            kinds.append("const")  # `role(U, doctor)`, `S = active`
+        else:
+            kinds.append("keep")  # a bare atom such as `true`
+    return kinds
+
+
+def _render(literal: list[tuple[str, str]]) -> str:
+    out = []
+    for kind, text in literal:
+        if text in ",;":
+            out.append(f"{text} ")
+        elif kind == "op" or text == "in":
+            out.append(f" {text} ")
+        elif text == "not":
+            out.append("not ")
+        else:
+            out.append(text)
+    return "".join(out).strip()
+
+
+@functools.lru_cache(maxsize=MAX_ENTRIES)
+def canonical_text(rule_text: str) -> tuple[str, dict[str, str]] | None:
+    """Canonical text of a single rule and the map from its placeholders back
+    to the original names; None when the text is not a single rule.
+
+    Cached on the exact text, as identical rules recur across datasets too.
+    """
+    tokens = _tokens(rule_text)
+    if tokens is None:
+        return None
+    if tokens and tokens[-1] == ("punct", "."):
+        tokens.pop()
+    ifs = [i for i, (kind, _) in enumerate(tokens) if kind == "if"]
+    if len(ifs) != 1:
+        return None
+    head = _literals(tokens[: ifs[0]])
+    body = _literals(tokens[ifs[0] + 1 :])
+    if head is None or body is None or len(head) != 1:
+        return None
+
+    classified = [(lit, _classify(lit)) for lit in head + body]
+    shapes = [
+        " ".join(text if k == "keep" else k for (_, text), k in zip(lit, kinds))
+        for lit, kinds in classified
+    ]
+    order = [0] + sorted(range(1, len(classified)), key=shapes.__getitem__)
+    names: dict[str, str] = {}
+    variables = constants = 0
+    literals = []
+    for i in order:
+        literal, kinds = classified[i]
+        renamed = []
+        for (kind, text), k in zip(literal, kinds):
+            if k == "keep":
+                renamed.append((kind, text))
+                continue
+            if text not in names and k == "var":
+                names[text] = f"_V{variables}"
+                variables += 1
+            elif text not in names:
+                names[text] = f"'_c{constants}'"
+                constants += 1
+            renamed.append(("name", names[text]))
+        literals.append(_render(renamed))
+    text = f"{literals[0]} :- {', '.join(literals[1:])}."
+    return text, {new: old for old, new in names.items()}
+
+
+def specialize(translation, names: dict[str, str]):
+    """Put the original names back into a translation of the canonical rule."""
+    if not isinstance(translation, str):
+        return translation
+    return PLACEHOLDER_RE.sub(lambda m: names.get(m.group(0), m.group(0)), translation)
+
+
+@dataclass
+class MemoCounts:
+    """Counters of a TranslationMemo, or the sum over several of them."""
+
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0  # text that is not a single rule
+    shapes: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    def add(self, other: "MemoCounts") -> None:
+        self.hits += other.hits
+        self.misses += other.misses
+        self.bypassed += other.bypassed
+        self.shapes += other.shapes
+
+    def report(self) -> str:
+        rate = self.hits / self.lookups * 100 if self.lookups else 0.0
+        return (
+            f"translation memo: {self.hits}/{self.lookups} rules served from cache "
+            f"({rate:.1f}% hit rate, {self.shapes} shapes, "
+            f"{self.bypassed} other texts translated directly)"
+        )
+
+
+class TranslationMemo:
+    """Bounded LRU of rule translations keyed on the canonical rule."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, object] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0  # text that is not a single rule
+        self.lock = threading.Lock()
+
+    def translate(self, rule_text: str, translate: Callable[[str], object]):
+        """Translation of `rule_text`; safe to call from several threads."""
+        canonical = canonical_text(rule_text)
+        if canonical is None:
+            with self.lock:
+                self.bypassed += 1
+            return translate(rule_text)
+        key, names = canonical
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return specialize(self.entries[key], names)
+            self.misses += 1
+        # Not under the lock: threads that miss the same shape at once each
+        # translate it, and the last one stores it
+        translation = translate(key)
+        with self.lock:
+            self.entries[key] = translation
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return specialize(translation, names)
+
+    def counts(self) -> MemoCounts:
+        with self.lock:
+            return MemoCounts(self.hits, self.misses, self.bypassed, len(self.entries))
+
+    def report(self) -> str:
+        return self.counts().report()
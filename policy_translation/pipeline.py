@@ -0,0 +1,196 @@
+"""Streaming generation -> translation pipeline for LitroACP datasets.
+
+Each statement goes from the LLM response (parsed and validated by
+translate_statement) straight to every translator through bounded asyncio
+queues, so translation overlaps generation instead of waiting for the
+generated CSV.  Every output CSV is written row by row, in input order, as
+soon as the rows before it are done.
+
+    python rebac.py pipeline --datasets "acre_*" --translator cheng
+
+Cheng and Crampton rows match their batch outputs.  Both translate the
+action rules with helper predicates unfolded (policy_translation.unfolding),
+and each Crampton row keeps the action line as written in `datalog_actions`
+next to the unfolded rule it translated in `datalog_unfolded`.  Carminati
+and Fong rows carry the input columns of the row they were translated from
+(`translate_row`), instead of the column-wise concatenation of batch mode.
+"""
+
+import asyncio
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from policy_generation import natural_langauge_statements as nls
+from policy_generation.backends import BackendError
+from policy_generation.hints import build_hint
+from policy_generation.ingest import TEXT_FIELD, iter_records
+from policy_generation.validation import DATALOG_FIELDS, ResponseFormatError
+
+TRANSLATORS = ("carminati", "cheng", "crampton", "fong")
+OUTPUT_ROOT = Path("policy_translation/output")
+QUEUE_SIZE = 64
+# Output columns between the input columns and the translation
+EXTRA_FIELDS = {"crampton": ["datalog_unfolded"]}
+
+
+def row_translator(name: str) -> Callable[[dict], list[dict]]:
+    if name == "cheng":
+        from policy_translation.cheng import ChengTranslator
+
+        return ChengTranslator().translate_row
+    if name == "crampton":
+        from policy_translation.crampton import CramptonTranslator
+
+        return CramptonTranslator().translate_row
+    if name == "carminati":
+        from policy_translation.carminati import translate_row
+
+        return translate_row
+    if name == "fong":
+        from policy_translation.fong import translate_row
+
+        return translate_row
+    raise ValueError(f"unknown translator {name}")
+
+
+class OrderedWriter:
+    """CSV writer that accepts rows out of order and writes them in order."""
+
+    def __init__(self, path: Path, fieldnames: list[str]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = path.open("w", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(
+            self.file, fieldnames=fieldnames, lineterminator="\n"
+        )
+        self.writer.writeheader()
+        self.pending: dict[int, list[dict]] = {}
+        self.next = 0
+        self.rows = 0
+
+    def put(self, seq: int, rows: list[dict]) -> None:
+        self.pending[seq] = rows
+        while self.next in self.pending:
+            rows = self.pending.pop(self.next)
+            self.writer.writerows(rows)
+            self.rows += len(rows)
+            self.next += 1
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def run_pipeline(
+    input_path: Path,
+    translators: tuple[str, ...] = TRANSLATORS,
+    generation_path: Path | None = None,
+    output_root: Path = OUTPUT_ROOT,
+    hints: bool = True,
+    acp_filter: bool = False,
+    executor: ThreadPoolExecutor | None = None,
+) -> dict:
+    """Generate and translate one dataset; return timing and row counts."""
+    name = Path(input_path).stem
+    generation_path = generation_path or nls.OUTPUT_DIR / f"{name}.csv"
+    backend = nls.get_backend()
+    if acp_filter:
+        nls.get_acp_filter()
+    workers = backend.num_parallel
+    own_executor = executor is None
+    executor = executor or ThreadPoolExecutor(max_workers=workers)
+    # The translators are CPU-bound and run off the event loop, one thread
+    # each, so that a slow row does not hold up the generation coroutines
+    translation_pool = ThreadPoolExecutor(max_workers=max(1, len(translators)))
+    try:
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        stats = {"dataset": name, "rows": 0, "failed": 0, "translation_errors": 0}
+
+        fields = [TEXT_FIELD, *DATALOG_FIELDS]
+        generated = OrderedWriter(Path(generation_path), fields)
+        translate = {t: row_translator(t) for t in translators}
+        writers = {
+            t: OrderedWriter(
+                Path(output_root, t, f"{name}.csv"),
+                fields + EXTRA_FIELDS.get(t, []) + [t],
+            )
+            for t in translators
+        }
+        records: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+        queues = {t: asyncio.Queue(QUEUE_SIZE) for t in translators}
+
+        async def produce():
+            for seq, record in enumerate(iter_records([input_path])):
+                await records.put((seq, record))
+            for _ in range(workers):
+                await records.put(None)
+
+        async def generate():
+            while (item := await records.get()) is not None:
+                seq, record = item
+                hint = build_hint(record) if hints else ""
+                try:
+                    datalog = await loop.run_in_executor(
+                        executor, nls.translate_statement, record.text, hint, acp_filter
+                    )
+                except (BackendError, json.JSONDecodeError, ResponseFormatError) as e:
+                    stats["failed"] += 1
+                    print(f"✗ {name} line {record.line}: {e}")
+                    datalog = dict(nls.EMPTY_DATALOG)
+                row = {TEXT_FIELD: record.text, **datalog}
+                generated.put(seq, [row])
+                stats["rows"] += 1
+                for queue in queues.values():
+                    await queue.put((seq, row))
+
+        async def translate_rows(translator: str):
+            while (item := await queues[translator].get()) is not None:
+                seq, row = item
+                try:
+                    rows = await loop.run_in_executor(
+                        translation_pool, translate[translator], row
+                    )
+                except Exception as e:  # one bad row must not stall the queue
+                    stats["translation_errors"] += 1
+                    print(f"✗ {name} {translator} row {seq}: {e!r}")
+                    rows = []
+                writers[translator].put(seq, rows)
+
+        consumers = [asyncio.create_task(translate_rows(t)) for t in translators]
+        await asyncio.gather(produce(), *(generate() for _ in range(workers)))
+        stats["generation_s"] = time.perf_counter() - start
+        for queue in queues.values():
+            await queue.put(None)
+        await asyncio.gather(*consumers)
+        stats["total_s"] = time.perf_counter() - start
+
+        generated.close()
+        for translator, writer in writers.items():
+            writer.close()
+            stats[translator] = writer.rows
+        print(
+            f"{name}: {stats['rows']} rows generated in {stats['generation_s']:.1f}s, "
+            f"all translations done at {stats['total_s']:.1f}s "
+            f"({', '.join(f'{t} {stats[t]}' for t in translators)} rows, "
+            f"{stats['translation_errors']} translation errors)"
+        )
+        print(nls.template_cache.report())
+        print(nls.token_counter.report())
+        return stats
+    finally:
+        translation_pool.shutdown()
+        if own_executor:
+            executor.shutdown()
+
+
+async def run_datasets(input_paths: list[Path], **options) -> list[dict]:
+    """Pipeline several datasets concurrently over one generation thread pool."""
+    workers = nls.get_backend().num_parallel
+    with ThreadPoolExecutor(max_workers=workers * max(1, len(input_paths))) as pool:
+        return await asyncio.gather(
+            *(run_pipeline(path, executor=pool, **options) for path in input_paths)
+        )
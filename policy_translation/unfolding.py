@@ -0,0 +1,337 @@
+"""Unfold helper predicates into the rules that use them.
+
+Generated policies define helper predicates next to the authorization
+rules, e.g.
+
+    has_filter(U, F) :- owns(U, F), Filter(F).
+    can_modify(U, F) :- User(U), has_filter(U, F).
+
+and the translators only look at `can_*` rules, so `has_filter` is never
+connected to anything.  `Unfolder` replaces every positive call of a
+non-recursive helper with the helper's body (one rule per helper rule),
+and a negated call with a negated disjunction of the bodies when they
+introduce no new variables:
+
+    can_modify(U, F) :- User(U), owns(U, F), Filter(F).
+
+Relationship declarations, whose bodies hold only unary type atoms
+(`has_allergy(P, DR) :- Patient(P), Drug(DR).`), describe stored edges and
+are kept as atoms.  So are recursive helpers and calls whose unfolding
+would exceed `max_rules` rules or `max_body` literals.  The unfolded
+definition of each helper is computed once and reused for every call, and
+the helpers of a `datalog_relationships` text are unfolded once for every
+row that shares it.
+"""
+
+import functools
+import threading
+from dataclasses import dataclass
+
+from policy_translation.datalog import (
+    BUILTIN_ATOMS,
+    Atom,
+    BinOp,
+    Collection,
+    Comparison,
+    DatalogSyntaxError,
+    Disjunction,
+    Literal,
+    Rule,
+    Term,
+    Var,
+    literal_variables,
+    parse_program,
+)
+
+MAX_RULES = 16
+MAX_BODY = 32
+MAX_CONTEXTS = 1024
+# Guards UnfoldStats shared by translators running in threads
+_STATS_LOCK = threading.Lock()
+
+
+def substitute(term: Term, subst: dict[str, Term]) -> Term:
+    if isinstance(term, Var):
+        return subst.get(term.name, term)
+    if isinstance(term, Collection):
+        return Collection(
+            tuple(substitute(t, subst) for t in term.items), term.brackets
+        )
+    if isinstance(term, BinOp):
+        return BinOp(
+            substitute(term.left, subst), term.op, substitute(term.right, subst)
+        )
+    return term
+
+
+def substitute_literal(literal: Literal, subst: dict[str, Term]) -> Literal:
+    if isinstance(literal, Atom):
+        args = tuple(substitute(a, subst) for a in literal.args)
+        return Atom(literal.name, args, literal.negated)
+    if isinstance(literal, Comparison):
+        return Comparison(
+            substitute(literal.left, subst),
+            literal.op,
+            substitute(literal.right, subst),
+            literal.negated,
+        )
+    return Disjunction(
+        tuple(
+            tuple(substitute_literal(lit, subst) for lit in branch)
+            for branch in literal.branches
+        ),
+        literal.negated,
+    )
+
+
+def substitute_rule(rule: Rule, subst: dict[str, Term]) -> Rule:
+    return Rule(
+        substitute_literal(rule.head, subst),
+        tuple(substitute_literal(lit, subst) for lit in rule.body),
+    )
+
+
+def rule_variables(rule: Rule) -> set[str]:
+    names = set(literal_variables(rule.head))
+    for literal in rule.body:
+        names.update(literal_variables(literal))
+    return names
+
+
+def unify(pairs, local: set[str]) -> dict[str, Term] | None:
+    """Most general unifier of (call argument, head argument) pairs.
+
+    Variables in `local` (the renamed helper's) are bound first, so the
+    caller's variable names survive.  Returns None when constants clash.
+    """
+    subst: dict[str, Term] = {}
+
+    def walk(term: Term) -> Term:
+        while isinstance(term, Var) and term.name in subst:
+            term = subst[term.name]
+        return term
+
+    for a, b in pairs:
+        if isinstance(a, Var) and a.name == "_":
+            continue  # the helper's variable stays free
+        a, b = walk(a), walk(b)
+        if a == b:
+            continue
+        if isinstance(b, Var) and b.name in local:
+            subst[b.name] = a
+        elif isinstance(a, Var):
+            subst[a.name] = b
+        elif isinstance(b, Var):
+            subst[b.name] = a
+        else:
+            return None
+    return {name: walk(term) for name, term in subst.items()}
+
+
+def is_declaration(rule: Rule) -> bool:
+    """A relationship declaration: a body of unary type atoms only."""
+    return bool(rule.body) and all(
+        isinstance(lit, Atom) and not lit.negated and len(lit.args) <= 1
+        for lit in rule.body
+    )
+
+
+@dataclass
+class UnfoldStats:
+    calls: int = 0  # helper calls replaced
+    memo_hits: int = 0  # helper definitions reused
+    kept: int = 0  # helper calls left as atoms (recursive or over a limit)
+
+    def add(self, other: "UnfoldStats") -> None:
+        with _STATS_LOCK:
+            self.calls += other.calls
+            self.memo_hits += other.memo_hits
+            self.kept += other.kept
+
+    def report(self) -> str:
+        return (
+            f"unfolding: {self.calls} helper calls unfolded, {self.memo_hits} "
+            f"definitions reused, {self.kept} calls kept"
+        )
+
+
+class Unfolder:
+    """Partial evaluator for the helper predicates of one program."""
+
+    def __init__(
+        self,
+        rules: list[Rule],
+        max_rules: int = MAX_RULES,
+        max_body: int = MAX_BODY,
+        stats: UnfoldStats | None = None,
+        shared: dict[str, list[Rule] | None] | None = None,
+    ):
+        # `shared` holds unfolded helper definitions computed for another
+        # program that defines those helpers identically
+        self.max_rules = max_rules
+        self.max_body = max_body
+        self.stats = stats if stats is not None else UnfoldStats()
+        self.definitions: dict[str, list[Rule]] = {}
+        for rule in rules:
+            self.definitions.setdefault(rule.head.name, []).append(rule)
+        self.helpers = {
+            name
+            for name, defs in self.definitions.items()
+            if not any(is_declaration(r) or not r.body for r in defs)
+            and not self._recursive(name)
+        }
+        self.flat: dict[str, list[Rule] | None] = {}
+        self.shared = shared or {}
+        self.fresh = 0
+
+    def _recursive(self, name: str) -> bool:
+        seen, stack = set(), [name]
+        while stack:
+            for rule in self.definitions.get(stack.pop(), ()):
+                for callee in _called(rule.body):
+                    if callee == name:
+                        return True
+                    if callee not in seen:
+                        seen.add(callee)
+                        stack.append(callee)
+        return False
+
+    def definition(self, name: str) -> list[Rule] | None:
+        """Unfolded rules of helper `name`; None when it is kept as an atom."""
+        for flat in (self.shared, self.flat):
+            if name in flat:
+                self.stats.memo_hits += 1
+                return flat[name]
+        rules = []
+        for rule in self.definitions[name]:
+            rules.extend(self.unfold(rule))
+            if len(rules) > self.max_rules:
+                rules = None
+                break
+        self.flat[name] = rules
+        return rules
+
+    def _rename(self, rule: Rule, taken: set[str]) -> tuple[Rule, set[str]]:
+        subst, local = {}, set()
+        for name in sorted(rule_variables(rule)):
+            self.fresh += 1
+            new = f"{name}_{self.fresh}"
+            while new in taken:
+                self.fresh += 1
+                new = f"{name}_{self.fresh}"
+            subst[name] = Var(new)
+            local.add(new)
+        return substitute_rule(rule, subst), local
+
+    def _call(self, rule: Rule, i: int, helper: list[Rule]) -> list[Rule] | None:
+        """Rules replacing the call rule.body[i]; None keeps the atom."""
+        call = rule.body[i]
+        rest = rule.body[:i] + rule.body[i + 1 :]
+        taken = rule_variables(rule)
+        results = []
+        for definition in helper:
+            renamed, local = self._rename(definition, taken)
+            if len(renamed.head.args) != len(call.args):
+                return None
+            subst = unify(zip(call.args, renamed.head.args), local)
+            if subst is None:
+                continue  # this helper rule cannot match the call
+            if call.negated:
+                if rule_variables(renamed) - set(literal_variables(renamed.head)):
+                    return None  # `not` over new variables is not a conjunction
+                if any(name not in local for name in subst):
+                    return None  # the call's own variables would be constrained
+                results.append(
+                    tuple(substitute_literal(lit, subst) for lit in renamed.body)
+                )
+                continue
+            body = rest[:i] + renamed.body + rest[i:]
+            results.append(substitute_rule(Rule(rule.head, body), subst))
+        if call.negated:
+            if not results:
+                return [Rule(rule.head, rest)]  # the helper never holds
+            negation = Disjunction(tuple(results), negated=True)
+            return [Rule(rule.head, rest[:i] + (negation,) + rest[i:])]
+        return results
+
+    def unfold(self, rule: Rule) -> list[Rule]:
+        """Rules equivalent to `rule` with its helper calls unfolded."""
+        pending, done = [(rule, 0)], []
+        while pending:
+            current, start = pending.pop()
+            for i in range(start, len(current.body)):
+                literal = current.body[i]
+                if not (isinstance(literal, Atom) and literal.name in self.helpers):
+                    continue
+                helper = self.definition(literal.name)
+                replaced = None if helper is None else self._call(current, i, helper)
+                if replaced is not None and (
+                    len(done) + len(pending) + len(replaced) > self.max_rules
+                    or any(len(r.body) > self.max_body for r in replaced)
+                ):
+                    replaced = None
+                if replaced is None:
+                    self.stats.kept += 1
+                    continue
+                self.stats.calls += 1
+                # The helper's body is already flat: continue after it
+                pending.extend(
+                    (r, i + len(r.body) - len(current.body) + 1)
+                    for r in reversed(replaced)
+                )
+                break
+            else:
+                done.append(current)
+        return done
+
+
+def _called(body) -> set[str]:
+    names = set()
+    for literal in body:
+        if isinstance(literal, Atom) and literal.name not in BUILTIN_ATOMS:
+            names.add(literal.name)
+        elif isinstance(literal, Disjunction):
+            for branch in literal.branches:
+                names |= _called(branch)
+    return names
+
+
+@functools.lru_cache(maxsize=MAX_CONTEXTS)
+def _context(relationships: str) -> tuple[list[Rule], set[str], dict]:
+    """Rules of a datalog_relationships text, the predicates they define or
+    call, and the unfolded definitions of all their helpers.
+
+    The definitions are computed up front, in name order, so that the
+    variable names they introduce do not depend on the order of the rows.
+    """
+    rules = parse_program(relationships)
+    names = {rule.head.name for rule in rules}
+    for rule in rules:
+        names |= _called(rule.body)
+    unfolder = Unfolder(rules)
+    for name in sorted(unfolder.helpers):
+        unfolder.definition(name)
+    return rules, names, unfolder.flat
+
+
+def unfold_rules(
+    relationships: str, actions: str, stats: UnfoldStats | None = None
+) -> list[tuple[str, str]]:
+    """(line as written, unfolded rule) pairs for the datalog_actions of a
+    row, one pair per unfolded rule.
+
+    Falls back to the original lines when the row does not parse.
+    """
+    lines = [line for line in actions.split("\n") if line.strip()]
+    try:
+        context, names, flat = _context(relationships or "")
+        rules = [(line, rule) for line in lines for rule in parse_program(line)]
+    except DatalogSyntaxError:
+        return [(line, line) for line in lines]
+    # Rules that define a predicate the relationships use change its meaning
+    shared = None if any(rule.head.name in names for _, rule in rules) else flat
+    unfolder = Unfolder(context + [rule for _, rule in rules], shared=shared)
+    unfolded = [(line, str(r)) for line, rule in rules for r in unfolder.unfold(rule)]
+    if stats is not None:
+        stats.add(unfolder.stats)
+    return unfolded
@@ -0,0 +1,523 @@
+"""Command line entry point for the ReBAC policy pipeline.
+
+Run from the repository root:
+
+    python rebac.py generate --source litroacp --datasets "acre_*" --jobs 2
+    python rebac.py generate --jobs 3 --tpm 200000 --urgent "t2p_*" --plan
+    python rebac.py translate --translator cheng --translator fong --only-changed
+    python rebac.py translate --jobs 4 --executor thread
+    python rebac.py pipeline --datasets "t2p_*" --translator cheng
+    python rebac.py evaluate
+
+Datasets are selected with glob patterns (matched against the file name and
+the repository-relative path) or with a manifest file listing one pattern
+per line.  `--only-changed` skips jobs whose input, code (the job's module
+and the project modules it imports) and options hash to the same value as
+in the last successful run (recorded in .rebac-state.json).
+Generation jobs run urgent datasets first and then the largest first, and
+are paced to the `--tpm`/`--rpm` budget of the provider.
+"""
+
+import argparse
+import ast
+import fnmatch
+import hashlib
+import importlib
+import json
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+STATE_FILE = Path(".rebac-state.json")
+
+GENERATION_SOURCES = {
+    "litroacp": (
+        "policy_generation/input/litroacp/data_acp/*.jsonl",
+        "policy_generation.natural_langauge_statements",
+    ),
+    "xacml": ("policy_generation/input/xacml/**/*.xml", "policy_generation.xacml"),
+    "xacbench": (
+        "policy_generation/input/xacml/xacBench-datasets/*.csv",
+        "policy_generation.xacml_new",
+    ),
+}
+TRANSLATION_SOURCES = {
+    "natural_language_statements": "policy_generation/output/litroacp/*.csv",
+    "xacml": "policy_generation/output/xacml/xacBench/*.csv",
+}
+TRANSLATORS = ("carminati", "cheng", "crampton", "fong")
+PROJECT_PACKAGES = ("policy_generation", "policy_translation", "policy_enforcement")
+# Pick the generation backend and model (see policy_generation.backends)
+GENERATION_ENV = ("GENERATION_BACKEND", "GENERATION_MODEL", "GENERATION_BASE_URL")
+
+
+@dataclass
+class Job:
+    stage: str
+    tool: str
+    input_path: Path
+    output_path: Path
+    source_type: str = ""
+    digest: str = ""
+
+    @property
+    def key(self) -> str:
+        return f"{self.stage}:{self.tool}:{self.output_path.as_posix()}"
+
+
+def file_digest(*paths: Path) -> str:
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(path.as_posix().encode())
+        h.update(Path(path).read_bytes())
+    return h.hexdigest()
+
+
+def module_path(module: str) -> Path:
+    return Path(*module.split(".")).with_suffix(".py")
+
+
+def project_imports(module: str) -> list[Path]:
+    """Source files of `module` and of the project modules it imports,
+    directly or through other project modules, function-level imports
+    included."""
+    seen, stack = set(), [module]
+    while stack:
+        path = module_path(stack.pop())
+        if path in seen or not path.exists():
+            continue
+        seen.add(path)
+        for node in ast.walk(ast.parse(path.read_bytes(), str(path))):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                # `from package import module` imports a module or a name
+                names = [node.module] + [
+                    f"{node.module}.{alias.name}" for alias in node.names
+                ]
+            else:
+                continue
+            stack.extend(n for n in names if n.split(".")[0] in PROJECT_PACKAGES)
+    return sorted(seen)
+
+
+def load_manifest(path: Path) -> list[str]:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        return list(json.loads(text))
+    return [
+        line.strip()
+        for line in text.splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+
+
+def select(paths: list[Path], patterns: list[str]) -> list[Path]:
+    if not patterns:
+        return paths
+    return [
+        p
+        for p in paths
+        if any(
+            fnmatch.fnmatch(p.name, pat)
+            or fnmatch.fnmatch(p.stem, pat)
+            or fnmatch.fnmatch(p.as_posix(), pat)
+            for pat in patterns
+        )
+    ]
+
+
+def dataset_patterns(args) -> list[str]:
+    patterns = list(args.datasets or [])
+    if args.manifest:
+        patterns += load_manifest(Path(args.manifest))
+    return patterns
+
+
+def generation_jobs(args) -> list[Job]:
+    jobs = []
+    for source in args.source or list(GENERATION_SOURCES):
+        pattern = GENERATION_SOURCES[source][0]
+        inputs = sorted(Path().glob(pattern))
+        for input_path in select(inputs, dataset_patterns(args)):
+            jobs.append(Job("generate", source, input_path, Path()))
+    for job in jobs:
+        module = importlib.import_module(GENERATION_SOURCES[job.tool][1])
+        if job.tool == "litroacp":
+            job.output_path = module.OUTPUT_DIR / f"{job.input_path.stem}.csv"
+        else:
+            job.output_path = module.output_path_for(job.input_path)
+    return jobs
+
+
+def translation_jobs(args) -> list[Job]:
+    jobs = []
+    for source_type, pattern in TRANSLATION_SOURCES.items():
+        inputs = select(sorted(Path().glob(pattern)), dataset_patterns(args))
+        for translator in args.translator or TRANSLATORS:
+            for input_path in inputs:
+                output_path = Path("policy_translation/output", translator)
+                jobs.append(
+                    Job(
+                        "translate",
+                        translator,
+                        input_path,
+                        output_path / input_path.name,
+                        source_type,
+                    )
+                )
+    return jobs
+
+
+def run_generation(source: str, input_path: Path, output_path: Path, **options) -> None:
+    module = importlib.import_module(GENERATION_SOURCES[source][1])
+    if source == "litroacp":
+        module.generate_dataset(input_path, output_path, **options)
+    else:
+        module.translate_file(input_path, output_path)
+
+
+def run_translation(
+    translator: str,
+    input_path: Path,
+    output_path: Path,
+    source_type: str,
+    memo: bool = False,
+) -> tuple[str, int, object, object]:
+    """Translate one file; returns (translator, process id, counters of the
+    process's translation memo or None, unfolding stats of this file or
+    None) for `translation_report`."""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    name = translator
+    module = importlib.import_module(f"policy_translation.{translator}")
+    unfold_stats = None
+    if translator == "cheng":
+        translator = module.ChengTranslator(memo=memo)
+        translator.process_csv(input_path, output_path, source_type)
+        unfold_stats = translator.unfold_stats
+    elif translator == "crampton":
+        translator = module.CramptonTranslator(memo=memo)
+        translator.process_csv(input_path, output_path, source_type)
+        unfold_stats = translator.unfold_stats
+    elif translator == "fong":
+        module.translate(input_path, output_path, memo)
+    else:
+        module.translate(input_path, output_path)
+    counts = module.MEMO.counts() if memo and hasattr(module, "MEMO") else None
+    return name, os.getpid(), counts, unfold_stats
+
+
+def translation_report(results: list) -> list[str]:
+    """Memo and unfolding report lines per translator from the results of
+    run_translation.
+
+    Each process keeps one memo per translator, so its counters are taken
+    from the last job it ran and summed over the processes.
+    """
+    from policy_translation.memo import MemoCounts
+    from policy_translation.unfolding import UnfoldStats
+
+    latest, unfolding = {}, {}
+    for name, pid, counts, stats in results:
+        if counts is not None:
+            previous = latest.get((name, pid))
+            if previous is None or counts.lookups >= previous.lookups:
+                latest[name, pid] = counts
+        if stats is not None:
+            unfolding.setdefault(name, UnfoldStats()).add(stats)
+    memos = {}
+    for (name, _), counts in latest.items():
+        memos.setdefault(name, MemoCounts()).add(counts)
+    lines = []
+    for name in sorted(memos.keys() | unfolding.keys()):
+        if name in memos:
+            lines.append(f"{name}: {memos[name].report()}")
+        if name in unfolding:
+            lines.append(f"{name}: {unfolding[name].report()}")
+    return lines
+
+
+def job_digest(job: Job, options: dict) -> str:
+    """Hash of the job's input, the code it runs and the options it runs with."""
+    if job.stage == "translate":
+        code = project_imports(f"policy_translation.{job.tool}")
+    else:
+        code = project_imports(GENERATION_SOURCES[job.tool][1]) + sorted(
+            Path("policy_generation/input/prompts").glob("*.txt")
+        )
+        options = {**options, **{name: os.getenv(name) for name in GENERATION_ENV}}
+    settings = json.dumps(options, sort_keys=True).encode()
+    return hashlib.sha256(
+        settings + file_digest(job.input_path, *code).encode()
+    ).hexdigest()
+
+
+def run_jobs(
+    jobs: list[Job],
+    executor: Executor,
+    only_changed: bool,
+    results: list | None = None,
+    **options,
+) -> int:
+    """Run the jobs and return the exit status; the return values of the
+    successful jobs are appended to `results`."""
+    state = json.loads(STATE_FILE.read_text()) if STATE_FILE.exists() else {}
+    pending = []
+    for job in jobs:
+        job.digest = job_digest(job, options)
+        if (
+            only_changed
+            and state.get(job.key) == job.digest
+            and job.output_path.exists()
+        ):
+            print(f"- {job.key} unchanged, skipped")
+            continue
+        pending.append(job)
+
+    failures = 0
+    with executor:
+        futures = {}
+        for job in pending:
+            if job.stage == "translate":
+                future = executor.submit(
+                    run_translation,
+                    job.tool,
+                    job.input_path,
+                    job.output_path,
+                    job.source_type,
+                    **options,
+                )
+            else:
+                future = executor.submit(
+                    run_generation,
+                    job.tool,
+                    job.input_path,
+                    job.output_path,
+                    **options,
+                )
+            futures[future] = job
+        for future, job in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"✗ {job.key}: {e}")
+                continue
+            if results is not None:
+                results.append(result)
+            state[job.key] = job.digest
+            STATE_FILE.write_text(json.dumps(state, indent=2, sort_keys=True))
+
+    skipped = len(jobs) - len(pending)
+    print(f"{len(pending) - failures} jobs run, {skipped} skipped, {failures} failed")
+    return 1 if failures else 0
+
+
+def cmd_generate(args) -> int:
+    from policy_generation.scheduler import (
+        NORMAL,
+        URGENT,
+        budget_from_env,
+        estimate,
+        plan,
+    )
+
+    # Read by make_backend, so set before any backend is built
+    if args.tpm:
+        os.environ["GENERATION_TPM"] = str(args.tpm)
+    if args.rpm:
+        os.environ["GENERATION_RPM"] = str(args.rpm)
+    jobs = generation_jobs(args)
+    urgent = set()
+    if args.urgent:
+        urgent = set(select([job.input_path for job in jobs], args.urgent))
+    items = [
+        estimate(
+            job.tool,
+            job.input_path,
+            hints=not args.no_hints,
+            priority=URGENT if job.input_path in urgent else NORMAL,
+            payload=job,
+        )
+        for job in jobs
+    ]
+    schedule = plan(items, args.jobs, budget_from_env())
+    print(schedule.report())
+    if args.plan:
+        return 0
+    jobs = [item.payload for item in schedule.items]
+    # Generation is network bound: datasets run in threads that share one
+    # backend, built here before the threads need it
+    for source in {job.tool for job in jobs}:
+        if source == "litroacp":
+            from policy_generation.natural_langauge_statements import (
+                get_acp_filter,
+                get_validator,
+            )
+
+            get_validator(not args.no_hints)
+            if args.acp_filter:
+                get_acp_filter()
+        else:
+            from policy_generation.xacml import get_backend
+
+            get_backend()
+    return run_jobs(
+        jobs,
+        ThreadPoolExecutor(max_workers=args.jobs),
+        args.only_changed,
+        hints=not args.no_hints,
+        acp_filter=args.acp_filter,
+    )
+
+
+def cmd_translate(args) -> int:
+    jobs = translation_jobs(args)
+    # Threads share the translation memos (--memo) across datasets and only
+    # run in parallel on a free-threaded interpreter; processes always do
+    if args.executor == "thread":
+        executor = ThreadPoolExecutor(max_workers=args.jobs)
+    else:
+        executor = ProcessPoolExecutor(max_workers=args.jobs)
+    results = []
+    status = run_jobs(jobs, executor, args.only_changed, results, memo=args.memo)
+    for line in translation_report(results):
+        print(line)
+    return status
+
+
+def cmd_pipeline(args) -> int:
+    import asyncio
+
+    from policy_translation.pipeline import run_datasets
+
+    pattern = GENERATION_SOURCES["litroacp"][0]
+    inputs = select(sorted(Path().glob(pattern)), dataset_patterns(args))
+    stats = asyncio.run(
+        run_datasets(
+            inputs,
+            translators=tuple(args.translator or TRANSLATORS),
+            hints=not args.no_hints,
+            acp_filter=args.acp_filter,
+        )
+    )
+    return 1 if any(s["failed"] or s["translation_errors"] for s in stats) else 0
+
+
+def cmd_evaluate(args) -> int:
+    from evaluation.policy_gen import plot_completeness
+
+    plot_completeness(output_path=Path(args.output), show=args.show)
+    print(f"Saved {args.output}")
+    return 0
+
+
+def add_generation_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--no-hints",
+        action="store_true",
+        help="send LitroACP statements without their span annotations",
+    )
+    parser.add_argument(
+        "--acp-filter",
+        action="store_true",
+        help="skip LitroACP sentences the local classifier marks as non-policy",
+    )
+
+
+def add_selection_arguments(parser: argparse.ArgumentParser, jobs: bool = True) -> None:
+    parser.add_argument(
+        "--datasets",
+        action="append",
+        metavar="GLOB",
+        help="glob over dataset file names or paths (repeatable)",
+    )
+    parser.add_argument("--manifest", help="file listing dataset globs, one per line")
+    if not jobs:
+        # The pipeline runs every selected dataset at once and always reruns
+        return
+    parser.add_argument("--jobs", type=int, default=1, help="parallel jobs")
+    parser.add_argument(
+        "--only-changed",
+        action="store_true",
+        help="skip datasets whose inputs and code are unchanged since the last run",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="rebac", description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    generate = sub.add_parser(
+        "generate", help="translate policies into Datalog with the LLM"
+    )
+    generate.add_argument(
+        "--source", action="append", choices=sorted(GENERATION_SOURCES)
+    )
+    add_generation_arguments(generate)
+    add_selection_arguments(generate)
+    generate.add_argument(
+        "--tpm", type=float, help="provider tokens-per-minute budget to pace to"
+    )
+    generate.add_argument(
+        "--rpm", type=float, help="provider requests-per-minute budget to pace to"
+    )
+    generate.add_argument(
+        "--urgent",
+        action="append",
+        metavar="GLOB",
+        help="datasets to schedule before all others (repeatable)",
+    )
+    generate.add_argument(
+        "--plan",
+        action="store_true",
+        help="print the schedule and projected completion time without running",
+    )
+    generate.set_defaults(func=cmd_generate)
+
+    translate = sub.add_parser(
+        "translate", help="map generated Datalog to ReBAC models"
+    )
+    translate.add_argument("--translator", action="append", choices=TRANSLATORS)
+    translate.add_argument(
+        "--executor",
+        choices=("process", "thread"),
+        default="process",
+        help="run parallel jobs in processes or in threads of one process",
+    )
+    translate.add_argument(
+        "--memo",
+        action="store_true",
+        help="reuse translations of rules with the same shape; slower on the "
+        "generated corpus and the output may differ (see evaluation/memo_bench.py)",
+    )
+    add_selection_arguments(translate)
+    translate.set_defaults(func=cmd_translate)
+
+    pipeline = sub.add_parser(
+        "pipeline",
+        help="generate LitroACP Datalog and translate each row as it arrives",
+    )
+    pipeline.add_argument("--translator", action="append", choices=TRANSLATORS)
+    add_generation_arguments(pipeline)
+    add_selection_arguments(pipeline, jobs=False)
+    pipeline.set_defaults(func=cmd_pipeline)
+
+    evaluate = sub.add_parser(
+        "evaluate", help="plot completeness of the generated Datalog"
+    )
+    evaluate.add_argument("--output", default="evaluation/policy_gen_result.png")
+    evaluate.add_argument("--show", action="store_true", help="open the plot window")
+    evaluate.set_defaults(func=cmd_evaluate)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())